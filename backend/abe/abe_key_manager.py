@@ -1,7 +1,7 @@
 """ABE/Access-control helper utilities.
 
 In this project:
-- Actual file encryption is AES-256-CBC (see backend.aes.aes_utils)
+- Actual file encryption is AES-256 (segmented GCM; legacy CBC blobs are still readable, see backend.aes.aes_utils)
 - "ABE" is used for policy enforcement and key-wrapping (see backend.abe.cpabe_utils)
 - Authorities approve access via blockchain votes (threshold approval)
 
@@ -11,9 +11,72 @@ This module only keeps the parts that the API currently uses:
 """
 
 import base64
+import functools
 import os
-from datetime import datetime
-from typing import Dict, List, Optional
+import secrets
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from backend.abe import gf256_shamir
+from backend.abe.share_metadata import ShareMetadataStore, get_share_metadata
+from backend.abe.share_store import get_share_store
+
+# Prime field for Shamir shares (secp256k1 field prime; fits a 32-byte key)
+SHAMIR_PRIME = 2**256 - 2**32 - 977
+
+SHAMIR_MODES = ("prime", "gf256")
+
+
+def shamir_split_batch(
+    secret_values: Sequence[int],
+    threshold: int,
+    shares: int,
+    prime: int = SHAMIR_PRIME,
+) -> List[List[int]]:
+    """Split many secrets at once; returns one list of `shares` values per secret.
+
+    Coefficients come from the `secrets` CSPRNG and each polynomial is
+    evaluated at x = 1..shares with Horner's rule.
+    """
+    xs = range(1, shares + 1)
+    out = []
+    for secret in secret_values:
+        # Highest-degree coefficient first, constant term (the secret) last
+        coefficients = [secrets.randbelow(prime) for _ in range(threshold - 1)]
+        coefficients.append(secret % prime)
+        row = []
+        for x in xs:
+            y = 0
+            for coeff in coefficients:
+                y = (y * x + coeff) % prime
+            row.append(y)
+        out.append(row)
+    return out
+
+
+@functools.lru_cache(maxsize=1024)
+def lagrange_basis(indices: Tuple[int, ...], prime: int = SHAMIR_PRIME) -> Tuple[int, ...]:
+    """Lagrange basis coefficients at x = 0 for a subset of share indices.
+
+    Only C(total, threshold) subsets exist (35 for 4-of-7), so each is
+    computed once and reused by every reconstruction.
+    """
+    basis = []
+    for i, xi in enumerate(indices):
+        numerator = 1
+        denominator = 1
+        for j, xj in enumerate(indices):
+            if i != j:
+                numerator = (numerator * -xj) % prime
+                denominator = (denominator * (xi - xj)) % prime
+        basis.append(numerator * pow(denominator, -1, prime) % prime)
+    return tuple(basis)
+
+
+def shamir_combine(share_values: Sequence[int], indices: Sequence[int], prime: int = SHAMIR_PRIME) -> int:
+    """Reconstruct a secret from shares at the given 1-based indices."""
+    basis = lagrange_basis(tuple(indices), prime)
+    return sum(share * coeff for share, coeff in zip(share_values, basis)) % prime
+
 
 class ABEKeyManager:
     """
@@ -26,20 +89,36 @@ class ABEKeyManager:
     - Authorities vote on blockchain; backend releases full key after 4-of-7 approve
     """
     
-    def __init__(self, threshold: int = 4, total_shares: int = 7) -> None:
+    def __init__(
+        self,
+        threshold: int = 4,
+        total_shares: int = 7,
+        mode: Optional[str] = None,
+        share_metadata: Optional[ShareMetadataStore] = None,
+    ) -> None:
         """
         Initialize ABE Key Manager
         
         Args:
             threshold: Number of shares needed (default: 4)
             total_shares: Total number of shares (default: 7)
+            mode: "prime" (first 32 bytes as one integer mod SHAMIR_PRIME) or
+                "gf256" (byte-wise GF(2^8) sharing of any length);
+                default from SHAMIR_MODE, else "prime"
+            share_metadata: Share metadata store (default: the shared
+                database-backed store)
         """
         self.threshold: int = threshold
         self.total_shares: int = total_shares
 
-        # Storage for shares/metadata (demo Shamir flow)
-        self.key_shares: Dict[str, Dict] = {}
-        self.share_mapping: Dict[str, Dict] = {}
+        mode = (mode or os.getenv("SHAMIR_MODE") or "prime").strip().lower()
+        if mode not in SHAMIR_MODES:
+            raise ValueError(f"Unsupported Shamir mode: {mode}")
+        self.mode: str = mode
+
+        # Share metadata (demo Shamir flow) lives in the database so every
+        # worker process can reconstruct keys; the shares in the share store.
+        self.share_metadata: ShareMetadataStore = share_metadata or get_share_metadata()
 
     def split_key_to_shares(self, 
                            key_material: bytes, 
@@ -57,62 +136,71 @@ class ABEKeyManager:
         This method is here for reference/potential future threshold cryptography implementation.
         
         Args:
-            key_material: Key to split
+            key_material: Key to split (in "gf256" mode any length, e.g. a
+                whole wrapped-key struct; otherwise the first 32 bytes)
             file_id: File identifier
             authorities: List of 7 authority addresses
             
         Returns:
             Dict mapping authority addresses to their key shares
         """
+        return self.split_keys_to_shares({file_id: key_material}, authorities)[file_id]
+
+    def split_keys_to_shares(self,
+                             keys: Mapping[str, bytes],
+                             authorities: List[str]) -> Dict[str, Dict[str, bytes]]:
+        """
+        Batch version of split_key_to_shares (e.g. re-sharing every file after
+        an authority rotation): all polynomials are generated and evaluated in
+        one pass, then the shares are stored per file.
+
+        Args:
+            keys: Mapping of file identifier -> key material
+            authorities: List of 7 authority addresses
+
+        Returns:
+            Dict mapping file identifiers to {authority address: key share}
+        """
         if len(authorities) != self.total_shares:
             raise ValueError(f"Expected {self.total_shares} authorities, got {len(authorities)}")
 
-        # Reconstruct key as integer (use first 32 bytes)
-        key_int: int = int.from_bytes(key_material[:32], 'big')
-
-        # Use Shamir's Secret Sharing to generate integer shares
-        shares: List[int] = self._shamir_split(key_int, self.threshold, self.total_shares)
-
-        # Prepare storage for share metadata and actual shares
-        share_dict = {}
-        share_meta = {}
-
-        # Ensure storage directory for shares exists
-        base_share_dir: str = os.path.join(os.path.dirname(__file__), '..', '..', 'storage', 'shares')
-        os.makedirs(base_share_dir, exist_ok=True)
-        file_share_dir: str = os.path.join(base_share_dir, str(file_id))
-        os.makedirs(file_share_dir, exist_ok=True)
-
-        for i, auth_address in enumerate(authorities):
-            # Store the integer share as base64-encoded bytes on disk per authority
-            share_value: int = shares[i]
-            share_bytes: bytes = str(share_value).encode()
-            b64: bytes = base64.b64encode(share_bytes)
-
-            share_path: str = os.path.join(file_share_dir, f"{auth_address}.share")
-            with open(share_path, 'wb') as sf:
-                sf.write(b64)
-
-            share_dict[auth_address] = b64
-            share_meta[auth_address] = {
-                "share_index": i + 1,  # 1-based index for Shamir
-                "file_id": file_id,
-                "share_path": share_path,
-                "created_at": datetime.utcnow().isoformat()
-            }
-
-        # Store metadata mappings in memory
-        self.share_mapping[file_id] = {
-            "authorities": authorities,
-            "threshold": self.threshold,
-            "total_shares": self.total_shares,
-            "created_at": datetime.utcnow().isoformat()
+        file_ids = list(keys)
+        if self.mode == "gf256":
+            # Byte-wise shares, same length as the key material
+            all_shares = gf256_shamir.split_batch(
+                [keys[file_id] for file_id in file_ids], self.threshold, self.total_shares
+            )
+        else:
+            # Keys as integers (use first 32 bytes)
+            key_ints = [int.from_bytes(keys[file_id][:32], 'big') for file_id in file_ids]
+
+            # Use Shamir's Secret Sharing to generate integer shares
+            all_shares = [
+                [str(share).encode() for share in shares]
+                for shares in shamir_split_batch(key_ints, self.threshold, self.total_shares)
+            ]
+
+        # Store the shares (decimal integer or raw GF(256) bytes) of all files in one batch
+        shares_by_file = {
+            file_id: dict(zip(authorities, shares))
+            for file_id, shares in zip(file_ids, all_shares)
+        }
+        store = get_share_store()
+        put_batch = getattr(store, "put_batch", None)
+        if put_batch is not None:
+            put_batch(shares_by_file)
+        else:
+            for file_id, shares in shares_by_file.items():
+                store.put_many(file_id, shares)
+
+        self.share_metadata.save_many(
+            file_ids, authorities, self.threshold, self.total_shares, self.mode
+        )
+
+        return {
+            file_id: {auth: base64.b64encode(share) for auth, share in shares.items()}
+            for file_id, shares in shares_by_file.items()
         }
-
-        # Store actual share metadata (not the secret) in memory
-        self.key_shares[file_id] = share_meta
-
-        return share_dict
 
     def collect_shares(self, 
                       file_id: str,
@@ -135,50 +223,54 @@ class ABEKeyManager:
         Returns:
             Reconstructed key if threshold met, None otherwise
         """
-        if len(approving_authorities) < self.threshold:
+        meta = self.share_metadata.get(file_id)
+        if meta is None:
             return None
 
-        if file_id not in self.share_mapping:
+        # Use the threshold the file was shared with (may differ per process config)
+        threshold: int = meta.get("threshold", self.threshold)
+        if len(approving_authorities) < threshold:
             return None
 
-        meta = self.share_mapping[file_id]
-
         # Limit to known authorities
         approving = [a for a in approving_authorities if a in meta["authorities"]]
-        if len(approving) < self.threshold:
+        if len(approving) < threshold:
             return None
 
-        # Collect share integers and their 1-based indices
+        mode = meta.get("mode", "prime")
+
+        # Collect share values and their 1-based indices
         shares_collected = []
         indices = []
 
-        base_share_dir: str = os.path.join(os.path.dirname(__file__), '..', '..', 'storage', 'shares')
-        file_share_dir: str = os.path.join(base_share_dir, str(file_id))
+        # One batched read for all approving authorities
+        candidates = approving[:meta.get("total_shares", self.total_shares)]
+        stored = get_share_store().get_many(file_id, candidates)
 
-        for auth in approving[:self.total_shares]:
-            idx = meta["authorities"].index(auth) + 1
-            share_file: str = os.path.join(file_share_dir, f"{auth}.share")
-            if not os.path.exists(share_file):
+        for auth in candidates:
+            share_bytes = stored.get(auth)
+            if share_bytes is None:
                 continue
-            with open(share_file, 'rb') as sf:
-                b64: bytes = sf.read()
+            idx = meta["authorities"].index(auth) + 1
             try:
-                share_bytes: bytes = base64.b64decode(b64)
-                share_int = int(share_bytes.decode())
+                share_value = share_bytes if mode == "gf256" else int(share_bytes.decode())
             except Exception:
                 continue
 
             indices.append(idx)
-            shares_collected.append(share_int)
+            shares_collected.append(share_value)
 
-            if len(shares_collected) >= self.threshold:
+            if len(shares_collected) >= threshold:
                 break
 
-        if len(shares_collected) < self.threshold:
+        if len(shares_collected) < threshold:
             return None
 
+        if mode == "gf256":
+            return gf256_shamir.combine(shares_collected[:threshold], indices[:threshold])
+
         # Reconstruct secret using Lagrange interpolation
-        reconstructed: int = self._lagrange_interpolate(shares_collected[:self.threshold], indices[:self.threshold])
+        reconstructed: int = self._lagrange_interpolate(shares_collected[:threshold], indices[:threshold])
 
         return reconstructed.to_bytes(32, 'big')
 
@@ -194,23 +286,7 @@ class ABEKeyManager:
         Returns:
             List of share values
         """
-        import random
-        
-        # Prime number for modular arithmetic
-        prime = 2**256 - 2**32 - 977  # Bitcoin's SECP256k1 prime
-        
-        # Generate random coefficients
-        coefficients = [secret] + [random.randint(0, prime - 1) for _ in range(threshold - 1)]
-        
-        # Generate shares by evaluating polynomial at different points
-        share_list = []
-        for x in range(1, shares + 1):
-            y = 0
-            for i, coeff in enumerate(coefficients):
-                y = (y + coeff * (x ** i)) % prime
-            share_list.append(y)
-        
-        return share_list
+        return shamir_split_batch([secret], threshold, shares)[0]
 
     def _lagrange_interpolate(self, shares: List[int], indices: List[int]) -> int:
         """
@@ -223,23 +299,7 @@ class ABEKeyManager:
         Returns:
             Reconstructed secret
         """
-        prime = 2**256 - 2**32 - 977
-        secret = 0
-        
-        for i, share in enumerate(shares):
-            numerator = 1
-            denominator = 1
-            
-            for j, other_idx in enumerate(indices):
-                if i != j:
-                    numerator: int = (numerator * (-other_idx)) % prime
-                    denominator: int = (denominator * (indices[i] - other_idx)) % prime
-            
-            # Modular inverse
-            denominator_inv: int = pow(denominator, -1, prime)
-            secret: int = (secret + share * numerator * denominator_inv) % prime
-        
-        return secret
+        return shamir_combine(shares, indices)
 
     def decrypt_file(
         self,
@@ -249,8 +309,8 @@ class ABEKeyManager:
     ) -> Optional[bytes]:
         """Decrypt AES-encrypted blob using the reconstructed AES key.
 
-        The upload flow stores AES-CBC data in the format: iv(16) + ciphertext.
-        This method mirrors that by delegating to backend.aes.aes_utils.decrypt_blob.
+        Blob format detection (segmented AES-GCM or legacy AES-CBC) is delegated
+        to backend.aes.aes_utils.decrypt_blob.
         """
         try:
             from backend.aes.aes_utils import decrypt_blob
@@ -264,6 +324,15 @@ class ABEKeyManager:
             print(f"Decryption error: {e}")
             return None
 
+    def decrypt_file_stream(self, encrypted_file, decryption_key: bytes) -> Iterator[bytes]:
+        """Decrypt a stored blob incrementally from a seekable binary file object.
+
+        Streaming counterpart of decrypt_file; errors are raised to the caller.
+        """
+        from backend.aes.aes_utils import decrypt_fileobj
+
+        return decrypt_fileobj(encrypted_file, decryption_key)
+
     def _parse_policy(self, policy: str) -> List[str]:
         """Parse policy string to extract required attributes"""
         # Simple parser for "attr1:value1 AND attr2:value2"
@@ -0,0 +1,192 @@
+"""Materialized access matrix: attribute set -> policies it satisfies.
+
+Users are grouped by the fingerprint of their normalized attributes (many
+users share the same role/department/clearance), and the `access_grants`
+table stores which interned policies each attribute set satisfies. Listing
+a user's readable files is then an indexed join instead of evaluating every
+policy. The table is maintained incrementally:
+
+- a new attribute set (user created or attributes changed) is evaluated
+  against all policies once
+- a new policy (file upload) is evaluated against all attribute sets once
+- a policy no longer referenced by any file (file delete) loses its grants
+
+All three take the matrix lock (a row in `schema_versions`) before
+reading the other side, so a new attribute set and a new policy created at
+the same time cannot miss their grant, and a policy released while a new
+file re-uses it keeps its grants. The full rebuild only runs when the
+stored MATRIX_VERSION is missing or outdated (ensure_access_matrix).
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, List, Optional
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.abe.cpabe_utils import attribute_fingerprint, compile_policy, normalize_attributes
+from backend.abe.decision_cache import get_decision_cache
+from backend.abe.policy_index import get_policy_index
+from backend.models import AccessGrant, AttributeSet, Policy, SchemaVersion, SecureFile, User
+
+# Bump when the grant semantics change (e.g. attribute normalization) to
+# rebuild existing matrices at the next startup.
+MATRIX_VERSION = 1
+_MATRIX = "access_matrix"
+
+
+def user_attributes(user: User) -> set:
+    """Attribute tokens of a user, as used for policy checks."""
+    return {
+        f"role:{user.role}",
+        f"dept:{user.department}",
+        f"department:{user.department}",
+        f"clearance:{user.clearance}",
+    }
+
+
+def _set_attributes(row: AttributeSet) -> frozenset:
+    return frozenset(t for t in row.attributes.split("\n") if t)
+
+
+def _lock_matrix(db: Session) -> None:
+    """Take the matrix write lock for the rest of the transaction."""
+    db.execute(
+        update(SchemaVersion)
+        .where(SchemaVersion.name == _MATRIX)
+        .values(version=SchemaVersion.version)
+    )
+
+
+def _materialize(db: Session, attrs: frozenset, policies) -> AttributeSet:
+    """Insert an attribute set and its grants (no commit)."""
+    row = AttributeSet(fingerprint=attribute_fingerprint(attrs), attributes="\n".join(sorted(attrs)))
+    db.add(row)
+    db.flush()
+
+    granted = get_policy_index().accessible(policies, attrs)
+    if granted:
+        db.execute(insert(AccessGrant), [
+            {"attribute_set_id": row.id, "policy_id": policy_id} for policy_id in granted
+        ])
+    return row
+
+
+def ensure_attribute_set(db: Session, attributes: Iterable[str]) -> AttributeSet:
+    """Return the attribute set row, materializing its grants on first sight."""
+    attrs = normalize_attributes(attributes)
+    fingerprint = attribute_fingerprint(attrs)
+
+    row = db.query(AttributeSet).filter(AttributeSet.fingerprint == fingerprint).first()
+    if row is not None:
+        return row
+
+    try:
+        _lock_matrix(db)
+        row = _materialize(db, attrs, db.query(Policy.id, Policy.canonical).all())
+        db.commit()
+    except IntegrityError:
+        # Materialized concurrently by another request
+        db.rollback()
+        row = db.query(AttributeSet).filter(AttributeSet.fingerprint == fingerprint).one()
+    return row
+
+
+def grant_policy(db: Session, policy: Policy) -> int:
+    """Evaluate a policy against every known attribute set; returns grants added."""
+    evaluate = compile_policy(policy.canonical).evaluate
+    _lock_matrix(db)
+    existing = {
+        set_id
+        for (set_id,) in db.query(AccessGrant.attribute_set_id).filter(AccessGrant.policy_id == policy.id)
+    }
+
+    new_rows = [
+        {"attribute_set_id": row.id, "policy_id": policy.id}
+        for row in db.query(AttributeSet).all()
+        if row.id not in existing and evaluate(_set_attributes(row))
+    ]
+    if new_rows:
+        db.execute(insert(AccessGrant), new_rows)
+    db.commit()
+    return len(new_rows)
+
+
+def release_policy(db: Session, policy_id) -> bool:
+    """Drop the grants of a policy once no file references it.
+
+    The reference check and the delete run under the matrix lock that
+    grant_policy takes, so an upload re-interning the policy either commits
+    its file first (and the grants stay) or runs grant_policy afterwards
+    (and restores them).
+    """
+    if policy_id is None:
+        return False
+    _lock_matrix(db)
+    if db.query(SecureFile.id).filter(SecureFile.policy_id == policy_id).first() is not None:
+        db.commit()
+        return False
+    db.execute(delete(AccessGrant).where(AccessGrant.policy_id == policy_id))
+    db.commit()
+
+    policy = db.get(Policy, policy_id)
+    if policy is not None:
+        get_decision_cache().invalidate_policy(policy.canonical)
+    return True
+
+
+def accessible_file_ids(db: Session, attributes: Iterable[str]) -> List[int]:
+    """IDs of files whose (interned) policy the attribute set satisfies."""
+    attribute_set = ensure_attribute_set(db, attributes)
+    rows = (
+        db.query(SecureFile.id)
+        .join(AccessGrant, AccessGrant.policy_id == SecureFile.policy_id)
+        .filter(AccessGrant.attribute_set_id == attribute_set.id)
+        .order_by(SecureFile.id)
+        .all()
+    )
+    return [file_id for (file_id,) in rows]
+
+
+def ensure_access_matrix(db: Session, force: bool = False) -> Optional[int]:
+    """Build the matrix if it was never built or is from an older
+    MATRIX_VERSION (or `force`); returns the number of grants, or None when
+    the stored matrix is current. Used at startup.
+
+    The whole rebuild is one transaction under the matrix lock: concurrent
+    workers build it once, and requests keep seeing the previous grants
+    until it commits.
+    """
+    try:
+        with db.begin_nested():
+            db.add(SchemaVersion(name=_MATRIX, version=0))
+    except IntegrityError:
+        pass  # Already recorded (possibly by another worker)
+    _lock_matrix(db)
+
+    version = db.query(SchemaVersion.version).filter(SchemaVersion.name == _MATRIX).scalar()
+    if version == MATRIX_VERSION and not force:
+        db.commit()
+        return None
+
+    db.execute(delete(AccessGrant))
+    db.query(AttributeSet).delete()
+    policies = db.query(Policy.id, Policy.canonical).all()
+    seen = set()
+    for user in db.query(User).all():
+        attrs = normalize_attributes(user_attributes(user))
+        if attrs not in seen:
+            seen.add(attrs)
+            _materialize(db, attrs, policies)
+
+    db.query(SchemaVersion).filter(SchemaVersion.name == _MATRIX).update({"version": MATRIX_VERSION})
+    db.commit()
+    return db.query(AccessGrant).count()
+
+
+def rebuild_access_matrix(db: Session) -> int:
+    """Recompute every grant for all current users' attribute sets and all
+    policies; returns the number of grants."""
+    return ensure_access_matrix(db, force=True)
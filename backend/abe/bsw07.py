@@ -0,0 +1,338 @@
+"""Ciphertext-policy ABE (Bethencourt-Sahai-Waters 2007) over charm-crypto.
+
+Key wrapping for the ABE_ENGINE=bsw07 mode of cpabe_utils: the AES key is
+encrypted under a Fernet key derived from a random GT element, and that
+element is CP-ABE encrypted under the file's policy tree. AND / OR / `k of`
+gates of the policy language map directly onto BSW07 threshold gates.
+
+Performance:
+- fixed-base precomputation (initPP) for g, h and e(g,g)^alpha, which are
+  the bases of every exponentiation during encryption
+- hashed attribute points H(attr) and per-attribute-set user keys are cached
+- decryption paths (which leaves to pair and their combined Lagrange
+  coefficients) are cached per (user attributes, policy tree, strategy)
+- strategy "minimal" pairs only the leaves of the cheapest satisfying set;
+  "full" pairs every satisfied leaf as in the original DecryptNode recursion
+  (same result, timing independent of which branch is chosen)
+
+charm-crypto is an optional dependency; see backend/requirements.txt.
+"""
+
+from __future__ import annotations
+
+import base64
+import functools
+import hashlib
+import secrets
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from cryptography.fernet import Fernet
+
+from backend.abe.cpabe_utils import PolicyNode, normalize_attributes, parse_policy
+
+try:
+    from charm.toolbox.pairinggroup import G1, GT, ZR, PairingGroup, pair
+except ImportError:  # optional dependency
+    PairingGroup = None
+
+ENGINE_NAME = "bsw07"
+STRATEGIES = ("minimal", "full")
+
+# A decryption plan: leaves to pair, and (leaf position, coefficient) terms
+Plan = Tuple[Tuple[int, ...], Tuple[Tuple[int, int], ...]]
+
+
+def _gate_k(node: PolicyNode) -> int:
+    if node.op == "and":
+        return len(node.children)
+    if node.op == "or":
+        return 1
+    return node.k
+
+
+def _leaf_count(node: PolicyNode) -> int:
+    if node.op == "attr":
+        return 1
+    return sum(_leaf_count(c) for c in node.children)
+
+
+def _leaves(node: PolicyNode) -> List[str]:
+    if node.op == "attr":
+        return [node.attr]
+    return [attr for c in node.children for attr in _leaves(c)]
+
+
+def share_secret(tree: PolicyNode, secret: int, order: int) -> List[Tuple[str, int]]:
+    """Split `secret` down the access tree; returns (attribute, share) per leaf.
+
+    Each gate gets a random polynomial of degree k - 1 through its parent's
+    share, and child i receives its value at x = i (Horner evaluation).
+    """
+    out: List[Tuple[str, int]] = []
+
+    def share(node: PolicyNode, value: int) -> None:
+        if node.op == "attr":
+            out.append((node.attr, value))
+            return
+        coeffs = [value] + [secrets.randbelow(order) for _ in range(_gate_k(node) - 1)]
+        for index, child in enumerate(node.children, 1):
+            y = 0
+            for c in reversed(coeffs):
+                y = (y * index + c) % order
+            share(child, y)
+
+    share(tree, secret)
+    return out
+
+
+@functools.lru_cache(maxsize=1024)
+def _lagrange(i: int, indices: Tuple[int, ...], order: int) -> int:
+    """Lagrange basis coefficient Delta_{i,S}(0) mod order."""
+    num, den = 1, 1
+    for j in indices:
+        if j != i:
+            num = num * -j % order
+            den = den * (i - j) % order
+    return num * pow(den, -1, order) % order
+
+
+def _plan_node(node: PolicyNode, attrs: FrozenSet[str], base: int, order: int, strategy: str):
+    """(cost, terms) for the subtree whose first leaf is at `base`, or None."""
+    if node.op == "attr":
+        return (1, ((base, 1),)) if node.attr in attrs else None
+
+    satisfied = []
+    offset = base
+    for index, child in enumerate(node.children, 1):
+        sub = _plan_node(child, attrs, offset, order, strategy)
+        if sub is not None:
+            satisfied.append((index, sub))
+        offset += _leaf_count(child)
+
+    k = _gate_k(node)
+    if len(satisfied) < k:
+        return None
+    if strategy == "minimal":
+        satisfied.sort(key=lambda item: item[1][0])
+    chosen = sorted(satisfied[:k])
+
+    indices = tuple(index for index, _ in chosen)
+    terms = []
+    cost = 0
+    for index, (sub_cost, sub_terms) in chosen:
+        delta = _lagrange(index, indices, order)
+        cost += sub_cost
+        terms.extend((pos, coef * delta % order) for pos, coef in sub_terms)
+    return cost, tuple(terms)
+
+
+@functools.lru_cache(maxsize=4096)
+def decryption_plan(tree: PolicyNode, attributes: FrozenSet[str], order: int, strategy: str = "minimal") -> Optional[Plan]:
+    """Leaves to pair and their Lagrange coefficients, or None if unsatisfied."""
+    result = _plan_node(tree, attributes, 0, order, strategy)
+    if result is None:
+        return None
+    terms = result[1]
+    if strategy == "full":
+        paired = tuple(pos for pos, attr in enumerate(_leaves(tree)) if attr in attributes)
+    else:
+        paired = tuple(sorted(pos for pos, _ in terms))
+    return paired, terms
+
+
+def _precompute(element) -> None:
+    try:
+        element.initPP()
+    except Exception:
+        pass
+
+
+class BSW07Engine:
+    def __init__(
+        self,
+        group_name: str = "SS512",
+        params: Optional[Dict[str, str]] = None,
+        strategy: str = "minimal",
+        max_user_keys: int = 1024,
+    ) -> None:
+        if PairingGroup is None:
+            raise RuntimeError("charm-crypto is required for the bsw07 ABE engine")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unsupported decryption strategy: {strategy}")
+
+        self.group_name = group_name
+        self.group = PairingGroup(group_name)
+        self.order = int(self.group.order())
+        self.strategy = strategy
+        self.max_user_keys = max_user_keys
+
+        if params is None:
+            self._setup()
+        else:
+            self._load(params)
+        for element in (self.g, self.h, self.egg_alpha):
+            _precompute(element)
+
+        self._hashes: Dict[str, object] = {}
+        self._user_keys: "OrderedDict[FrozenSet[str], dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Setup / parameters
+
+    def _setup(self) -> None:
+        group = self.group
+        alpha, beta = group.random(ZR), group.random(ZR)
+        self.g = group.random(G1)
+        self.h = self.g ** beta
+        self.egg_alpha = pair(self.g, self.g) ** alpha
+        self._beta = beta
+        self._g_alpha = self.g ** alpha
+
+    def _load(self, params: Dict[str, str]) -> None:
+        if params.get("group") not in (None, self.group_name):
+            raise ValueError(f"ABE parameters are for group {params['group']}, not {self.group_name}")
+        load = self._deserialize
+        self.g, self.h, self.egg_alpha = load(params["g"]), load(params["h"]), load(params["egg_alpha"])
+        self._beta, self._g_alpha = load(params["beta"]), load(params["g_alpha"])
+
+    def export_params(self) -> Dict[str, str]:
+        """Public and master parameters (keep secret: includes the master key)."""
+        dump = self._serialize
+        return {
+            "group": self.group_name,
+            "g": dump(self.g),
+            "h": dump(self.h),
+            "egg_alpha": dump(self.egg_alpha),
+            "beta": dump(self._beta),
+            "g_alpha": dump(self._g_alpha),
+        }
+
+    def _serialize(self, element) -> str:
+        return self.group.serialize(element).decode()
+
+    def _deserialize(self, data: str):
+        return self.group.deserialize(data.encode())
+
+    def _zr(self, value: int):
+        return self.group.init(ZR, value)
+
+    def _hash(self, attr: str):
+        point = self._hashes.get(attr)
+        if point is None:
+            point = self.group.hash(attr, G1)
+            self._hashes[attr] = point
+        return point
+
+    # Keys
+
+    def keygen(self, attributes: Iterable[str]) -> dict:
+        """Secret key for a (normalized) attribute set."""
+        attrs = normalize_attributes(attributes)
+        group = self.group
+        r = group.random(ZR)
+        g_r = self.g ** r
+        components = {}
+        for attr in attrs:
+            r_j = group.random(ZR)
+            components[attr] = (g_r * (self._hash(attr) ** r_j), self.g ** r_j)
+        return {
+            "attributes": attrs,
+            "D": (self._g_alpha * g_r) ** (1 / self._beta),
+            "components": components,
+        }
+
+    def user_key(self, attributes: Iterable[str]) -> dict:
+        """Cached keygen: users with equal attribute sets share one key."""
+        attrs = normalize_attributes(attributes)
+        with self._lock:
+            key = self._user_keys.get(attrs)
+            if key is not None:
+                self._user_keys.move_to_end(attrs)
+                return key
+
+        key = self.keygen(attrs)
+        with self._lock:
+            self._user_keys[attrs] = key
+            while len(self._user_keys) > self.max_user_keys:
+                self._user_keys.popitem(last=False)
+        return key
+
+    # Encryption
+
+    def encrypt(self, message, policy: str) -> dict:
+        """Encrypt a GT element under `policy`."""
+        tree = parse_policy(policy)
+        s = secrets.randbelow(self.order - 1) + 1
+        leaves = []
+        for attr, q in share_secret(tree, s, self.order):
+            q_zr = self._zr(q)
+            leaves.append((self.g ** q_zr, self._hash(attr) ** q_zr))
+        s_zr = self._zr(s)
+        return {
+            "tree": tree,
+            "C_tilde": message * (self.egg_alpha ** s_zr),
+            "C": self.h ** s_zr,
+            "leaves": leaves,
+        }
+
+    def decrypt(self, ciphertext: dict, key: dict, strategy: Optional[str] = None):
+        """Recover the GT element; raises ValueError if the key does not satisfy the policy."""
+        plan = decryption_plan(ciphertext["tree"], key["attributes"], self.order, strategy or self.strategy)
+        if plan is None:
+            raise ValueError("Access Denied: Attributes do not satisfy policy")
+        paired, terms = plan
+
+        attrs = _leaves(ciphertext["tree"])
+        values = {}
+        for pos in paired:
+            d_j, d_prime_j = key["components"][attrs[pos]]
+            c_y, c_prime_y = ciphertext["leaves"][pos]
+            values[pos] = pair(d_j, c_y) / pair(d_prime_j, c_prime_y)
+
+        a = None
+        for pos, coef in terms:
+            term = values[pos] ** self._zr(coef)
+            a = term if a is None else a * term
+        return ciphertext["C_tilde"] / (pair(ciphertext["C"], key["D"]) / a)
+
+    # Key wrapping (cpabe_utils interface)
+
+    def _fernet(self, element) -> Fernet:
+        digest = hashlib.sha256(self.group.serialize(element)).digest()
+        return Fernet(base64.urlsafe_b64encode(digest))
+
+    def wrap_key(self, aes_key: bytes, policy: str) -> dict:
+        message = self.group.random(GT)
+        ciphertext = self.encrypt(message, policy)
+        return {
+            "engine": ENGINE_NAME,
+            "policy": policy,
+            "encrypted_key": self._fernet(message).encrypt(aes_key),
+            "abe_ciphertext": self.dump_ciphertext(ciphertext),
+        }
+
+    def unwrap_key(self, struct: dict, key: dict) -> bytes:
+        ciphertext = struct.get("_abe_ct") or self.load_ciphertext(struct)
+        message = self.decrypt(ciphertext, key)
+        return self._fernet(message).decrypt(struct["encrypted_key"])
+
+    def dump_ciphertext(self, ciphertext: dict) -> dict:
+        dump = self._serialize
+        return {
+            "C_tilde": dump(ciphertext["C_tilde"]),
+            "C": dump(ciphertext["C"]),
+            "leaves": [[dump(c), dump(c_prime)] for c, c_prime in ciphertext["leaves"]],
+        }
+
+    def load_ciphertext(self, struct: dict) -> dict:
+        """Deserialize a wrapped key's ciphertext (the tree is rebuilt from its policy)."""
+        data = struct["abe_ciphertext"]
+        load = self._deserialize
+        return {
+            "tree": parse_policy(struct["policy"]),
+            "C_tilde": load(data["C_tilde"]),
+            "C": load(data["C"]),
+            "leaves": [(load(c), load(c_prime)) for c, c_prime in data["leaves"]],
+        }
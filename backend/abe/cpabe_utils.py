@@ -1,6 +1,20 @@
 import base64   #encoding technique
+import functools
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
 from cryptography.fernet import Fernet    #symmetric authenticated encryption
 
+from backend.abe.decision_cache import get_decision_cache
+
+logger = logging.getLogger(__name__)
+
 
 def generate_master_key():
     """Return a master key (demo)."""
@@ -15,53 +29,396 @@ def generate_user_key(master_key, attributes):
     }
 
 
+# Policy language
+# - attribute tokens such as `role:admin` or `dept:IT`; matching is
+#   case-insensitive and `dept:`/`department:` name the same attribute
+# - AND / OR (case-insensitive) and nested parentheses
+# - AND binds looser than OR: `a OR b AND c` means `(a OR b) AND c`
+#   (the precedence of the original split-based evaluator)
+# - threshold gates: `2 of (role:admin, dept:IT, clearance:high)`
+# - comparisons on ranked attributes: `clearance >= medium`
+#   (operators <, <=, >, >=, =; ranks are listed in RANKED_ATTRIBUTES)
+# Policies are compiled once into a tree plus an evaluation closure and
+# cached by policy string (POLICY_CACHE_SIZE entries, LRU).
+POLICY_CACHE_SIZE = int(os.getenv("POLICY_CACHE_SIZE") or "4096")
+
+# Ordered values (lowest first) of attributes that support comparisons
+RANKED_ATTRIBUTES: Dict[str, Tuple[str, ...]] = {
+    "clearance": ("low", "medium", "high"),
+}
+
+_TOKEN_RE = re.compile(r"\(|\)|,|>=|<=|[<>=]|[^\s(),<>=]+")
+_KEYWORDS = {"and", "or"}
+_COMPARISONS = {
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "=": lambda a, b: a == b,
+}
+_DELIMITERS = {"(", ")", ",", *_COMPARISONS}
+
+
+class PolicySyntaxError(ValueError):
+    """Raised when a policy string cannot be parsed."""
+
+
+@dataclass(frozen=True)
+class PolicyNode:
+    """Node of a compiled policy tree.
+
+    op is "attr" (leaf, `attr` holds the normalized token), "and", "or" or
+    "threshold" (satisfied when at least `k` children are). Comparisons on
+    ranked attributes compile to an "or" of the qualifying values.
+    """
+
+    op: str
+    children: Tuple["PolicyNode", ...] = ()
+    attr: Optional[str] = None
+    k: int = 0
+
+
+@dataclass(frozen=True)
+class CompiledPolicy:
+    source: str
+    tree: PolicyNode
+    attributes: FrozenSet[str]
+    evaluate: Callable[[FrozenSet[str]], bool]
+    canonical: str = ""
+
+    def __call__(self, attributes: FrozenSet[str]) -> bool:
+        """Evaluate against attributes already normalized with normalize_attributes."""
+        return self.evaluate(attributes)
+
+
+@functools.lru_cache(maxsize=POLICY_CACHE_SIZE)
+def normalize_attribute(token: str) -> str:
+    """Canonical form of an attribute token (`Department: IT` -> `dept:it`)."""
+    t = " ".join((token or "").split()).lower()
+    if t.startswith("department:"):
+        return "dept:" + t.split(":", 1)[1]
+    return t
+
+
+def normalize_attributes(attributes) -> FrozenSet[str]:
+    """Normalize a user's attribute tokens once, for repeated evaluation."""
+    return frozenset(normalize_attribute(a) for a in (attributes or ()))
+
+
+def attribute_fingerprint(attributes) -> str:
+    """Stable hash of a normalized attribute set; users with equal sets share it."""
+    canonical = "\n".join(sorted(normalize_attributes(attributes)))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+class _PolicyParser:
+    def __init__(self, policy: str) -> None:
+        self.tokens = _TOKEN_RE.findall(policy or "")
+        self.pos = 0
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _keyword(self) -> Optional[str]:
+        tok = self._peek()
+        return tok.lower() if tok is not None and tok.lower() in _KEYWORDS else None
+
+    def parse(self) -> PolicyNode:
+        if not self.tokens:
+            raise PolicySyntaxError("Empty policy")
+        node = self._and_expr()
+        if self._peek() is not None:
+            raise PolicySyntaxError(f"Unexpected token {self._peek()!r}")
+        return node
+
+    def _and_expr(self) -> PolicyNode:
+        parts = [self._or_expr()]
+        while self._keyword() == "and":
+            self.pos += 1
+            parts.append(self._or_expr())
+        return _combine("and", parts)
+
+    def _or_expr(self) -> PolicyNode:
+        parts = [self._primary()]
+        while self._keyword() == "or":
+            self.pos += 1
+            parts.append(self._primary())
+        return _combine("or", parts)
+
+    def _expect(self, token: str) -> None:
+        if self._peek() != token:
+            raise PolicySyntaxError(f"Expected {token!r}")
+        self.pos += 1
+
+    def _lookahead(self, offset: int) -> Optional[str]:
+        pos = self.pos + offset
+        return self.tokens[pos] if pos < len(self.tokens) else None
+
+    def _primary(self) -> PolicyNode:
+        tok = self._peek()
+        if tok is None:
+            raise PolicySyntaxError("Unexpected end of policy")
+        if tok == "(":
+            self.pos += 1
+            node = self._and_expr()
+            self._expect(")")
+            return node
+        if tok in _DELIMITERS or self._keyword():
+            raise PolicySyntaxError(f"Unexpected token {tok!r}")
+
+        nxt = self._lookahead(1)
+        if tok.isdigit() and nxt is not None and nxt.lower() == "of":
+            return self._threshold()
+        if nxt in _COMPARISONS:
+            return self._comparison()
+
+        # An attribute token may span several words (e.g. `dept:Human Resources`).
+        words = []
+        while self._peek() is not None and self._peek() not in _DELIMITERS and not self._keyword():
+            words.append(self._peek())
+            self.pos += 1
+        return PolicyNode("attr", attr=normalize_attribute(" ".join(words)))
+
+    def _threshold(self) -> PolicyNode:
+        k = int(self._peek())
+        self.pos += 2
+        self._expect("(")
+        children = [self._and_expr()]
+        while self._peek() == ",":
+            self.pos += 1
+            children.append(self._and_expr())
+        self._expect(")")
+
+        if not 1 <= k <= len(children):
+            raise PolicySyntaxError(f"Threshold {k} of {len(children)} can never be satisfied")
+        if k == 1:
+            return _combine("or", children)
+        if k == len(children):
+            return _combine("and", children)
+        return PolicyNode("threshold", children=tuple(children), k=k)
+
+    def _comparison(self) -> PolicyNode:
+        name = self._peek().lower()
+        op = self._lookahead(1)
+        value = self._lookahead(2)
+        self.pos += 3
+
+        ranks = RANKED_ATTRIBUTES.get(name)
+        if ranks is None:
+            raise PolicySyntaxError(f"Attribute {name!r} is not ranked")
+        if value is None or value.lower() not in ranks:
+            raise PolicySyntaxError(f"Unknown {name} value {value!r}")
+
+        bound = ranks.index(value.lower())
+        allowed = [v for i, v in enumerate(ranks) if _COMPARISONS[op](i, bound)]
+        if not allowed:
+            raise PolicySyntaxError(f"Comparison {name} {op} {value} can never be satisfied")
+        return _combine("or", [PolicyNode("attr", attr=f"{name}:{v}") for v in allowed])
+
+
+def _combine(op: str, parts: List[PolicyNode]) -> PolicyNode:
+    if len(parts) == 1:
+        return parts[0]
+    children: List[PolicyNode] = []
+    for part in parts:
+        # Flatten nested nodes of the same operator: (a AND b) AND c -> a AND b AND c
+        children.extend(part.children if part.op == op else (part,))
+    return PolicyNode(op, children=tuple(children))
+
+
+def _policy_attributes(node: PolicyNode) -> FrozenSet[str]:
+    if node.op == "attr":
+        return frozenset((node.attr,))
+    return frozenset().union(*(_policy_attributes(c) for c in node.children))
+
+
+def _to_closure(node: PolicyNode) -> Callable[[FrozenSet[str]], bool]:
+    if node.op == "attr":
+        attr = node.attr
+        return lambda attrs: attr in attrs
+
+    leaves = frozenset(c.attr for c in node.children if c.op == "attr")
+    subtrees = tuple(_to_closure(c) for c in node.children if c.op != "attr")
+
+    if node.op == "threshold":
+        return _threshold_closure(node.k, tuple(_to_closure(c) for c in node.children))
+
+    if node.op == "and":
+        if not subtrees:
+            return leaves.issubset
+        return lambda attrs: leaves <= attrs and all(f(attrs) for f in subtrees)
+
+    if not subtrees:
+        return lambda attrs: not leaves.isdisjoint(attrs)
+    return lambda attrs: (not leaves.isdisjoint(attrs)) or any(f(attrs) for f in subtrees)
+
+
+def _threshold_closure(k: int, gates: Tuple[Callable[[FrozenSet[str]], bool], ...]):
+    total = len(gates)
+
+    def evaluate(attrs: FrozenSet[str]) -> bool:
+        # Short-circuit as soon as the outcome is decided either way.
+        needed, remaining = k, total
+        for gate in gates:
+            if gate(attrs):
+                needed -= 1
+                if needed == 0:
+                    return True
+            remaining -= 1
+            if remaining < needed:
+                return False
+        return False
+
+    return evaluate
+
+
+def parse_policy(policy: str) -> PolicyNode:
+    """Parse a policy string into a PolicyNode tree (raises PolicySyntaxError)."""
+    return _PolicyParser(policy).parse()
+
+
+def _canonical(node: PolicyNode, nested: bool = False) -> str:
+    if node.op == "attr":
+        return node.attr
+    if node.op == "threshold":
+        members = sorted(_canonical(c) for c in node.children)
+        return f"{node.k} of ({', '.join(members)})"
+
+    members = sorted({_canonical(c, nested=True) for c in node.children})
+    if len(members) == 1:
+        return _canonical(node.children[0], nested)
+    text = f" {node.op.upper()} ".join(members)
+    return f"({text})" if nested else text
+
+
+@functools.lru_cache(maxsize=POLICY_CACHE_SIZE)
+def canonical_policy(policy: str) -> str:
+    """Canonical text of a policy (raises PolicySyntaxError if malformed).
+
+    Equivalent spellings that differ only in case, spacing, redundant
+    parentheses, operand order, duplicates or `dept:`/`department:` map to the
+    same string, so it can be used as a key for the policies table and caches.
+    """
+    return _canonical(parse_policy(policy))
+
+
+@functools.lru_cache(maxsize=POLICY_CACHE_SIZE)
+def compile_policy(policy: str) -> CompiledPolicy:
+    """Compile (and cache) a policy string; raises PolicySyntaxError if malformed."""
+    tree = parse_policy(policy)
+    return CompiledPolicy(
+        source=policy,
+        tree=tree,
+        attributes=_policy_attributes(tree),
+        evaluate=_to_closure(tree),
+        canonical=_canonical(tree),
+    )
+
+
 def policy_satisfied(attributes, policy):
-    """Return True if attribute tokens satisfy the policy (supports AND/OR)."""
-    def _normalize_token(token: str) -> str:
-        return (token or "").strip().lower()
-
-    def _variants(token: str):
-        t = _normalize_token(token)
-        if t.startswith("department:"):
-            return {t, "dept:" + t.split(":", 1)[1]}
-        if t.startswith("dept:"):
-            return {t, "department:" + t.split(":", 1)[1]}
-        return {t}
-
-    # Normalize attribute set (case-insensitive)
-    normalized_attrs = {_normalize_token(a) for a in (attributes or set())}
-
-    # Remove extra spaces
-    policy = (policy or "").replace("  ", " ")
-    
-    # Split by AND first (AND has lower precedence)
-    and_parts = policy.split(" AND ")
-    
-    for and_part in and_parts:
-        and_part = and_part.strip()
-        
-        # Remove parentheses if present
-        if and_part.startswith("(") and and_part.endswith(")"):
-            and_part = and_part[1:-1]
-        
-        # Split by OR (each OR part is an alternative)
-        or_parts = and_part.split(" OR ")
-        or_parts = [p.strip() for p in or_parts]
-        
-        # For this AND group, at least one OR part must match
-        group_ok = False
-        for part in or_parts:
-            if _variants(part) & normalized_attrs:
-                group_ok = True
-                break
-        if not group_ok:
-            return False
-    
-    return True
+    """Return True if attribute tokens satisfy the policy (AND/OR, `k of (...)`, ranked comparisons)."""
+    try:
+        compiled = compile_policy(policy or "")
+    except PolicySyntaxError:
+        return False
+
+    attrs = normalize_attributes(attributes)
+    # Users with identical attribute sets share one cached decision per policy
+    return get_decision_cache().decide(attrs, compiled.canonical, lambda: compiled.evaluate(attrs))
+
+
+# Key wrapping engine (ABE_ENGINE)
+# - "demo" (default): the AES key is Fernet-encrypted and the Fernet key is
+#   stored alongside it; access is gated by the policy check only
+# - "bsw07": real CP-ABE (backend/abe/bsw07.py, needs charm-crypto); the
+#   AES key can only be unwrapped with a key for satisfying attributes.
+#   ABE_DECRYPT_STRATEGY selects "minimal" (default) or "full" decryption.
+# Stored structs record their engine, so both kinds can be unwrapped.
+#
+# The bsw07 public and master parameters (including the master secret) are
+# kept in ABE_PARAMS_PATH, outside the storage tree, in a file readable by
+# the server's user only (0600). The server itself runs keygen for the
+# attributes of the logged-in user, so in this demo CP-ABE does not enforce
+# anything beyond the policy check: it shows the scheme, it is not an
+# access-control boundary against someone with access to the server.
+ABE_PARAMS_PATH = os.getenv("ABE_PARAMS_PATH") or os.path.join(
+    os.getenv("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config"),
+    "secure-data-sharing",
+    "abe_params.json",
+)
+# Where older versions kept the parameters (moved to ABE_PARAMS_PATH on first use)
+LEGACY_ABE_PARAMS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "storage", "abe_params.json"
+)
+
+_abe_engine = None
+
+
+def _load_abe_params(path: str) -> Optional[dict]:
+    """Read the saved bsw07 parameters, moving them out of the legacy location."""
+    if not os.path.exists(path) and os.path.exists(LEGACY_ABE_PARAMS_PATH):
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        shutil.move(LEGACY_ABE_PARAMS_PATH, path)
+        logger.warning("Moved CP-ABE parameters from %s to %s", LEGACY_ABE_PARAMS_PATH, path)
+    if not os.path.exists(path):
+        return None
+    os.chmod(path, 0o600)
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _save_abe_params(path: str, params: dict) -> Optional[dict]:
+    """Create the parameter file (0600); returns the saved params if another
+    process created it first."""
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        return _load_abe_params(path)
+    with os.fdopen(fd, "w") as f:
+        json.dump(params, f)
+    return None
+
+
+def get_abe_engine(required: bool = False):
+    """Return the CP-ABE engine selected by ABE_ENGINE, or None for demo mode.
+
+    With `required=True` the bsw07 engine is returned regardless of ABE_ENGINE
+    (used to unwrap keys that were wrapped by it).
+    """
+    global _abe_engine
+
+    if not required and (os.getenv("ABE_ENGINE") or "demo").strip().lower() != "bsw07":
+        return None
+
+    if _abe_engine is None:
+        from backend.abe.bsw07 import PairingGroup, BSW07Engine
+
+        if PairingGroup is None:
+            if required:
+                raise RuntimeError("charm-crypto is required to unwrap bsw07 keys")
+            logger.warning("ABE_ENGINE=bsw07 but charm-crypto is not installed; using demo key wrapping")
+            return None
+
+        strategy = (os.getenv("ABE_DECRYPT_STRATEGY") or "minimal").strip().lower()
+        params = _load_abe_params(ABE_PARAMS_PATH)
+        engine = BSW07Engine(params=params, strategy=strategy)
+        if params is None:
+            existing = _save_abe_params(ABE_PARAMS_PATH, engine.export_params())
+            if existing is not None:
+                # Set up concurrently by another worker: use its keys
+                engine = BSW07Engine(params=existing, strategy=strategy)
+        _abe_engine = engine
+
+    return _abe_engine
 
 
 def encrypt_aes_key(aes_key: bytes, policy: str):
-    """Encrypt an AES key (gated by a policy string)."""
+    """Encrypt an AES key under a policy (demo Fernet gate or CP-ABE, see ABE_ENGINE)."""
+    engine = get_abe_engine()
+    if engine is not None:
+        return engine.wrap_key(aes_key, policy)
+
     fernet_key = Fernet.generate_key()
     fernet = Fernet(fernet_key)
 
@@ -74,10 +431,45 @@ def encrypt_aes_key(aes_key: bytes, policy: str):
     }
 
 
+def serialize_key_struct(struct: dict) -> bytes:
+    """JSON for storing an encrypt_aes_key result (in-memory "_" fields dropped)."""
+    return json.dumps({
+        name: value.decode() if isinstance(value, (bytes, bytearray)) else value
+        for name, value in struct.items()
+        if not name.startswith("_")
+    }).encode()
+
+
+def load_key_struct(stored) -> dict:
+    """Parse a stored key struct (JSON bytes/str or dict) for repeated decryption.
+
+    The Fernet instance (demo) or deserialized ABE ciphertext (bsw07) is built
+    once and kept under "_fernet" / "_abe_ct", so callers that cache the
+    struct skip re-parsing and key setup on every download.
+    """
+    if isinstance(stored, (bytes, bytearray)):
+        stored = stored.decode()
+    struct = json.loads(stored) if isinstance(stored, str) else dict(stored)
+    if struct.get("engine") == "bsw07":
+        struct["_abe_ct"] = get_abe_engine(required=True).load_ciphertext(struct)
+    else:
+        struct["_fernet"] = Fernet(struct["fernet_key"])
+    return struct
+
+
 def decrypt_aes_key(ciphertext, user_key):
-    """Decrypt an AES key if the user's attributes satisfy the policy."""
+    """Decrypt an AES key if the user's attributes satisfy the policy.
+
+    For bsw07 structs `user_key` may carry an "abe_key" from keygen; otherwise
+    the engine derives (and caches) the key for the user's attributes.
+    """
     if not policy_satisfied(user_key["attributes"], ciphertext["policy"]):
         raise Exception("Access Denied: Attributes do not satisfy policy")
 
-    fernet = Fernet(ciphertext["fernet_key"])
+    if ciphertext.get("engine") == "bsw07":
+        engine = get_abe_engine(required=True)
+        abe_key = user_key.get("abe_key") or engine.user_key(user_key["attributes"])
+        return engine.unwrap_key(ciphertext, abe_key)
+
+    fernet = ciphertext.get("_fernet") or Fernet(ciphertext["fernet_key"])
     return fernet.decrypt(ciphertext["encrypted_key"])
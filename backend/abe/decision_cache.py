@@ -0,0 +1,111 @@
+"""Bounded cache of policy decisions shared by users with equal attributes.
+
+Decisions are keyed by (attribute set, policy key). The attribute set is the
+user's normalized attributes as a frozenset, so every user with the same
+role/department/clearance shares one entry per policy. The policy key is the
+policy's canonical text rather than its `policies.id`: this is deliberate.
+policy_satisfied() receives policy strings, and the canonical text comes with
+the compiled policy, so a check needs no database lookup. Interning maps
+canonical text 1:1 to a policy id, so the two keys identify the same entries.
+Entries for a policy are dropped with invalidate_policy() when the policy is
+retired or its meaning changes.
+
+The least recently used entry is evicted first.
+
+Environment:
+- DECISION_CACHE_SIZE: max entries (default 65536)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+
+
+class DecisionCache:
+    def __init__(self, max_entries: int = 65536) -> None:
+        self.max_entries = max_entries
+
+        self._entries: "OrderedDict[Tuple[Hashable, Hashable], bool]" = OrderedDict()
+        # policy key -> attribute sets with a cached decision, for invalidation
+        self._by_policy: Dict[Hashable, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop(self, key: Tuple[Hashable, Hashable]) -> None:
+        if self._entries.pop(key, None) is None:
+            return
+        attribute_sets = self._by_policy.get(key[1])
+        if attribute_sets is not None:
+            attribute_sets.discard(key[0])
+            if not attribute_sets:
+                del self._by_policy[key[1]]
+
+    def decide(self, attributes: Hashable, policy_key: Hashable, compute: Callable[[], bool]) -> bool:
+        """Return the cached decision, calling `compute()` on a miss.
+
+        `attributes` is the normalized attribute frozenset (any hashable
+        identifying the attribute set works).
+        """
+        key = (attributes, policy_key)
+        with self._lock:
+            decision = self._entries.get(key)
+            if decision is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return decision
+            self.misses += 1
+
+        decision = bool(compute())
+
+        with self._lock:
+            self._entries[key] = decision
+            self._entries.move_to_end(key)
+            self._by_policy.setdefault(policy_key, set()).add(attributes)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return decision
+
+    def invalidate_policy(self, policy_key: Hashable) -> int:
+        """Drop every decision for a policy; returns the number removed."""
+        with self._lock:
+            attribute_sets = list(self._by_policy.get(policy_key, ()))
+            for attributes in attribute_sets:
+                self._drop((attributes, policy_key))
+            return len(attribute_sets)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_policy.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "policies": len(self._by_policy),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+# Singleton instance
+_decision_cache: Optional[DecisionCache] = None
+
+
+def get_decision_cache() -> DecisionCache:
+    """Get or create the process-wide decision cache"""
+    global _decision_cache
+
+    if _decision_cache is None:
+        _decision_cache = DecisionCache(max_entries=int(os.getenv("DECISION_CACHE_SIZE") or "65536"))
+
+    return _decision_cache
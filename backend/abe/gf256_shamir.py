@@ -0,0 +1,118 @@
+"""Byte-wise Shamir secret sharing over GF(2^8).
+
+Each byte of the secret is shared with its own random polynomial, so secrets
+of any length (a wrapped-key struct, not just a 32-byte AES key) are split
+without truncation or bignum arithmetic. Field arithmetic uses log/exp tables
+(AES polynomial x^8 + x^4 + x^3 + x + 1, generator 3), and all bytes are
+processed at once: multiplying every byte by a constant is one
+bytes.translate() with that constant's 256-byte table, and addition (XOR) of
+two byte strings is a single big-integer XOR.
+"""
+
+from __future__ import annotations
+
+import functools
+import secrets
+from typing import List, Sequence, Tuple
+
+_EXP = [0] * 510
+_LOG = [0] * 256
+
+_value = 1
+for _power in range(255):
+    _EXP[_power] = _EXP[_power + 255] = _value
+    _LOG[_value] = _power
+    # multiply by the generator 3: v * 2 ^ v, reduced by the AES polynomial
+    _doubled = _value << 1
+    if _doubled & 0x100:
+        _doubled ^= 0x11B
+    _value = _doubled ^ _value
+del _value, _power, _doubled
+
+
+def gf_mul(a: int, b: int) -> int:
+    if a == 0 or b == 0:
+        return 0
+    return _EXP[_LOG[a] + _LOG[b]]
+
+
+def gf_inv(a: int) -> int:
+    if a == 0:
+        raise ZeroDivisionError("0 has no inverse in GF(256)")
+    return _EXP[255 - _LOG[a]]
+
+
+@functools.lru_cache(maxsize=256)
+def mul_table(c: int) -> bytes:
+    """Translation table mapping every byte b to b * c."""
+    return bytes(gf_mul(b, c) for b in range(256))
+
+
+def _xor(a: bytes, b: bytes) -> bytes:
+    n = len(a)
+    return (int.from_bytes(a, "big") ^ int.from_bytes(b, "big")).to_bytes(n, "big")
+
+
+def split(secret: bytes, threshold: int, shares: int) -> List[bytes]:
+    """Split `secret` into `shares` byte strings (same length), any `threshold` of which recover it.
+
+    Share i (0-based) is the polynomial evaluated at x = i + 1.
+    """
+    if not 1 <= threshold <= shares <= 255:
+        raise ValueError("Need 1 <= threshold <= shares <= 255")
+    secret = bytes(secret)
+    # Highest-degree coefficients first, constant term (the secret) last
+    coefficients = [secrets.token_bytes(len(secret)) for _ in range(threshold - 1)]
+    coefficients.append(secret)
+
+    out = []
+    for x in range(1, shares + 1):
+        table = mul_table(x)
+        y = coefficients[0]
+        for coeff in coefficients[1:]:
+            y = _xor(y.translate(table), coeff)
+        out.append(y)
+    return out
+
+
+@functools.lru_cache(maxsize=1024)
+def lagrange_basis(indices: Tuple[int, ...]) -> Tuple[int, ...]:
+    """Lagrange basis coefficients at x = 0 for 1-based share indices (GF(256))."""
+    basis = []
+    for i, xi in enumerate(indices):
+        numerator, denominator = 1, 1
+        for j, xj in enumerate(indices):
+            if i != j:
+                numerator = gf_mul(numerator, xj)
+                denominator = gf_mul(denominator, xi ^ xj)
+        basis.append(gf_mul(numerator, gf_inv(denominator)))
+    return tuple(basis)
+
+
+def combine(share_values: Sequence[bytes], indices: Sequence[int]) -> bytes:
+    """Recover the secret from shares taken at the given 1-based indices."""
+    if len(set(indices)) != len(indices):
+        raise ValueError("Share indices must be distinct")
+    basis = lagrange_basis(tuple(indices))
+    secret = bytes(len(share_values[0]))
+    for share, coeff in zip(share_values, basis):
+        secret = _xor(secret, bytes(share).translate(mul_table(coeff)))
+    return secret
+
+
+def split_batch(secret_values: Sequence[bytes], threshold: int, shares: int) -> List[List[bytes]]:
+    """Split many secrets; returns one list of `shares` byte strings per secret.
+
+    The secrets are concatenated and split as one byte string (bytes are
+    independent), then each share is sliced back per secret.
+    """
+    secret_values = [bytes(v) for v in secret_values]
+    joined = split(b"".join(secret_values), threshold, shares)
+
+    out = []
+    offset = 0
+    for secret in secret_values:
+        end = offset + len(secret)
+        out.append([share[offset:end] for share in joined])
+        offset = end
+    return out
@@ -0,0 +1,168 @@
+"""In-process cache of parsed key structs (and optionally unwrapped AES keys).
+
+Entries are keyed by (file_id, key_version), where the version is a digest of
+the stored `encrypted_key` blob, so re-wrapping a file's key never serves a
+stale entry. The policy is still checked on every lookup; only parsing, Fernet
+setup and (optionally) the unwrap itself are skipped.
+
+Environment:
+- KEY_CACHE_SIZE: max entries (default 1024)
+- KEY_CACHE_TTL_SECONDS: entry lifetime (default 300)
+- KEY_CACHE_UNWRAPPED: also keep unwrapped AES keys (default false); they are
+  held in bytearrays and zeroized on eviction
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from backend.abe.cpabe_utils import decrypt_aes_key, load_key_struct, policy_satisfied
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    value = (os.getenv(name) or "").strip().lower()
+    if not value:
+        return default
+    return value in {"1", "true", "yes", "y", "on"}
+
+
+def key_version(stored_key: bytes) -> str:
+    """Version tag of a stored key struct (changes whenever the blob changes)."""
+    if isinstance(stored_key, str):
+        stored_key = stored_key.encode()
+    return hashlib.sha256(stored_key).hexdigest()[:16]
+
+
+def _zeroize(buf: Optional[bytearray]) -> None:
+    if buf is not None:
+        buf[:] = bytes(len(buf))
+
+
+@dataclass
+class _Entry:
+    struct: Dict[str, Any]
+    expires_at: float
+    aes_key: Optional[bytearray] = None
+
+
+class KeyCache:
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0, cache_unwrapped: bool = False) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.cache_unwrapped = cache_unwrapped
+
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            _zeroize(entry.aes_key)
+            self.evictions += 1
+
+    def _lookup(self, file_id: str, version: str) -> Tuple[Optional[_Entry], Optional[bytes]]:
+        """Return the live entry and a copy of its unwrapped key.
+
+        The key is copied under the lock: eviction zeroizes the bytearray in
+        place, so reading it after releasing the lock could return zeros.
+        """
+        key = (file_id, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry, (bytes(entry.aes_key) if entry.aes_key is not None else None)
+
+    def _insert(self, file_id: str, version: str, entry: _Entry) -> None:
+        with self._lock:
+            # Older versions of the same file can never be requested again.
+            for key in [k for k in self._entries if k[0] == file_id and k[1] != version]:
+                self._drop(key)
+            self._entries[(file_id, version)] = entry
+            self._entries.move_to_end((file_id, version))
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def unwrap(self, file_id, stored_key: bytes, user_key: dict) -> bytes:
+        """Policy-check `user_key` and return the file's AES key.
+
+        Raises the same "Access Denied" exception as decrypt_aes_key.
+        """
+        file_id = str(file_id)
+        version = key_version(stored_key)
+
+        entry, aes_key = self._lookup(file_id, version)
+        if entry is None:
+            entry = _Entry(struct=load_key_struct(stored_key), expires_at=time.monotonic() + self.ttl_seconds)
+            self._insert(file_id, version, entry)
+
+        if aes_key is not None:
+            if not policy_satisfied(user_key["attributes"], entry.struct["policy"]):
+                raise Exception("Access Denied: Attributes do not satisfy policy")
+            return aes_key
+
+        plaintext = decrypt_aes_key(entry.struct, user_key)
+        if self.cache_unwrapped:
+            with self._lock:
+                # Only keep the key on entries still in the cache, so eviction zeroizes it.
+                if self._entries.get((file_id, version)) is entry and entry.aes_key is None:
+                    entry.aes_key = bytearray(plaintext)
+        return plaintext
+
+    def invalidate(self, file_id) -> None:
+        """Drop every cached version for a file (call on delete / policy change)."""
+        file_id = str(file_id)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == file_id]:
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "cache_unwrapped": self.cache_unwrapped,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Singleton instance
+_key_cache: Optional[KeyCache] = None
+
+
+def get_key_cache() -> KeyCache:
+    """Get or create the key cache (configured from the environment)."""
+    global _key_cache
+
+    if _key_cache is None:
+        _key_cache = KeyCache(
+            max_entries=int(os.getenv("KEY_CACHE_SIZE") or "1024"),
+            ttl_seconds=float(os.getenv("KEY_CACHE_TTL_SECONDS") or "300"),
+            cache_unwrapped=_env_bool("KEY_CACHE_UNWRAPPED", default=False),
+        )
+
+    return _key_cache
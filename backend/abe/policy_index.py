@@ -0,0 +1,339 @@
+"""Bitset attribute index for bulk policy evaluation.
+
+Attribute tokens (`role:admin`, `dept:it`, ...) are interned as bit positions,
+and every compiled policy is converted to CNF: a list of clause bitmasks that
+must each intersect the user's attribute mask. Answering "which files can this
+user open" is then one integer AND per clause, evaluated once per distinct
+policy rather than once per file. With NumPy installed, all policies can be
+evaluated in a single vectorized pass.
+"""
+
+from __future__ import annotations
+
+import itertools
+import math
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from backend.abe.cpabe_utils import (
+    CompiledPolicy,
+    PolicyNode,
+    PolicySyntaxError,
+    compile_policy,
+    normalize_attributes,
+)
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+# Policies whose CNF would exceed this many clauses are evaluated with their
+# compiled closure instead of bitmasks.
+MAX_CNF_CLAUSES = 256
+
+# Below this many distinct policies the pure-Python loop is faster than NumPy.
+NUMPY_MIN_POLICIES = 512
+
+_WORD_BITS = 64
+_WORD_MASK = (1 << _WORD_BITS) - 1
+
+
+class AttributeIndex:
+    """Interns normalized attribute tokens as bit positions."""
+
+    def __init__(self) -> None:
+        self._bits: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._bits)
+
+    def bit(self, token: str) -> int:
+        pos = self._bits.get(token)
+        if pos is None:
+            pos = len(self._bits)
+            self._bits[token] = pos
+        return 1 << pos
+
+    def mask(self, attributes: Iterable[str]) -> int:
+        """Bitmask of already-normalized attributes; unknown tokens are ignored
+        (no policy references them, so they cannot satisfy any clause)."""
+        m = 0
+        for token in attributes:
+            pos = self._bits.get(token)
+            if pos is not None:
+                m |= 1 << pos
+        return m
+
+
+def _or_cnf(cnfs: Sequence[Tuple[int, ...]], limit: int) -> Optional[set]:
+    """CNF of an OR of CNFs: (A1 AND A2) OR B1 -> (A1 OR B1) AND (A2 OR B1)."""
+    clauses = {0}
+    for cnf in cnfs:
+        clauses = {a | b for a in clauses for b in cnf}
+        if len(clauses) > limit:
+            return None
+    return clauses
+
+
+def policy_to_cnf(node: PolicyNode, index: AttributeIndex, limit: int = MAX_CNF_CLAUSES) -> Optional[Tuple[int, ...]]:
+    """Convert a policy tree into CNF clause masks, or None if it grows past `limit`."""
+    if node.op == "attr":
+        return (index.bit(node.attr),)
+
+    child_cnfs = []
+    for child in node.children:
+        cnf = policy_to_cnf(child, index, limit)
+        if cnf is None:
+            return None
+        child_cnfs.append(cnf)
+
+    if node.op == "and":
+        clauses = {c for cnf in child_cnfs for c in cnf}
+    elif node.op == "or":
+        clauses = _or_cnf(child_cnfs, limit)
+    elif node.op == "threshold":
+        # k of n  ==  every subset of n - k + 1 children has a satisfied member
+        size = len(child_cnfs) - node.k + 1
+        if math.comb(len(child_cnfs), size) > limit:
+            return None
+        clauses = set()
+        for subset in itertools.combinations(child_cnfs, size):
+            sub = _or_cnf(subset, limit)
+            if sub is None:
+                return None
+            clauses |= sub
+    else:
+        return None
+
+    if clauses is None:
+        return None
+
+    if len(clauses) > limit:
+        return None
+    # Absorption: a clause that is a superset of another clause is redundant.
+    ordered = sorted(clauses, key=lambda c: bin(c).count("1"))
+    kept: List[int] = []
+    for c in ordered:
+        if not any((k & c) == k for k in kept):
+            kept.append(c)
+    return tuple(kept)
+
+
+class PolicyBitsetIndex:
+    """Registry of distinct policies compiled to bitmask CNF."""
+
+    def __init__(self, max_cnf_clauses: int = MAX_CNF_CLAUSES) -> None:
+        self.attributes = AttributeIndex()
+        self.max_cnf_clauses = max_cnf_clauses
+
+        self._positions: Dict[str, int] = {}
+        # Per policy: CNF clauses, or None when evaluated by closure / malformed
+        self._clauses: List[Optional[Tuple[int, ...]]] = []
+        self._compiled: List[Optional[CompiledPolicy]] = []
+
+        self._matrix = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def register(self, policy: str) -> int:
+        """Return the position of `policy`, compiling it on first sight."""
+        pos = self._positions.get(policy)
+        if pos is not None:
+            return pos
+
+        with self._lock:
+            pos = self._positions.get(policy)
+            if pos is not None:
+                return pos
+            try:
+                compiled: Optional[CompiledPolicy] = compile_policy(policy or "")
+            except PolicySyntaxError:
+                compiled = None
+            clauses = None
+            if compiled is not None:
+                clauses = policy_to_cnf(compiled.tree, self.attributes, self.max_cnf_clauses)
+
+            pos = len(self._clauses)
+            self._clauses.append(clauses)
+            self._compiled.append(compiled)
+            self._positions[policy] = pos
+            self._matrix = None
+            return pos
+
+    def evaluate_all(self, attributes: Iterable[str], use_numpy: Optional[bool] = None) -> List[bool]:
+        """Evaluate every registered policy for one attribute set (by position)."""
+        attrs = normalize_attributes(attributes)
+        user_mask = self.attributes.mask(attrs)
+
+        count = len(self._clauses)
+        if use_numpy is None:
+            use_numpy = np is not None and count >= NUMPY_MIN_POLICIES
+        if use_numpy and np is not None:
+            results = self._evaluate_numpy(user_mask)
+        else:
+            results = [
+                clauses is not None and all(c & user_mask for c in clauses)
+                for clauses in self._clauses[:count]
+            ]
+
+        # Policies without a bitmask form fall back to their compiled closure.
+        for pos in range(count):
+            if self._clauses[pos] is None and self._compiled[pos] is not None:
+                results[pos] = self._compiled[pos].evaluate(attrs)
+        return results
+
+    def accessible(
+        self,
+        rows: Iterable[Tuple[Any, str]],
+        attributes: Iterable[str],
+        use_numpy: Optional[bool] = None,
+    ) -> List[Any]:
+        """Return the ids of `(id, policy)` rows whose policy the attributes satisfy."""
+        rows = list(rows)
+        positions = [self.register(policy) for _, policy in rows]
+        results = self.evaluate_all(attributes, use_numpy=use_numpy)
+        return [row_id for (row_id, _), pos in zip(rows, positions) if results[pos]]
+
+    def _build_matrix(self):
+        """Clause matrix (uint64 words), clause -> policy offsets, and bitmask policies."""
+        with self._lock:
+            if self._matrix is not None and self._matrix[3] == len(self._clauses):
+                return self._matrix
+
+            words = max(1, -(-len(self.attributes) // _WORD_BITS))
+            rows: List[List[int]] = []
+            starts: List[int] = []
+            owners: List[int] = []
+            for pos, clauses in enumerate(self._clauses):
+                if not clauses:
+                    continue
+                starts.append(len(rows))
+                owners.append(pos)
+                for c in clauses:
+                    rows.append([(c >> (_WORD_BITS * w)) & _WORD_MASK for w in range(words)])
+
+            matrix = np.array(rows, dtype=np.uint64).reshape(len(rows), words)
+            self._matrix = (
+                matrix,
+                np.array(starts, dtype=np.intp),
+                np.array(owners, dtype=np.intp),
+                len(self._clauses),
+            )
+            return self._matrix
+
+    def _evaluate_numpy(self, user_mask: int) -> List[bool]:
+        matrix, starts, owners, count = self._build_matrix()
+        results = np.zeros(count, dtype=bool)
+        if len(owners):
+            words = matrix.shape[1]
+            user = np.array(
+                [(user_mask >> (_WORD_BITS * w)) & _WORD_MASK for w in range(words)],
+                dtype=np.uint64,
+            )
+            clause_hit = (matrix & user).any(axis=1)
+            results[owners] = np.logical_and.reduceat(clause_hit, starts)
+        out = results.tolist()
+        out.extend([False] * (len(self._clauses) - count))
+        return out
+
+
+@dataclass
+class PolicyMatrix:
+    """Result of evaluate_policy_matrix.
+
+    `bits` holds one row of `row_bytes` bytes per attribute set; bit j of a row
+    (byte j // 8, mask 0x80 >> j % 8, as numpy.packbits) is set when that
+    attribute set satisfies policy j.
+    """
+
+    rows: int
+    columns: int
+    row_bytes: int
+    bits: bytes
+    distinct_rows: int
+    invalid_policies: List[int] = field(default_factory=list)
+
+    def get(self, row: int, column: int) -> bool:
+        byte = self.bits[row * self.row_bytes + column // 8]
+        return bool(byte & (0x80 >> (column % 8)))
+
+    def row(self, row: int) -> List[bool]:
+        return [self.get(row, column) for column in range(self.columns)]
+
+
+def _pack_row(values: Sequence[bool], row_bytes: int) -> bytes:
+    packed = bytearray(row_bytes)
+    for column, value in enumerate(values):
+        if value:
+            packed[column // 8] |= 0x80 >> (column % 8)
+    return bytes(packed)
+
+
+def evaluate_policy_matrix(
+    attribute_sets: Sequence[Iterable[str]],
+    policies: Sequence[str],
+    use_numpy: Optional[bool] = None,
+) -> PolicyMatrix:
+    """Evaluate every policy for every attribute set (policy dry-runs).
+
+    Each distinct policy is compiled once into a private bitset index and each
+    distinct attribute set (after normalization) is evaluated once; the rows
+    of identical sets share the result. Malformed policies evaluate to False
+    and are listed in `invalid_policies`.
+    """
+    index = PolicyBitsetIndex()
+    positions = [index.register(policy) for policy in policies]
+    invalid = [column for column, pos in enumerate(positions) if index._compiled[pos] is None]
+
+    groups: Dict[FrozenSet[str], int] = {}
+    row_groups = [groups.setdefault(normalize_attributes(attrs), len(groups)) for attrs in attribute_sets]
+
+    columns = len(policies)
+    row_bytes = -(-columns // 8)
+    distinct = [
+        [results[pos] for pos in positions]
+        for results in (index.evaluate_all(attrs, use_numpy=use_numpy) for attrs in groups)
+    ]
+
+    if np is not None and (use_numpy or (use_numpy is None and len(row_groups) * columns >= NUMPY_MIN_POLICIES)):
+        table = np.packbits(np.array(distinct, dtype=bool).reshape(len(distinct), columns), axis=1)
+        bits = table[np.array(row_groups, dtype=np.intp)].tobytes() if row_groups else b""
+    else:
+        packed = [_pack_row(values, row_bytes) for values in distinct]
+        bits = b"".join(packed[group] for group in row_groups)
+
+    return PolicyMatrix(
+        rows=len(row_groups),
+        columns=columns,
+        row_bytes=row_bytes,
+        bits=bits,
+        distinct_rows=len(groups),
+        invalid_policies=invalid,
+    )
+
+
+def accessible_ids(
+    rows: Sequence[Tuple[Any, str]],
+    attributes: Iterable[str],
+    use_numpy: Optional[bool] = None,
+) -> List[Any]:
+    """Convenience wrapper over the shared index."""
+    return get_policy_index().accessible(rows, attributes, use_numpy=use_numpy)
+
+
+# Singleton instance
+_policy_index: Optional[PolicyBitsetIndex] = None
+
+
+def get_policy_index() -> PolicyBitsetIndex:
+    """Get or create the process-wide policy bitset index"""
+    global _policy_index
+
+    if _policy_index is None:
+        _policy_index = PolicyBitsetIndex()
+
+    return _policy_index
@@ -0,0 +1,94 @@
+"""Interning of access policies.
+
+Each distinct policy is stored once in the `policies` table under its
+canonical text (see canonical_policy) and files reference it by id, so
+equivalent spellings share one row and per-policy work (compilation, bitset
+evaluation, decision caching) is done once per distinct policy.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Dict
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.abe.cpabe_utils import PolicySyntaxError, canonical_policy
+from backend.database import add_missing_columns, engine
+from backend.models import Policy, SecureFile
+
+# Rows updated per commit when backfilling policy_id
+BACKFILL_BATCH_SIZE = 500
+
+# canonical text -> policy id (ids are never reused, so entries never go stale)
+_ids: Dict[str, int] = {}
+_ids_lock = threading.Lock()
+
+
+def ensure_policy_schema(bind=None) -> None:
+    """Add secure_files.policy_id to databases created before the policies table."""
+    bind = bind or engine
+    add_missing_columns("secure_files", {"policy_id": "INTEGER REFERENCES policies(id)"}, bind=bind)
+    with bind.begin() as conn:
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_secure_files_policy_id ON secure_files (policy_id)"
+        ))
+
+
+def intern_policy(db: Session, policy: str) -> Policy:
+    """Return the Policy row for `policy`, inserting it on first use.
+
+    Raises PolicySyntaxError when the policy is malformed.
+    """
+    canonical = canonical_policy(policy)
+
+    policy_id = _ids.get(canonical)
+    if policy_id is not None:
+        row = db.get(Policy, policy_id)
+        if row is not None and row.canonical == canonical:
+            return row
+
+    row = db.query(Policy).filter(Policy.canonical == canonical).first()
+    if row is None:
+        try:
+            with db.begin_nested():
+                row = Policy(canonical=canonical)
+                db.add(row)
+        except IntegrityError:
+            # Inserted concurrently by another request
+            row = db.query(Policy).filter(Policy.canonical == canonical).one()
+
+    with _ids_lock:
+        _ids[canonical] = row.id
+    return row
+
+
+def backfill_policy_ids(db: Session, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """Intern policies of files that have no policy_id yet; returns rows updated.
+
+    Files with malformed policies are left unlinked (they deny all access).
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        rows = (
+            db.query(SecureFile)
+            .filter(SecureFile.policy_id.is_(None), SecureFile.id > last_id)
+            .order_by(SecureFile.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return updated
+
+        for secure_file in rows:
+            last_id = secure_file.id
+            try:
+                secure_file.policy_id = intern_policy(db, secure_file.policy).id
+                updated += 1
+            except PolicySyntaxError:
+                continue
+        db.commit()
+
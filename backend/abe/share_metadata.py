@@ -0,0 +1,236 @@
+"""Database-backed share metadata with a read-through, cross-process cache.
+
+Which authorities hold a file's shares (and the threshold / Shamir mode) is
+stored in the `share_sets` table, so any API worker can reconstruct a key no
+matter which worker handled the upload, including after restarts.
+
+Each process keeps a read-through cache of share sets. Writers bump the
+"share_sets" row of `cache_generations` in the same transaction; readers
+compare it with the generation their cache was filled under (at most every
+SHARE_METADATA_CHECK_SECONDS, default 1) and drop the cache when another
+process changed or deleted share sets. Misses always go to the database, so
+new uploads from other workers are visible immediately. The generation row is
+created once (at startup, or before a process's first write) so concurrent
+first writes only ever update it.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from backend.database import upsert_rows
+from backend.models import CacheGeneration, ShareSet
+
+GENERATION_NAME = "share_sets"
+
+
+def _row_to_dict(row: ShareSet) -> Dict[str, Any]:
+    return {
+        "authorities": json.loads(row.authorities),
+        "threshold": row.threshold,
+        "total_shares": row.total_shares,
+        "mode": row.mode,
+        "created_at": row.created_at,
+    }
+
+
+class ShareMetadataStore:
+    def __init__(self, session_factory: Optional[Callable] = None, check_interval: float = 1.0) -> None:
+        if session_factory is None:
+            from backend.database import SessionLocal
+
+            session_factory = SessionLocal
+        self._session_factory = session_factory
+        self.check_interval = check_interval
+
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._generation: Optional[int] = None
+        self._checked_at = 0.0
+        self._seeded = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _read_generation(db) -> int:
+        generation = db.execute(
+            select(CacheGeneration.generation).where(CacheGeneration.name == GENERATION_NAME)
+        ).scalar()
+        return generation or 0
+
+    def ensure_generation(self) -> None:
+        """Create the generation row if it does not exist yet.
+
+        Runs in its own transaction; a worker that loses the race to insert it
+        gets an IntegrityError and simply uses the row the winner created.
+        """
+        if self._seeded:
+            return
+        db = self._session_factory()
+        try:
+            if db.get(CacheGeneration, GENERATION_NAME) is None:
+                db.add(CacheGeneration(name=GENERATION_NAME, generation=0))
+                try:
+                    db.commit()
+                except IntegrityError:
+                    db.rollback()
+        finally:
+            db.close()
+        self._seeded = True
+
+    @classmethod
+    def _bump_generation(cls, db) -> int:
+        """Increment the generation in the current transaction; returns the value before.
+
+        The UPDATE runs before any read, so the transaction holds the write
+        lock from its first statement: concurrent writers queue on it instead
+        of failing to upgrade a read lock (SQLITE_BUSY) or losing an increment.
+        Call it first in the transaction. The row must exist (ensure_generation()).
+        """
+        db.execute(
+            update(CacheGeneration)
+            .where(CacheGeneration.name == GENERATION_NAME)
+            .values(generation=CacheGeneration.generation + 1)
+        )
+        return cls._read_generation(db) - 1
+
+    def _after_write(self, before: int) -> None:
+        """Adopt our own bump without discarding the cache, unless other
+        processes wrote since we last synced."""
+        with self._lock:
+            if self._generation is not None and before != self._generation:
+                self._cache.clear()
+                self.invalidations += 1
+            self._generation = before + 1
+            self._checked_at = time.monotonic()
+
+    def _sync(self, db, force: bool = False) -> None:
+        """Drop the local cache if another process bumped the generation."""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return
+        generation = self._read_generation(db)
+        with self._lock:
+            if self._generation is not None and generation != self._generation:
+                self._cache.clear()
+                self.invalidations += 1
+            self._generation = generation
+            self._checked_at = now
+
+    def get(self, file_id: str) -> Optional[Dict[str, Any]]:
+        file_id = str(file_id)
+        db = self._session_factory()
+        try:
+            self._sync(db)
+            with self._lock:
+                meta = self._cache.get(file_id)
+                if meta is not None:
+                    self.hits += 1
+                    return meta
+                self.misses += 1
+
+            row = db.get(ShareSet, file_id)
+            if row is None:
+                return None
+            meta = _row_to_dict(row)
+            with self._lock:
+                self._cache[file_id] = meta
+            return meta
+        finally:
+            db.close()
+
+    def save_many(
+        self,
+        file_ids: Iterable[str],
+        authorities: List[str],
+        threshold: int,
+        total_shares: int,
+        mode: str,
+    ) -> None:
+        """Record (or replace) the share sets of several files in one transaction."""
+        created_at = datetime.utcnow().isoformat()
+        meta = {
+            "authorities": list(authorities),
+            "threshold": threshold,
+            "total_shares": total_shares,
+            "mode": mode,
+            "created_at": created_at,
+        }
+        encoded = json.dumps(list(authorities))
+        file_ids = [str(f) for f in file_ids]
+
+        self.ensure_generation()
+        db = self._session_factory()
+        try:
+            before = self._bump_generation(db)
+            upsert_rows(db, ShareSet, [
+                {
+                    "file_id": file_id,
+                    "authorities": encoded,
+                    "threshold": threshold,
+                    "total_shares": total_shares,
+                    "mode": mode,
+                    "created_at": created_at,
+                }
+                for file_id in file_ids
+            ], ["file_id"])
+            db.commit()
+        finally:
+            db.close()
+
+        self._after_write(before)
+        with self._lock:
+            for file_id in file_ids:
+                self._cache[file_id] = dict(meta)
+
+    def delete_many(self, file_ids: Iterable[str]) -> None:
+        file_ids = [str(f) for f in file_ids]
+        self.ensure_generation()
+        db = self._session_factory()
+        try:
+            before = self._bump_generation(db)
+            db.query(ShareSet).filter(ShareSet.file_id.in_(file_ids)).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+        self._after_write(before)
+        with self._lock:
+            for file_id in file_ids:
+                self._cache.pop(file_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "generation": self._generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+# Singleton instance
+_share_metadata: Optional[ShareMetadataStore] = None
+
+
+def get_share_metadata() -> ShareMetadataStore:
+    """Get or create the process-wide share metadata store"""
+    global _share_metadata
+
+    if _share_metadata is None:
+        _share_metadata = ShareMetadataStore(
+            check_interval=float(os.getenv("SHARE_METADATA_CHECK_SECONDS") or "1"),
+        )
+
+    return _share_metadata
@@ -0,0 +1,302 @@
+"""Storage for authorities' Shamir key shares.
+
+Backends (SHARE_STORE):
+- "database" (default): the `key_shares` table of the application database,
+  next to the share metadata (`share_sets`). Every API worker that can read
+  the metadata can read the shares too.
+- "sqlite": the same table in a dedicated SQLite file (SHARE_STORE_PATH,
+  default storage/shares.db). Host-local: only workers on the same machine
+  can reconstruct keys.
+- "directory": the legacy layout, storage/shares/<file_id>/<authority>.share
+  (one small base64 file per share).
+
+An upload writes all of a file's shares in one transaction and a
+reconstruction reads them with one query (except for the directory layout).
+Share values are the raw share bytes; the base64 encoding is only used on
+disk by the directory layout. migrate_share_store() copies one store into
+another; migrate_legacy_shares() moves storage/shares/ and storage/shares.db
+into the database store at startup.
+"""
+
+from __future__ import annotations
+
+import base64
+import os
+import shutil
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterable, Mapping, Optional
+
+from backend.database import upsert_rows
+from backend.models import KeyShare
+
+_STORAGE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "storage"))
+LEGACY_SHARES_DIR = os.path.join(_STORAGE_DIR, "shares")
+LEGACY_SHARES_DB = os.path.join(_STORAGE_DIR, "shares.db")
+
+
+class DirectoryShareStore:
+    """Legacy layout: one base64 file per (file, authority)."""
+
+    name = "directory"
+
+    def __init__(self, base_dir: str = LEGACY_SHARES_DIR) -> None:
+        self.base_dir = base_dir
+
+    def _file_dir(self, file_id: str) -> str:
+        return os.path.join(self.base_dir, str(file_id))
+
+    def put_many(self, file_id: str, shares: Mapping[str, bytes]) -> None:
+        file_dir = self._file_dir(file_id)
+        os.makedirs(file_dir, exist_ok=True)
+        for authority, share in shares.items():
+            with open(os.path.join(file_dir, f"{authority}.share"), "wb") as f:
+                f.write(base64.b64encode(share))
+
+    def get_many(self, file_id: str, authorities: Iterable[str]) -> Dict[str, bytes]:
+        out = {}
+        file_dir = self._file_dir(file_id)
+        for authority in authorities:
+            try:
+                with open(os.path.join(file_dir, f"{authority}.share"), "rb") as f:
+                    out[authority] = base64.b64decode(f.read())
+            except (OSError, ValueError):
+                continue
+        return out
+
+    def delete(self, file_id: str) -> None:
+        shutil.rmtree(self._file_dir(file_id), ignore_errors=True)
+
+    def delete_many(self, file_ids: Iterable[str]) -> None:
+        for file_id in file_ids:
+            self.delete(file_id)
+
+    def file_ids(self) -> Iterable[str]:
+        if not os.path.isdir(self.base_dir):
+            return []
+        return [name for name in os.listdir(self.base_dir) if os.path.isdir(self._file_dir(name))]
+
+    def get_all(self, file_id: str) -> Dict[str, bytes]:
+        file_dir = self._file_dir(file_id)
+        authorities = [n[: -len(".share")] for n in os.listdir(file_dir) if n.endswith(".share")]
+        return self.get_many(file_id, authorities)
+
+
+class SQLiteShareStore:
+    """All shares in one SQLite table (WAL mode, batched per file)."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS key_shares ("
+                " file_id TEXT NOT NULL,"
+                " authority TEXT NOT NULL,"
+                " share BLOB NOT NULL,"
+                " PRIMARY KEY (file_id, authority)"
+                ") WITHOUT ROWID"
+            )
+
+    def put_many(self, file_id: str, shares: Mapping[str, bytes]) -> None:
+        self.put_batch({file_id: shares})
+
+    def put_batch(self, shares_by_file: Mapping[str, Mapping[str, bytes]]) -> None:
+        """Write shares of many files in one transaction."""
+        rows = [
+            (str(file_id), authority, bytes(share))
+            for file_id, shares in shares_by_file.items()
+            for authority, share in shares.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO key_shares (file_id, authority, share) VALUES (?, ?, ?)", rows
+            )
+
+    def get_many(self, file_id: str, authorities: Iterable[str]) -> Dict[str, bytes]:
+        wanted = set(authorities)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT authority, share FROM key_shares WHERE file_id = ?", (str(file_id),)
+            ).fetchall()
+        return {authority: bytes(share) for authority, share in rows if authority in wanted}
+
+    def delete(self, file_id: str) -> None:
+        self.delete_many([file_id])
+
+    def delete_many(self, file_ids: Iterable[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM key_shares WHERE file_id = ?", [(str(f),) for f in file_ids])
+
+    def file_ids(self) -> Iterable[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT file_id FROM key_shares").fetchall()
+        return [file_id for (file_id,) in rows]
+
+    def get_all(self, file_id: str) -> Dict[str, bytes]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT authority, share FROM key_shares WHERE file_id = ?", (str(file_id),)
+            ).fetchall()
+        return {authority: bytes(share) for authority, share in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class DatabaseShareStore:
+    """Shares in the application database (`key_shares`), shared by all workers."""
+
+    name = "database"
+
+    def __init__(self, session_factory: Optional[Callable] = None) -> None:
+        if session_factory is None:
+            from backend.database import SessionLocal
+
+            session_factory = SessionLocal
+        self._session_factory = session_factory
+
+    def put_many(self, file_id: str, shares: Mapping[str, bytes]) -> None:
+        self.put_batch({file_id: shares})
+
+    def put_batch(self, shares_by_file: Mapping[str, Mapping[str, bytes]]) -> None:
+        """Write shares of many files in one transaction."""
+        rows = [
+            {"file_id": str(file_id), "authority": authority, "share": bytes(share)}
+            for file_id, shares in shares_by_file.items()
+            for authority, share in shares.items()
+        ]
+        db = self._session_factory()
+        try:
+            upsert_rows(db, KeyShare, rows, ["file_id", "authority"])
+            db.commit()
+        finally:
+            db.close()
+
+    def _rows(self, file_id: str, authorities: Optional[Iterable[str]] = None) -> Dict[str, bytes]:
+        db = self._session_factory()
+        try:
+            query = db.query(KeyShare.authority, KeyShare.share).filter(KeyShare.file_id == str(file_id))
+            if authorities is not None:
+                query = query.filter(KeyShare.authority.in_(list(authorities)))
+            return {authority: bytes(share) for authority, share in query.all()}
+        finally:
+            db.close()
+
+    def get_many(self, file_id: str, authorities: Iterable[str]) -> Dict[str, bytes]:
+        return self._rows(file_id, authorities)
+
+    def get_all(self, file_id: str) -> Dict[str, bytes]:
+        return self._rows(file_id)
+
+    def delete(self, file_id: str) -> None:
+        self.delete_many([file_id])
+
+    def delete_many(self, file_ids: Iterable[str]) -> None:
+        db = self._session_factory()
+        try:
+            db.query(KeyShare).filter(KeyShare.file_id.in_([str(f) for f in file_ids])).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def file_ids(self) -> Iterable[str]:
+        db = self._session_factory()
+        try:
+            return [file_id for (file_id,) in db.query(KeyShare.file_id).distinct().all()]
+        finally:
+            db.close()
+
+
+def migrate_share_store(source, target, batch_files: int = 1000) -> int:
+    """Copy every share of `source` (any store with file_ids()/get_all()) into `target`.
+
+    Idempotent (existing shares are overwritten with the same value); returns
+    the number of files migrated.
+    """
+    put_batch = getattr(target, "put_batch", None)
+    pending: Dict[str, Dict[str, bytes]] = {}
+    migrated = 0
+
+    def flush() -> None:
+        if put_batch is not None:
+            put_batch(pending)
+        else:
+            for file_id, shares in pending.items():
+                target.put_many(file_id, shares)
+        pending.clear()
+
+    for file_id in source.file_ids():
+        pending[file_id] = source.get_all(file_id)
+        migrated += 1
+        if len(pending) >= batch_files:
+            flush()
+    flush()
+    return migrated
+
+
+def migrate_directory_store(source: DirectoryShareStore, target, batch_files: int = 1000) -> int:
+    """Copy every share from the legacy directory layout into `target`."""
+    return migrate_share_store(source, target, batch_files)
+
+
+def _retire(path: str) -> None:
+    """Rename a migrated legacy store to <path>.migrated[.N]; nothing is deleted."""
+    target = path + ".migrated"
+    suffix = 1
+    while os.path.exists(target):
+        target = f"{path}.migrated.{suffix}"
+        suffix += 1
+    os.replace(path, target)
+
+
+def migrate_legacy_shares(store=None) -> int:
+    """Move storage/shares/ (and storage/shares.db) into the configured store (startup helper).
+
+    storage/shares.db is only moved into the database store. After a
+    successful copy each source is renamed to *.migrated, so the scan runs
+    only once. Returns the number of files migrated.
+    """
+    store = store or get_share_store()
+    migrated = 0
+    if store.name != "directory" and os.path.isdir(LEGACY_SHARES_DIR):
+        migrated += migrate_directory_store(DirectoryShareStore(LEGACY_SHARES_DIR), store)
+        _retire(LEGACY_SHARES_DIR)
+    if store.name == "database" and os.path.isfile(LEGACY_SHARES_DB):
+        source = SQLiteShareStore(LEGACY_SHARES_DB)
+        try:
+            migrated += migrate_share_store(source, store)
+        finally:
+            source.close()
+        _retire(LEGACY_SHARES_DB)
+    return migrated
+
+
+# Singleton instance
+_share_store = None
+
+
+def get_share_store():
+    """Get or create the share store selected by SHARE_STORE"""
+    global _share_store
+
+    if _share_store is None:
+        kind = (os.getenv("SHARE_STORE") or "database").strip().lower()
+        if kind == "database":
+            _share_store = DatabaseShareStore()
+        elif kind == "directory":
+            _share_store = DirectoryShareStore(os.getenv("SHARE_STORE_PATH") or LEGACY_SHARES_DIR)
+        elif kind == "sqlite":
+            _share_store = SQLiteShareStore(os.getenv("SHARE_STORE_PATH") or LEGACY_SHARES_DB)
+        else:
+            raise ValueError(f"Unsupported share store: {kind}")
+
+    return _share_store
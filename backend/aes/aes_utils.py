@@ -1,9 +1,97 @@
 import os
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives import padding
 from cryptography.hazmat.backends import default_backend
 
 
+# Stored blob formats
+#
+# legacy  : iv(16) + AES-CBC ciphertext
+# version 1 (AES-CBC, streamed):
+#   magic(4) + version(1) + chunk_size(4, big-endian) + iv(16) + ciphertext
+#   The header is 25 bytes, so a complete v1 blob never has a length that is a
+#   multiple of 16, while a legacy blob always does.
+# version 2 (AES-GCM, segmented):
+#   magic(4) + version(1) + segment_size(4, big-endian) + nonce_prefix(7)
+#   followed by segments of segment_size plaintext bytes, each sealed on its own
+#   as ciphertext + tag(16). Segment i starts at 16 + i * (segment_size + 16), so
+#   the header plus the blob size is a complete index of the segments. Every
+#   segment uses the header as associated data and the nonce
+#   nonce_prefix(7) + index(4) + last_flag(1), so segments cannot be reordered,
+#   moved between blobs or dropped from the end without failing authentication.
+BLOB_MAGIC = b"SDSE"
+BLOB_VERSION_CBC_STREAM = 1
+BLOB_VERSION_GCM_SEGMENTED = 2
+BLOB_HEADER_SIZE = 4 + 1 + 4 + 16
+SEGMENTED_HEADER_SIZE = 4 + 1 + 4 + 7
+GCM_TAG_SIZE = 16
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        value = int((os.getenv(name) or "").strip())
+    except ValueError:
+        return default
+    return value if value > 0 else default
+
+
+# Parallel segment processing (segmented blobs only)
+# - AES_PARALLEL_THRESHOLD: blobs at least this large are sealed/opened across
+#   a worker pool (bytes, default 8 MiB)
+# - AES_PARALLEL_WORKERS: worker threads (default: CPU count); 1 disables it
+# - AES_PARALLEL_BATCH_SEGMENTS: segments handed to the pool per batch; bounds
+#   memory to about batch x segment size (default: 4 x workers)
+# AES-GCM in the cryptography library releases the GIL, so threads scale.
+AES_PARALLEL_THRESHOLD = _env_int("AES_PARALLEL_THRESHOLD", 8 * 1024 * 1024)
+AES_PARALLEL_WORKERS = _env_int("AES_PARALLEL_WORKERS", os.cpu_count() or 1)
+AES_PARALLEL_BATCH_SEGMENTS = _env_int("AES_PARALLEL_BATCH_SEGMENTS", 4 * AES_PARALLEL_WORKERS)
+
+_segment_executor: Optional[ThreadPoolExecutor] = None
+_segment_executor_lock = threading.Lock()
+
+
+def get_segment_executor() -> Optional[Executor]:
+    """Return the shared worker pool for segment crypto, or None if disabled."""
+    global _segment_executor
+
+    if AES_PARALLEL_WORKERS <= 1:
+        return None
+    with _segment_executor_lock:
+        if _segment_executor is None:
+            _segment_executor = ThreadPoolExecutor(
+                max_workers=AES_PARALLEL_WORKERS,
+                thread_name_prefix="aes-segment",
+            )
+    return _segment_executor
+
+
+def parallel_executor_for(size: Optional[int]) -> Optional[Executor]:
+    """Worker pool to use for a blob of `size` bytes (None below the threshold)."""
+    if size is None or size < AES_PARALLEL_THRESHOLD:
+        return None
+    return get_segment_executor()
+
+
+def parallel_batch_size(segment_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Read size that feeds a full batch of segments to the worker pool."""
+    return segment_size * AES_PARALLEL_BATCH_SEGMENTS
+
+
+def _map_ordered(func: Callable, jobs: Sequence[tuple], executor: Optional[Executor]) -> List[bytes]:
+    """Apply `func` to every job, in parallel when an executor is given; keeps order."""
+    if executor is None or len(jobs) < 2:
+        return [func(*job) for job in jobs]
+    return list(executor.map(lambda job: func(*job), jobs))
+
+
 def generate_aes_key():
     """
     Generates a 256-bit (32-byte) AES key
@@ -11,25 +99,22 @@ def generate_aes_key():
     return os.urandom(32)
 
 
-def encrypt_blob(file_bytes: bytes, key: bytes) -> bytes:
+def encrypt_blob(file_bytes: bytes, key: bytes, chunk_size: int = DEFAULT_CHUNK_SIZE) -> bytes:
     """Encrypt file bytes into a single storable blob.
 
-    Format (AES-CBC): iv(16) + ciphertext
+    Format (AES-GCM, segmented): header(16) + sealed segments
     """
-    iv, ciphertext = encrypt_file(file_bytes, key)
-    return iv + ciphertext
+    return b"".join(encrypt_stream([file_bytes], key, chunk_size=chunk_size, size_hint=len(file_bytes)))
 
 
 def decrypt_blob(encrypted_blob: bytes, key: bytes) -> bytes:
-    """Decrypt a storable blob produced by encrypt_blob.
+    """Decrypt a storable blob produced by encrypt_blob or encrypt_stream.
 
-    Format (AES-CBC): iv(16) + ciphertext
+    The format version is detected from the header; legacy blobs in the format
+    iv(16) + ciphertext are still supported.
     """
-    if len(encrypted_blob) < 16:
-        raise ValueError("Invalid AES-CBC blob")
-    iv = encrypted_blob[:16]
-    ciphertext = encrypted_blob[16:]
-    return decrypt_file(ciphertext, key, iv)
+    size = len(encrypted_blob)
+    return b"".join(decrypt_stream([encrypted_blob], key, total_size=size, executor=parallel_executor_for(size)))
 
 
 def encrypt_file(file_bytes: bytes, key: bytes):
@@ -71,3 +156,474 @@ def decrypt_file(ciphertext: bytes, key: bytes, iv: bytes):
     plaintext = unpadder.update(padded_plaintext) + unpadder.finalize()
 
     return plaintext
+
+
+def detect_blob_version(prefix: bytes, total_size: Optional[int] = None) -> Optional[int]:
+    """Return the header version found in `prefix`, 0 for legacy blobs, or None if
+    more bytes are needed to decide.
+
+    When the total blob size is known, legacy iv(16) + ciphertext blobs are never
+    mistaken for version 1 blobs (they are always a multiple of the AES block size).
+    """
+    if len(prefix) < 5:
+        return None if total_size is None or total_size > len(prefix) else 0
+    if prefix[:4] != BLOB_MAGIC:
+        return 0
+
+    version = prefix[4]
+    if version == BLOB_VERSION_GCM_SEGMENTED:
+        return version
+    if version == BLOB_VERSION_CBC_STREAM:
+        if total_size is not None and total_size % 16 == 0:
+            return 0
+        return version
+    return 0
+
+
+def _segment_nonce(nonce_prefix: bytes, index: int, last: bool) -> bytes:
+    return nonce_prefix + index.to_bytes(4, "big") + (b"\x01" if last else b"\x00")
+
+
+class StreamEncryptor:
+    """Incremental AES-256-CBC encryptor (blob version 1).
+
+    Feed plaintext with update() and close with finalize(); the first bytes
+    returned carry the blob header. Only one partial block is buffered, so
+    memory use does not grow with the size of the input.
+    """
+
+    def __init__(self, key: bytes, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        self.chunk_size = chunk_size
+        self.iv = os.urandom(16)
+
+        cipher = Cipher(algorithms.AES(key), modes.CBC(self.iv), backend=default_backend())
+        self._encryptor = cipher.encryptor()
+        self._padder = padding.PKCS7(128).padder()
+        self._header_sent = False
+
+    def header(self) -> bytes:
+        return (
+            BLOB_MAGIC
+            + bytes([BLOB_VERSION_CBC_STREAM])
+            + self.chunk_size.to_bytes(4, "big")
+            + self.iv
+        )
+
+    def _with_header(self, data: bytes) -> bytes:
+        if self._header_sent:
+            return data
+        self._header_sent = True
+        return self.header() + data
+
+    def update(self, data: bytes) -> bytes:
+        return self._with_header(self._encryptor.update(self._padder.update(data)))
+
+    def finalize(self) -> bytes:
+        tail = self._encryptor.update(self._padder.finalize()) + self._encryptor.finalize()
+        return self._with_header(tail)
+
+
+class SegmentedEncryptor:
+    """Incremental AES-256-GCM encryptor (blob version 2).
+
+    Plaintext is cut into fixed-size segments that are sealed independently.
+    At most one segment is buffered: a full segment is held back until more
+    input arrives, because the final segment is flagged in its nonce.
+
+    With an `executor`, the segments of each update() call are sealed in
+    parallel; output order is unchanged.
+    """
+
+    def __init__(
+        self,
+        key: bytes,
+        segment_size: int = DEFAULT_CHUNK_SIZE,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        if segment_size <= 0:
+            raise ValueError("segment_size must be positive")
+        self.segment_size = segment_size
+        self.nonce_prefix = os.urandom(7)
+
+        self._aead = AESGCM(key)
+        self._executor = executor
+        self._header = (
+            BLOB_MAGIC
+            + bytes([BLOB_VERSION_GCM_SEGMENTED])
+            + segment_size.to_bytes(4, "big")
+            + self.nonce_prefix
+        )
+        self._buffer = bytearray()
+        self._index = 0
+        self._header_sent = False
+
+    def header(self) -> bytes:
+        return self._header
+
+    def _with_header(self, data: bytes) -> bytes:
+        if self._header_sent:
+            return data
+        self._header_sent = True
+        return self._header + data
+
+    def _seal(self, data: bytes, index: int, last: bool) -> bytes:
+        nonce = _segment_nonce(self.nonce_prefix, index, last)
+        return self._aead.encrypt(nonce, data, self._header)
+
+    def _job(self, data: bytes, last: bool = False) -> tuple:
+        index = self._index
+        self._index += 1
+        return data, index, last
+
+    def update(self, data: bytes) -> bytes:
+        size = self.segment_size
+        view = memoryview(data)
+        pos, end = 0, len(view)
+        jobs = []
+
+        while pos < end:
+            if len(self._buffer) == size:
+                jobs.append(self._job(bytes(self._buffer)))
+                self._buffer.clear()
+            if not self._buffer and end - pos > size:
+                # Whole segments are sealed straight from the input.
+                jobs.append(self._job(bytes(view[pos:pos + size])))
+                pos += size
+                continue
+            take = min(size - len(self._buffer), end - pos)
+            self._buffer += view[pos:pos + take]
+            pos += take
+
+        return self._with_header(b"".join(_map_ordered(self._seal, jobs, self._executor)))
+
+    def finalize(self) -> bytes:
+        out = self._seal(*self._job(bytes(self._buffer), last=True))
+        self._buffer.clear()
+        return self._with_header(out)
+
+
+class SegmentedLayout:
+    """Segment index of a version 2 blob, computed from its header and size."""
+
+    def __init__(self, header: bytes, blob_size: int) -> None:
+        if len(header) < SEGMENTED_HEADER_SIZE or detect_blob_version(header) != BLOB_VERSION_GCM_SEGMENTED:
+            raise ValueError("Not a segmented AES-GCM blob")
+
+        self.header = bytes(header[:SEGMENTED_HEADER_SIZE])
+        self.segment_size = int.from_bytes(self.header[5:9], "big")
+        self.nonce_prefix = self.header[9:SEGMENTED_HEADER_SIZE]
+        self.blob_size = blob_size
+
+        if self.segment_size <= 0:
+            raise ValueError("Invalid segment size in blob header")
+
+        body = blob_size - SEGMENTED_HEADER_SIZE
+        stride = self.segment_size + GCM_TAG_SIZE
+        if body < GCM_TAG_SIZE:
+            raise ValueError("Truncated segmented AES-GCM blob")
+
+        self.segment_count = max(1, -(-body // stride))
+        last_size = body - (self.segment_count - 1) * stride - GCM_TAG_SIZE
+        if last_size < 0 or (last_size == 0 and self.segment_count > 1):
+            raise ValueError("Truncated segmented AES-GCM blob")
+        self.plaintext_size = (self.segment_count - 1) * self.segment_size + last_size
+
+    def segment_span(self, index: int) -> Tuple[int, int]:
+        """Return (offset, length) of sealed segment `index` within the blob."""
+        if not 0 <= index < self.segment_count:
+            raise IndexError("segment index out of range")
+        stride = self.segment_size + GCM_TAG_SIZE
+        offset = SEGMENTED_HEADER_SIZE + index * stride
+        return offset, min(stride, self.blob_size - offset)
+
+    def segments_for_range(self, start: int, stop: int) -> range:
+        """Segment indices covering plaintext bytes [start, stop)."""
+        if start >= stop:
+            return range(0)
+        return range(start // self.segment_size, (stop - 1) // self.segment_size + 1)
+
+    def open_segment(self, key: bytes, index: int, sealed: bytes, aead: Optional[AESGCM] = None) -> bytes:
+        """Authenticate and decrypt one sealed segment."""
+        nonce = _segment_nonce(self.nonce_prefix, index, index == self.segment_count - 1)
+        try:
+            return (aead or AESGCM(key)).decrypt(nonce, sealed, self.header)
+        except InvalidTag:
+            raise ValueError(f"AES-GCM authentication failed for segment {index}")
+
+
+class SegmentedDecryptor:
+    """Incremental decryptor for version 2 blobs.
+
+    Plaintext is only released after its segment has been authenticated. With
+    an `executor`, the segments of each update() call are opened in parallel.
+    """
+
+    def __init__(self, key: bytes, executor: Optional[Executor] = None) -> None:
+        self._aead = AESGCM(key)
+        self._executor = executor
+        self._header: Optional[bytes] = None
+        self._nonce_prefix = b""
+        self._buffer = bytearray()
+        self._index = 0
+        self.segment_size: Optional[int] = None
+
+    def _open(self, sealed: bytes, index: int, last: bool) -> bytes:
+        nonce = _segment_nonce(self._nonce_prefix, index, last)
+        try:
+            return self._aead.decrypt(nonce, sealed, self._header)
+        except InvalidTag:
+            raise ValueError(f"AES-GCM authentication failed for segment {index}")
+
+    def _job(self, sealed: bytes, last: bool = False) -> tuple:
+        index = self._index
+        self._index += 1
+        return sealed, index, last
+
+    def update(self, data: bytes) -> bytes:
+        self._buffer += data
+        if self._header is None:
+            if len(self._buffer) < SEGMENTED_HEADER_SIZE:
+                return b""
+            self._header = bytes(self._buffer[:SEGMENTED_HEADER_SIZE])
+            self.segment_size = int.from_bytes(self._header[5:9], "big")
+            self._nonce_prefix = self._header[9:SEGMENTED_HEADER_SIZE]
+            del self._buffer[:SEGMENTED_HEADER_SIZE]
+
+        stride = self.segment_size + GCM_TAG_SIZE
+        jobs = []
+        pos = 0
+        # A segment is known to be non-final only once bytes beyond it have arrived.
+        while len(self._buffer) - pos > stride:
+            jobs.append(self._job(bytes(self._buffer[pos:pos + stride])))
+            pos += stride
+        if pos:
+            del self._buffer[:pos]
+        return b"".join(_map_ordered(self._open, jobs, self._executor))
+
+    def finalize(self) -> bytes:
+        if self._header is None or len(self._buffer) < GCM_TAG_SIZE:
+            raise ValueError("Truncated segmented AES-GCM blob")
+        out = self._open(*self._job(bytes(self._buffer), last=True))
+        self._buffer.clear()
+        return out
+
+
+class _CBCDecryptor:
+    def __init__(self, key: bytes, iv: bytes) -> None:
+        cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
+        self._decryptor = cipher.decryptor()
+        self._unpadder = padding.PKCS7(128).unpadder()
+
+    def update(self, data: bytes) -> bytes:
+        return self._unpadder.update(self._decryptor.update(data))
+
+    def finalize(self) -> bytes:
+        return self._unpadder.update(self._decryptor.finalize()) + self._unpadder.finalize()
+
+
+class StreamDecryptor:
+    """Incremental decryptor for every stored blob format.
+
+    The format is detected from the first bytes fed to update(). Pass
+    `total_size` when the stored blob size is known so that legacy blobs are
+    never mistaken for version 1 ones.
+    """
+
+    def __init__(
+        self,
+        key: bytes,
+        total_size: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        self._key = key
+        self._total_size = total_size
+        self._executor = executor
+        self._pending = b""
+        self._impl = None
+        self.version: Optional[int] = None
+        self._chunk_size: Optional[int] = None
+
+    @property
+    def legacy(self) -> Optional[bool]:
+        return None if self.version is None else self.version == 0
+
+    @property
+    def chunk_size(self) -> Optional[int]:
+        if isinstance(self._impl, SegmentedDecryptor):
+            return self._impl.segment_size
+        return self._chunk_size
+
+    def _select(self, final: bool = False) -> bytes:
+        """Pick the format once enough bytes are buffered; return leftover output."""
+        data = self._pending
+        total_size = self._total_size
+        if total_size is None and final:
+            total_size = len(data)
+
+        version = detect_blob_version(data, total_size)
+        if version is None:
+            return b""
+        needed = {BLOB_VERSION_CBC_STREAM: BLOB_HEADER_SIZE, 0: 16}.get(version, 0)
+        if len(data) < needed and not final:
+            return b""
+        self._pending = b""
+        self.version = version
+
+        if version == BLOB_VERSION_GCM_SEGMENTED:
+            self._impl = SegmentedDecryptor(self._key, executor=self._executor)
+            return self._impl.update(data)
+
+        if len(data) < needed:
+            raise ValueError("Invalid AES-CBC blob")
+        if version == BLOB_VERSION_CBC_STREAM:
+            self._chunk_size = int.from_bytes(data[5:9], "big")
+            self._impl = _CBCDecryptor(self._key, data[9:BLOB_HEADER_SIZE])
+            return self._impl.update(data[BLOB_HEADER_SIZE:])
+
+        self._impl = _CBCDecryptor(self._key, data[:16])
+        return self._impl.update(data[16:])
+
+    def update(self, data: bytes) -> bytes:
+        if self._impl is None:
+            self._pending += data
+            return self._select()
+        return self._impl.update(data)
+
+    def finalize(self) -> bytes:
+        out = b""
+        if self._impl is None:
+            if not self._pending:
+                raise ValueError("Invalid AES-CBC blob")
+            out = self._select(final=True)
+        return out + self._impl.finalize()
+
+
+def iter_file_chunks(fileobj, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield successive chunks read from a binary file-like object."""
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _rebatch(chunks: Iterable[bytes], batch_size: int) -> Iterator[bytes]:
+    """Coalesce small chunks so each one carries a full batch of segments."""
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) >= batch_size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def encrypt_stream(
+    chunks: Iterable[bytes],
+    key: bytes,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    size_hint: Optional[int] = None,
+) -> Iterator[bytes]:
+    """Encrypt an iterable of plaintext chunks, yielding ciphertext chunks.
+
+    `chunk_size` is the segment size recorded in the header. When `size_hint`
+    reaches AES_PARALLEL_THRESHOLD, segments are sealed across the worker pool
+    in batches. The concatenated output is a storable blob readable by
+    decrypt_blob and decrypt_stream.
+    """
+    executor = parallel_executor_for(size_hint)
+    if executor is not None:
+        chunks = _rebatch(chunks, parallel_batch_size(chunk_size))
+
+    encryptor = SegmentedEncryptor(key, segment_size=chunk_size, executor=executor)
+    for chunk in chunks:
+        out = encryptor.update(chunk)
+        if out:
+            yield out
+    yield encryptor.finalize()
+
+
+def decrypt_stream(
+    chunks: Iterable[bytes],
+    key: bytes,
+    total_size: Optional[int] = None,
+    executor: Optional[Executor] = None,
+) -> Iterator[bytes]:
+    """Decrypt an iterable of blob chunks, yielding plaintext chunks.
+
+    With an `executor`, segments of segmented blobs are opened in parallel.
+    """
+    decryptor = StreamDecryptor(key, total_size=total_size, executor=executor)
+    for chunk in chunks:
+        out = decryptor.update(chunk)
+        if out:
+            yield out
+    out = decryptor.finalize()
+    if out:
+        yield out
+
+
+def decrypt_fileobj(fileobj, key: bytes, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Decrypt a stored blob from a seekable binary file-like object, chunk by chunk.
+
+    Memory use is bounded by a few chunk buffers regardless of the blob size.
+    Blobs above AES_PARALLEL_THRESHOLD are read in larger batches whose
+    segments are opened across the worker pool.
+    """
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(0)
+
+    executor = parallel_executor_for(size)
+    if executor is not None:
+        chunk_size = max(chunk_size, parallel_batch_size())
+    return decrypt_stream(iter_file_chunks(fileobj, chunk_size), key, total_size=size, executor=executor)
+
+
+def read_segmented_layout(fileobj) -> Optional[SegmentedLayout]:
+    """Read the segment index of a stored blob, or None if it is not segmented.
+
+    `fileobj` must be a seekable binary file-like object (local file, GridFS
+    GridOut, io.BytesIO).
+    """
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(0)
+    header = fileobj.read(SEGMENTED_HEADER_SIZE)
+    if detect_blob_version(header, size) != BLOB_VERSION_GCM_SEGMENTED:
+        return None
+    return SegmentedLayout(header, size)
+
+
+def decrypt_range(
+    fileobj,
+    key: bytes,
+    start: int,
+    stop: int,
+    layout: Optional[SegmentedLayout] = None,
+) -> Iterator[bytes]:
+    """Yield plaintext bytes [start, stop) of a segmented blob.
+
+    Only the segments covering the range are read from `fileobj` and decrypted.
+    """
+    layout = layout or read_segmented_layout(fileobj)
+    if layout is None:
+        raise ValueError("Random access requires a segmented AES-GCM blob")
+
+    stop = min(stop, layout.plaintext_size)
+    aead = AESGCM(key)
+    for index in layout.segments_for_range(start, stop):
+        offset, length = layout.segment_span(index)
+        fileobj.seek(offset)
+        sealed = fileobj.read(length)
+        if len(sealed) != length:
+            raise ValueError("Truncated segmented AES-GCM blob")
+        plaintext = layout.open_segment(key, index, sealed, aead=aead)
+
+        seg_start = index * layout.segment_size
+        lo = max(start - seg_start, 0)
+        hi = min(stop - seg_start, len(plaintext))
+        yield plaintext[lo:hi]
@@ -4,24 +4,35 @@ Decentralized access-control routes.
 Integrates blockchain authentication with ABE key management.
 """
 
-import io
+import json
 import mimetypes
 import os
 from typing import Dict, List, Optional
 from urllib.parse import quote
 
 from eth_account.messages import encode_defunct
-from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from web3 import Web3
 
+from backend.abe.cpabe_utils import compile_policy
+from backend.abe.decision_cache import get_decision_cache
+from backend.abe.key_cache import get_key_cache
+from backend.abe.share_metadata import get_share_metadata
+from backend.blockchain.approval_events import get_approval_hub
 from backend.blockchain.blockchain_auth import get_blockchain_service
 from backend.database import SessionLocal
 from backend.models import SecureFile
 
 router = APIRouter(prefix="/api/access", tags=["Decentralized Access"])
 
+# Approval event streams / bulk status reads
+MAX_STREAM_KEYS = 100
+MAX_STATUS_KEYS = 1000
+KEEPALIVE_SECONDS = 15.0
+
 
 def _content_disposition_filename(filename: str) -> str:
     """Build a Content-Disposition header value that is safe for non-ASCII filenames."""
@@ -65,6 +76,14 @@ async def blockchain_status():
             "contract_address": blockchain.contract_address,
             "threshold": blockchain.threshold,
             "total_authorities": len(blockchain.authorities),
+            "approval_index": blockchain.approval_index.stats() if blockchain.approval_index else None,
+            "approval_streams": get_approval_hub().stats(),
+            "rpc": {
+                "batching": blockchain.rpc.batch_supported,
+                "calls": blockchain.rpc.calls,
+                "round_trips": blockchain.rpc.round_trips,
+            },
+            "transactions": blockchain.tx_scheduler.stats(),
         }
     except Exception as e:
         raise HTTPException(
@@ -194,6 +213,88 @@ async def get_approval_status(key_id: str):
     return ApprovalStatusResponse(**status_data)
 
 
+class ApprovalStatusBatchRequest(BaseModel):
+    key_ids: List[str]
+
+
+@router.post("/approval-status")
+async def get_approval_statuses(req: ApprovalStatusBatchRequest):
+    """Status of many keys in one request (one batched RPC round trip at most).
+
+    Keys that cannot be read come back as {"key_id", "error"} entries.
+    """
+    if len(req.key_ids) > MAX_STATUS_KEYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_STATUS_KEYS} key ids per request")
+    try:
+        blockchain = get_blockchain_service()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail={"reason": "contract_misconfigured", "error": str(e)})
+
+    key_ids = list(dict.fromkeys(req.key_ids))
+    statuses = await run_in_threadpool(blockchain.get_approval_statuses, key_ids)
+    return {"statuses": [statuses[k] for k in key_ids]}
+
+
+def _valid_key_id(key_id: str) -> bool:
+    try:
+        return len(bytes.fromhex(key_id.replace("0x", ""))) == 32
+    except ValueError:
+        return False
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.get("/approval-events")
+async def approval_events(request: Request, key_id: List[str] = Query(...)):
+    """Server-sent events: an `approval` message whenever a key's approval count rises.
+
+    Subscribe with `?key_id=0x..&key_id=0x..`. The current status of every key
+    is sent first; the stream ends with a `done` event once all keys are approved.
+    """
+    try:
+        blockchain = get_blockchain_service()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail={"reason": "contract_misconfigured", "error": str(e)})
+
+    key_ids = list(dict.fromkeys(key_id))
+    if len(key_ids) > MAX_STREAM_KEYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_STREAM_KEYS} key ids per stream")
+    invalid = [k for k in key_ids if not _valid_key_id(k)]
+    if invalid:
+        raise HTTPException(status_code=400, detail={"reason": "invalid_key_id", "key_ids": invalid})
+
+    hub = get_approval_hub()
+
+    async def stream():
+        sub = hub.subscribe(key_ids)
+        try:
+            hub.snapshot(sub, await run_in_threadpool(hub.fetch_counts, list(sub.key_ids)))
+            pending = set(sub.key_ids)
+            while pending:
+                changed = await sub.get(KEEPALIVE_SECONDS)
+                if not changed:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                for changed_key, count in changed.items():
+                    status = blockchain.status_for_count(changed_key, count)
+                    if status["is_approved"]:
+                        pending.discard(changed_key)
+                    yield _sse("approval", status)
+            yield _sse("done", {"key_ids": sorted(sub.key_ids)})
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/authorities")
 async def get_authorities_list():
     try:
@@ -208,6 +309,25 @@ async def get_authorities_list():
     }
 
 
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """Hit ratios of the policy decision, compiled policy, key and share metadata caches."""
+    compiled = compile_policy.cache_info()
+    lookups = compiled.hits + compiled.misses
+    return {
+        "decisions": get_decision_cache().stats(),
+        "compiled_policies": {
+            "size": compiled.currsize,
+            "max_entries": compiled.maxsize,
+            "hits": compiled.hits,
+            "misses": compiled.misses,
+            "hit_ratio": (compiled.hits / lookups) if lookups else 0.0,
+        },
+        "keys": get_key_cache().stats(),
+        "share_metadata": get_share_metadata().stats(),
+    }
+
+
 class DecryptionRequest(BaseModel):
     file_id: str
     key_id: str
@@ -238,19 +358,20 @@ async def decrypt_file(req: DecryptionRequest, db=Depends(get_db)):
     if not reconstructed_key:
         return {"decrypted": False, "message": "Key reconstruction failed"}
 
-    from backend.storage.storage_backend import load_encrypted_blob
+    from backend.utils.blob_io import close_after, open_stored_blob, prefetch_first
 
-    encrypted_data = load_encrypted_blob(file_record.file_path)
-
-    decrypted_data = abe.decrypt_file(encrypted_data, reconstructed_key, {})
-    if not decrypted_data:
+    encrypted_blob = open_stored_blob(file_record.file_path)
+    try:
+        decrypted_chunks = prefetch_first(abe.decrypt_file_stream(encrypted_blob, reconstructed_key))
+    except Exception:
+        encrypted_blob.close()
         return {"decrypted": False, "message": "Decryption failed"}
 
-    # Stream decrypted data without persisting plaintext to disk.
+    # Stream decrypted data as it is decrypted, without persisting plaintext to disk.
     mime_type, _ = mimetypes.guess_type(file_record.filename)
     headers = {"Content-Disposition": _content_disposition_filename(file_record.filename)}
     return StreamingResponse(
-        io.BytesIO(decrypted_data),
+        close_after(decrypted_chunks, encrypted_blob),
         media_type=mime_type or "application/octet-stream",
         headers=headers,
     )
@@ -261,26 +382,41 @@ class SimulateApprovalRequest(BaseModel):
     authority_addresses: List[str]
 
 
-@router.post("/simulate-approvals")
-async def simulate_approvals(req: SimulateApprovalRequest):
-    try:
-        blockchain = get_blockchain_service()
-    except Exception as e:
-        raise HTTPException(status_code=503, detail={"reason": "contract_misconfigured", "error": str(e)})
-    results = []
+class SimulateBulkApprovalRequest(BaseModel):
+    key_ids: List[str]
+    authority_addresses: List[str]
+
 
+def _submit_approvals(blockchain, key_ids: List[str], authority_addresses: List[str]) -> List[dict]:
+    """Send approvals from every valid authority (pipelined); one result per address."""
     if not blockchain.check_connection():
         raise HTTPException(status_code=503, detail={"reason": "blockchain_unavailable", "message": "Not connected to Ganache"})
 
-    for addr in req.authority_addresses:
-        if not blockchain.is_authority(addr):
-            results.append({"authority": addr, "tx_hash": None, "error": "Not an authority (per contract)"})
-            continue
+    invalid = [k for k in key_ids if not _valid_key_id(k)]
+    if invalid:
+        raise HTTPException(status_code=400, detail={"reason": "invalid_key_id", "key_ids": invalid})
+
+    try:
+        flags = blockchain.authority_flags(authority_addresses, strict=True)
+    except Exception as e:
+        raise HTTPException(
+            status_code=503,
+            detail={"reason": "authority_lookup_failed", "message": "Could not read authorities() from the contract", "error": str(e)},
+        )
+    valid = [a for a in dict.fromkeys(authority_addresses) if flags.get(a)]
+    submitted = {r["authority"]: r for r in blockchain.approve_keys(key_ids, valid)} if valid else {}
+
+    results = []
+    for addr in authority_addresses:
+        if addr not in submitted:
+            results.append({"authority": addr, "tx_hashes": [], "error": "Not an authority (per contract)"})
+        else:
+            results.append(submitted[addr])
+    return results
 
-        tx, err = blockchain.approve_key(req.key_id, addr)
-        results.append({"authority": addr, "tx_hash": tx, "error": err})
 
-    failed = [r for r in results if not r.get("tx_hash")]
+def _raise_if_failed(results: List[dict]) -> None:
+    failed = [r for r in results if r.get("error") or not (r.get("tx_hash") or r.get("tx_hashes"))]
     if failed:
         raise HTTPException(
             status_code=400,
@@ -291,4 +427,35 @@ async def simulate_approvals(req: SimulateApprovalRequest):
             },
         )
 
+
+@router.post("/simulate-approvals")
+async def simulate_approvals(req: SimulateApprovalRequest):
+    try:
+        blockchain = get_blockchain_service()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail={"reason": "contract_misconfigured", "error": str(e)})
+
+    submitted = await run_in_threadpool(_submit_approvals, blockchain, [req.key_id], req.authority_addresses)
+    results = [
+        {"authority": r["authority"], "tx_hash": (r["tx_hashes"] or [None])[0], "error": r["error"]}
+        for r in submitted
+    ]
+    _raise_if_failed(results)
+    return {"results": results}
+
+
+@router.post("/simulate-approvals/bulk")
+async def simulate_bulk_approvals(req: SimulateBulkApprovalRequest):
+    """Each authority approves all `key_ids` with batched approveKeys transactions."""
+    try:
+        blockchain = get_blockchain_service()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail={"reason": "contract_misconfigured", "error": str(e)})
+
+    key_ids = list(dict.fromkeys(req.key_ids))
+    if len(key_ids) > MAX_STATUS_KEYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_STATUS_KEYS} key ids per request")
+
+    results = await run_in_threadpool(_submit_approvals, blockchain, key_ids, req.authority_addresses)
+    _raise_if_failed(results)
     return {"results": results}
@@ -1,5 +1,6 @@
 # FastAPI imports for building REST APIs
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Header
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 
 # Used to detect MIME type of files (pdf, jpg, etc.)
@@ -8,12 +9,8 @@ import mimetypes
 # SQLAlchemy session handling
 from sqlalchemy.orm import Session
 
-# Used for in-memory byte streaming
-import io
-
-# OS and file utilities
-import os
-import shutil
+# Typing utilities
+from typing import Optional, Tuple
 
 # Database session factory
 from backend.database import SessionLocal
@@ -22,27 +19,54 @@ from backend.database import SessionLocal
 from backend.models import SecureFile, User
 
 # AES utilities: key generation, encryption, decryption
-from backend.aes.aes_utils import generate_aes_key, encrypt_blob, decrypt_blob
+from backend.aes.aes_utils import (
+    generate_aes_key,
+    SegmentedEncryptor,
+    DEFAULT_CHUNK_SIZE,
+    parallel_batch_size,
+    parallel_executor_for,
+    decrypt_fileobj,
+    decrypt_range,
+    read_segmented_layout,
+)
 
 # Attribute-Based Encryption utilities (for encrypting/decrypting AES key)
-from backend.abe.cpabe_utils import encrypt_aes_key, decrypt_aes_key
+from backend.abe.cpabe_utils import PolicySyntaxError, encrypt_aes_key, serialize_key_struct
+
+# Policy interning (one row per distinct canonical policy)
+from backend.abe.policy_store import intern_policy
+
+# Materialized attribute-set -> policy grants (indexed "files this user can open")
+from backend.abe.access_matrix import (
+    accessible_file_ids,
+    grant_policy,
+    release_policy,
+    user_attributes,
+)
+
+# Cache of parsed key structs / Fernet instances for repeated downloads
+from backend.abe.key_cache import get_key_cache
 
 # Encrypted blob storage (MongoDB GridFS by default; configurable via STORAGE_BACKEND)
-from backend.storage.storage_backend import (
-    save_encrypted_blob,
-    load_encrypted_blob,
-    delete_encrypted_blob,
+from backend.storage.storage_backend import delete_encrypted_blob
+from backend.utils.blob_io import (
+    open_stored_blob,
+    open_stored_blob_writer,
+    close_after,
+    prefetch_first,
 )
 
 # Blockchain approval service (4-of-7 authority voting)
 from backend.blockchain.blockchain_auth import get_blockchain_service
 
-# ABE key manager (for demo key-share distribution)
+# ABE key manager (for demo key-share distribution) and its share store
 from backend.abe.abe_key_manager import get_abe_manager
+from backend.abe.share_store import get_share_store
+from backend.abe.share_metadata import get_share_metadata
+
+# Worker pool for CPU-bound crypto stages (keeps the event loop responsive)
+from backend.utils.crypto_pool import get_crypto_pool
 
-# JSON and encoding utilities
-import json
-import base64
 
 # Regex used for parsing policy attributes
 import re
@@ -81,6 +105,13 @@ def _extract_policy_tokens(policy: str) -> list:
 
 
 
+# Helper function: User attribute tokens for policy checks
+
+def _user_attributes(user: User) -> set:
+    return user_attributes(user)
+
+
+
 # Helper function: Safe filename for downloads
 
 def _content_disposition_filename(filename: str) -> str:
@@ -105,6 +136,90 @@ def _content_disposition_filename(filename: str) -> str:
     return f"attachment; filename=\"{ascii_fallback}\"; filename*=UTF-8''{utf8_quoted}"
 
 
+# Helper function: Parse an HTTP Range header
+
+def _parse_range_header(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range `Range: bytes=...` header into [start, stop).
+    Returns None when the header should be ignored (multiple ranges,
+    unsupported unit or an invalid range such as `bytes=5-3`, per RFC 9110),
+    in which case the whole file is sent.
+    Raises 416 when a valid range starts at or beyond the end of the file.
+    """
+    unit, _, spec = (range_header or "").partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, sep, last = spec.strip().partition("-")
+    # Only digits: int() would also accept signs and whitespace (`bytes=--5`, `bytes=+2-4`)
+    if not sep or not (first or last) or any(part and not part.isdigit() for part in (first, last)):
+        return None
+
+    try:
+        if first:
+            start = int(first)
+            stop = int(last) + 1 if last else size
+            if last and stop <= start:
+                # last < first: invalid, ignored (a start past the end is 416 below)
+                return None
+        else:
+            # Suffix range: the last N bytes
+            start = max(size - int(last), 0)
+            stop = size
+    except ValueError:
+        return None
+
+    stop = min(stop, size)
+    if start >= stop:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, stop
+
+
+# Helper function: Record an uploaded file and grant its policy
+# (blocking database work, run in the thread pool)
+
+def _save_upload(db: Session, secure_file: SecureFile, policy_row) -> None:
+    db.add(secure_file)
+    db.commit()
+    db.refresh(secure_file)
+    grant_policy(db, policy_row)
+
+
+# Helper function: Remove a stored upload whose key shares could not be saved
+
+def _discard_upload(db: Session, secure_file: SecureFile) -> None:
+    file_id = str(secure_file.id)
+    try:
+        get_share_store().delete(file_id)
+        get_share_metadata().delete_many([file_id])
+    except Exception:
+        pass
+
+    policy_id = secure_file.policy_id
+    file_path = secure_file.file_path
+    db.delete(secure_file)
+    db.commit()
+    try:
+        delete_encrypted_blob(file_path)
+    except Exception:
+        pass
+    release_policy(db, policy_id)
+
+
+# Helper function: Encrypt one upload chunk and write it to storage
+# (runs in the crypto pool, off the event loop)
+
+def _encrypt_and_write(encryptor, writer, chunk: bytes) -> None:
+    if chunk:
+        writer.write(encryptor.update(chunk))
+    else:
+        writer.write(encryptor.finalize())
+
+
 # Database dependency (auto open/close session)
 
 def get_db():
@@ -138,6 +253,22 @@ def list_all_files(db: Session = Depends(get_db)):
 
 
 
+# API: IDs of files the user's attributes satisfy (policy check only;
+# downloads still require blockchain approval)
+
+@router.get("/accessible")
+def list_accessible_files(username: str, db: Session = Depends(get_db)):
+    user = db.query(User).filter(User.username == username).first()
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Indexed lookup in the materialized access matrix (no policy evaluation)
+    file_ids = accessible_file_ids(db, _user_attributes(user))
+
+    return {"username": username, "file_ids": file_ids}
+
+
+
 # API: Upload file (ADMIN ONLY)
 
 @router.post("/upload")
@@ -156,26 +287,49 @@ async def upload_file(
     if user.role.lower() != "admin":
         raise HTTPException(status_code=403, detail="Only admin can upload files")
 
-    # Read file content as bytes
-    raw_data = await file.read()
-    if not raw_data:
+    # Validate and intern the policy; files reference the shared canonical row
+    # (database I/O, so off the event loop like every blocking step below)
+    try:
+        policy_row = await run_in_threadpool(intern_policy, db, policy)
+    except PolicySyntaxError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid policy: {e}")
+
+    # Read the first chunk only; empty uploads are rejected before touching storage
+    chunk = await file.read(DEFAULT_CHUNK_SIZE)
+    if not chunk:
         raise HTTPException(status_code=400, detail="Empty file uploaded")
 
     # Generate random AES-256 key
     aes_key = generate_aes_key()
 
-    # Encrypt file using AES
-    encrypted_blob = encrypt_blob(raw_data, aes_key)
+    # Encrypt file using AES chunk by chunk and stream the ciphertext into the
+    # configured storage backend (peak memory stays at a few chunk buffers).
+    # Crypto stages run in the worker pool so other requests keep being served.
+    pool = get_crypto_pool()
 
-    # Store encrypted file in the configured storage backend
-    file_path = save_encrypted_blob(
-        encrypted_blob,
+    # Large files are read in batches whose segments are sealed across all cores
+    segment_executor = parallel_executor_for(getattr(file, "size", None))
+    read_size = parallel_batch_size() if segment_executor is not None else DEFAULT_CHUNK_SIZE
+
+    encryptor = SegmentedEncryptor(aes_key, segment_size=DEFAULT_CHUNK_SIZE, executor=segment_executor)
+    # The first GridFS use connects and pings the server
+    writer = await run_in_threadpool(
+        open_stored_blob_writer,
         filename=file.filename,
         metadata={"owner": username, "policy": policy},
     )
+    try:
+        while chunk:
+            await pool.run(_encrypt_and_write, encryptor, writer, chunk, shared_state=True)
+            chunk = await file.read(read_size)
+        await pool.run(_encrypt_and_write, encryptor, writer, b"", shared_state=True)
+        file_path = await pool.run(writer.close, shared_state=True)
+    except Exception:
+        await run_in_threadpool(writer.abort)
+        raise
 
     # Encrypt AES key using ABE policy
-    encrypted_key_struct = encrypt_aes_key(aes_key, policy)
+    encrypted_key_struct = await pool.run(encrypt_aes_key, aes_key, policy_row.canonical)
 
     # Create SecureFile DB record
     secure_file = SecureFile(
@@ -183,36 +337,35 @@ async def upload_file(
         owner=username,
         file_path=file_path,
 
-        # Store encrypted AES key + policy + Fernet key as JSON
-        encrypted_key=json.dumps({
-            "encrypted_key": encrypted_key_struct["encrypted_key"].decode()
-            if hasattr(encrypted_key_struct["encrypted_key"], 'decode')
-            else base64.b64encode(encrypted_key_struct["encrypted_key"]).decode(),
+        # Store the wrapped AES key + policy (+ Fernet key in demo mode) as JSON
+        encrypted_key=serialize_key_struct(encrypted_key_struct),
 
-            "policy": encrypted_key_struct["policy"],
-
-            "fernet_key": encrypted_key_struct["fernet_key"].decode()
-            if hasattr(encrypted_key_struct["fernet_key"], 'decode')
-            else base64.b64encode(encrypted_key_struct["fernet_key"]).decode()
-        }).encode(),
-
-        policy=policy
+        policy=policy,
+        policy_id=policy_row.id,
     )
 
-    # Save metadata to database
-    db.add(secure_file)
-    db.commit()
-    db.refresh(secure_file)
+    # Save metadata to database and materialize which attribute sets can
+    # open files under this policy (evaluates it against every attribute set)
+    await run_in_threadpool(_save_upload, db, secure_file, policy_row)
 
     # OPTIONAL: Distribute AES key shares to authorities (demo logic)
     try:
-        blockchain = get_blockchain_service()
-        abe = get_abe_manager()
-        authorities = blockchain.authorities
-
-        abe.split_key_to_shares(aes_key, str(secure_file.id), authorities)
+        # The first call connects to the chain and validates the contract
+        authorities = (await run_in_threadpool(get_blockchain_service)).authorities
     except Exception as e:
-        print(f"Error while splitting/storing shares: {e}")
+        authorities = None
+        print(f"Blockchain unavailable, key shares not distributed: {e}")
+
+    # Without its shares the key can never be reconstructed: undo the upload
+    if authorities:
+        try:
+            await pool.run(
+                get_abe_manager().split_key_to_shares, aes_key, str(secure_file.id), authorities,
+                shared_state=True,
+            )
+        except Exception as e:
+            await run_in_threadpool(_discard_upload, db, secure_file)
+            raise HTTPException(status_code=500, detail=f"Failed to store key shares: {e}")
 
     return {
         "message": "File uploaded, encrypted, and shares distributed to authorities",
@@ -228,6 +381,7 @@ def download_file(
     file_id: int,
     username: str,
     key_id: str,                         # Blockchain approval key ID
+    range_header: Optional[str] = Header(None, alias="Range"),
     db: Session = Depends(get_db)
 ):
     # Verify user exists
@@ -270,32 +424,20 @@ def download_file(
         )
 
     # Build user attributes for policy check
-    attributes = {
-        f"role:{user.role}",
-        f"dept:{user.department}",
-        f"department:{user.department}",
-        f"clearance:{user.clearance}",
-    }
-
-    user_key = {"attributes": attributes}
+    user_key = {"attributes": _user_attributes(user)}
 
    
     # ABE POLICY CHECK + AES KEY DECRYPTION
     
     try:
-        aes_key = decrypt_aes_key(
-            json.loads(secure_file.encrypted_key.decode()),
+        aes_key = get_key_cache().unwrap(
+            secure_file.id,
+            secure_file.encrypted_key,
             user_key
         )
     except Exception as e:
         raise HTTPException(status_code=403, detail=f"Access denied by policy: {str(e)}")
 
-    # Load encrypted file from storage
-    encrypted_blob = load_encrypted_blob(secure_file.file_path)
-
-    # Decrypt file using AES key
-    plaintext = decrypt_blob(encrypted_blob, aes_key)
-
     # Guess MIME[Multipurpose Internet Mail Extensions] type
     mime_type, _ = mimetypes.guess_type(secure_file.filename)
     if not mime_type:
@@ -304,9 +446,42 @@ def download_file(
     # Safe filename header
     headers = {"Content-Disposition": _content_disposition_filename(secure_file.filename)}
 
-    # Stream decrypted file to client
+    # Open encrypted file in storage (read lazily, chunk by chunk)
+    blob = open_stored_blob(secure_file.file_path)
+    try:
+        layout = read_segmented_layout(blob)
+        status_code = 200
+
+        if layout is not None:
+            headers["Accept-Ranges"] = "bytes"
+            headers["Content-Length"] = str(layout.plaintext_size)
+
+        # PARTIAL CONTENT (Range requests on segmented blobs)
+        # Only the AES-GCM segments covering the range are read and decrypted.
+        byte_range = None
+        if range_header and layout is not None:
+            byte_range = _parse_range_header(range_header, layout.plaintext_size)
+
+        if byte_range is not None:
+            start, stop = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{stop - 1}/{layout.plaintext_size}"
+            headers["Content-Length"] = str(stop - start)
+            chunks = decrypt_range(blob, aes_key, start, stop, layout)
+        else:
+            # Decrypt file incrementally using AES key
+            chunks = decrypt_fileobj(blob, aes_key)
+
+        # Decrypt the first chunk up front so a bad key/blob fails before headers are sent
+        chunks = prefetch_first(chunks)
+    except Exception:
+        blob.close()
+        raise
+
+    # Stream decrypted file to client as it is decrypted
     return StreamingResponse(
-        io.BytesIO(plaintext),
+        close_after(chunks, blob),
+        status_code=status_code,
         media_type=mime_type,
         headers=headers
     )
@@ -343,16 +518,19 @@ def delete_file(
 
     # Delete stored key shares (if present)
     try:
-        shares_dir = os.path.abspath(
-            os.path.join(os.path.dirname(__file__), "..", "storage", "shares", str(file_id))
-        )
-        if os.path.isdir(shares_dir):
-            shutil.rmtree(shares_dir, ignore_errors=True)
+        get_share_store().delete(str(file_id))
+        get_share_metadata().delete_many([str(file_id)])
     except Exception:
         pass
 
     # Delete DB record
+    policy_id = secure_file.policy_id
     db.delete(secure_file)
     db.commit()
 
+    # Drop cached key material and, if this was the last file under its
+    # policy, the policy's materialized grants
+    get_key_cache().invalidate(file_id)
+    release_policy(db, policy_id)
+
     return {"message": "File deleted successfully", "file_id": file_id}
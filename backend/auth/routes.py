@@ -3,16 +3,27 @@ import logging
 from fastapi import Request
 from sqlalchemy.orm import Session
 from passlib.context import CryptContext
-import os
-import shutil
 
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 
 from backend.database import SessionLocal
 from backend.models import User, RecoveryCode, SecureFile
 from backend.storage.storage_backend import delete_encrypted_blob
-from backend.schemas import LoginSchema, UserCreate, ChangePasswordSchema, ForgotPasswordResetSchema
-
+from backend.abe.key_cache import get_key_cache
+from backend.abe.share_store import get_share_store
+from backend.abe.share_metadata import get_share_metadata
+from backend.abe.access_matrix import ensure_attribute_set, release_policy, user_attributes
+from backend.abe.policy_index import evaluate_policy_matrix
+from backend.schemas import (
+    LoginSchema,
+    UserCreate,
+    ChangePasswordSchema,
+    ForgotPasswordResetSchema,
+    UserRoleAssign,
+    PolicyEvaluationRequest,
+)
+
+import base64
 import re
 import secrets
 import string
@@ -147,6 +158,9 @@ def admin_create_user(payload: dict, admin: User = Depends(require_admin), db: S
     db.add(new_user)
     db.commit()
 
+    # Materialize file access for the user's attribute set (no-op if shared)
+    ensure_attribute_set(db, user_attributes(new_user))
+
     recovery_code = generate_recovery_code()
     existing = db.query(RecoveryCode).filter(RecoveryCode.username == username).first()
     if existing:
@@ -165,6 +179,80 @@ def admin_create_user(payload: dict, admin: User = Depends(require_admin), db: S
     }
 
 
+@router.put("/admin/users/{username}/attributes")
+def admin_update_user_attributes(
+    username: str,
+    payload: UserRoleAssign,
+    admin: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    user = db.query(User).filter(User.username == username).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    role = payload.role.strip()
+    allowed_roles = {"admin", "manager", "accountant", "employee", "worker", "user"}
+    if role not in allowed_roles:
+        raise HTTPException(status_code=400, detail=f"Invalid role. Allowed: {', '.join(sorted(allowed_roles))}")
+
+    if user.role == "admin" and role != "admin":
+        admin_count = db.query(User).filter(User.role == "admin").count()
+        if admin_count <= 1:
+            raise HTTPException(status_code=400, detail="Cannot demote the last admin account")
+
+    user.role = role
+    user.department = payload.department.strip()
+    user.clearance = payload.clearance.strip()
+    db.add(user)
+    db.commit()
+
+    # Only the new attribute set's row is touched; users sharing it are unaffected
+    ensure_attribute_set(db, user_attributes(user))
+
+    return {
+        "message": "User attributes updated",
+        "username": user.username,
+        "role": user.role,
+        "department": user.department,
+        "clearance": user.clearance,
+    }
+
+
+@router.post("/admin/policies/evaluate")
+def admin_evaluate_policies(
+    payload: PolicyEvaluationRequest,
+    admin: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """Dry-run: which users / attribute sets satisfy which files / policies.
+
+    Returns a row-major bit matrix (base64): row i has `row_bytes` bytes and
+    bit j (byte j // 8, mask 0x80 >> j % 8) is set if row i satisfies column j.
+    """
+    users = {u.username: u for u in db.query(User).filter(User.username.in_(payload.usernames)).all()}
+    missing_users = [name for name in payload.usernames if name not in users]
+    if missing_users:
+        raise HTTPException(status_code=404, detail=f"Users not found: {', '.join(missing_users)}")
+
+    files = {f.id: f.policy for f in db.query(SecureFile.id, SecureFile.policy).filter(SecureFile.id.in_(payload.file_ids))}
+    missing_files = [str(file_id) for file_id in payload.file_ids if file_id not in files]
+    if missing_files:
+        raise HTTPException(status_code=404, detail=f"Files not found: {', '.join(missing_files)}")
+
+    rows = [user_attributes(users[name]) for name in payload.usernames] + payload.attribute_sets
+    columns = [files[file_id] for file_id in payload.file_ids] + payload.policies
+
+    matrix = evaluate_policy_matrix(rows, columns)
+    return {
+        "rows": matrix.rows,
+        "columns": matrix.columns,
+        "distinct_rows": matrix.distinct_rows,
+        "row_bytes": matrix.row_bytes,
+        "invalid_columns": matrix.invalid_policies,
+        "matrix": base64.b64encode(matrix.bits).decode(),
+    }
+
+
 @router.post("/admin/users/{username}/reset-password")
 def admin_reset_user_password(username: str, payload: dict, admin: User = Depends(require_admin), db: Session = Depends(get_db)):
     user = db.query(User).filter(User.username == username).first()
@@ -238,6 +326,7 @@ def admin_delete_user(
             raise HTTPException(status_code=400, detail="Cannot delete the last admin account")
 
     deleted_file_ids = []
+    released_policy_ids = set()
     if delete_files:
         files = db.query(SecureFile).filter(SecureFile.owner == username).all()
         for f in files:
@@ -251,18 +340,17 @@ def admin_delete_user(
                     detail=f"Failed to delete encrypted blob for file_id={f.id}: {str(e)}",
                 )
 
-            # Remove any stored key shares on disk (demo logic)
-            try:
-                shares_dir = os.path.abspath(
-                    os.path.join(os.path.dirname(__file__), "..", "storage", "shares", str(f.id))
-                )
-                if os.path.isdir(shares_dir):
-                    shutil.rmtree(shares_dir, ignore_errors=True)
-            except Exception:
-                pass
-
+            released_policy_ids.add(f.policy_id)
             db.delete(f)
             deleted_file_ids.append(f.id)
+            get_key_cache().invalidate(f.id)
+
+        # Remove any stored key shares (demo logic), one batch for all files
+        try:
+            get_share_store().delete_many([str(file_id) for file_id in deleted_file_ids])
+            get_share_metadata().delete_many([str(file_id) for file_id in deleted_file_ids])
+        except Exception:
+            pass
 
     recovery = db.query(RecoveryCode).filter(RecoveryCode.username == username).first()
     if recovery:
@@ -271,6 +359,9 @@ def admin_delete_user(
     db.delete(target)
     db.commit()
 
+    for policy_id in released_policy_ids:
+        release_policy(db, policy_id)
+
     return {
         "message": "User deleted successfully",
         "username": username,
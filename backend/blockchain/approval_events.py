@@ -0,0 +1,165 @@
+"""Fan-out of approval progress to streaming (server-sent events) clients.
+
+One ApprovalHub per process holds every subscription. Each subscription is a
+set of key ids plus a coalescing mailbox, so an idle subscriber costs a few
+small objects and no task, timer or RPC. Updates come from a single source:
+- the approval index: its poller thread reports every key whose count rose,
+  and the hub forwards it to that key's subscribers on the event loop
+- otherwise (index disabled or not live) one watcher task re-reads the
+  counts of all subscribed keys every APPROVAL_EVENTS_POLL_SECONDS
+  (default 2) in one batched RPC round trip, however many clients are
+  subscribed
+
+Environment:
+- APPROVAL_EVENTS_POLL_SECONDS: fallback watcher interval (default 2)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from backend.blockchain.approval_index import normalize_key_id
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    def __init__(self, key_ids: Iterable[str]) -> None:
+        self.key_ids = frozenset(normalize_key_id(k) for k in key_ids)
+        self._pending: Dict[str, int] = {}
+        self._ready = asyncio.Event()
+
+    def push(self, key_id: str, count: int) -> None:
+        # Only the latest count per key matters; slow readers never queue up
+        self._pending[key_id] = count
+        self._ready.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Dict[str, int]:
+        """Counts that changed since the last call (empty dict on timeout)."""
+        if not self._ready.is_set():
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return {}
+        self._ready.clear()
+        pending, self._pending = self._pending, {}
+        return pending
+
+
+class ApprovalHub:
+    def __init__(
+        self,
+        fetch_counts: Callable[[List[str]], Dict[str, int]],
+        index_live: Callable[[], bool] = lambda: False,
+        poll_interval: float = 2.0,
+    ) -> None:
+        self.fetch_counts = fetch_counts
+        self._index_live = index_live
+        self.poll_interval = poll_interval
+
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._counts: Dict[str, int] = {}  # last count delivered per subscribed key
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._watcher: Optional[asyncio.Task] = None
+
+    # Called on the event loop
+
+    def subscribe(self, key_ids: Iterable[str]) -> Subscription:
+        self._loop = asyncio.get_running_loop()
+        sub = Subscription(key_ids)
+        for key_id in sub.key_ids:
+            self._subscribers.setdefault(key_id, set()).add(sub)
+        if self._watcher is None or self._watcher.done():
+            self._watcher = self._loop.create_task(self._watch())
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        for key_id in sub.key_ids:
+            subs = self._subscribers.get(key_id)
+            if subs is None:
+                continue
+            subs.discard(sub)
+            if not subs:
+                del self._subscribers[key_id]
+                self._counts.pop(key_id, None)
+
+    def snapshot(self, sub: Subscription, counts: Dict[str, int]) -> None:
+        """Give a new subscriber the current counts of its keys."""
+        for key_id, count in counts.items():
+            key_id = normalize_key_id(key_id)
+            if key_id in sub.key_ids:
+                count = max(count, self._counts.get(key_id, 0))
+                self._counts[key_id] = count
+                sub.push(key_id, count)
+
+    def publish(self, key_id: str, count: int) -> None:
+        """Deliver a risen count to the key's subscribers."""
+        key_id = normalize_key_id(key_id)
+        subs = self._subscribers.get(key_id)
+        if not subs or count <= self._counts.get(key_id, -1):
+            return
+        self._counts[key_id] = count
+        for sub in subs:
+            sub.push(key_id, count)
+
+    # Called from other threads
+
+    def publish_threadsafe(self, key_id: str, count: int) -> None:
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self.publish, key_id, count)
+
+    async def _watch(self) -> None:
+        """Fallback watcher: one batched status read of all subscribed keys per interval."""
+        loop = asyncio.get_running_loop()
+        while self._subscribers:
+            await asyncio.sleep(self.poll_interval)
+            if not self._subscribers or self._index_live():
+                continue
+            try:
+                counts = await loop.run_in_executor(None, self.fetch_counts, list(self._subscribers))
+            except Exception as e:
+                logger.warning("Approval watcher poll failed: %s", e)
+                continue
+            for key_id, count in counts.items():
+                self.publish(key_id, count)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "keys": len(self._subscribers),
+            "subscriptions": len({sub for subs in self._subscribers.values() for sub in subs}),
+        }
+
+
+# Singleton instance
+_approval_hub: Optional[ApprovalHub] = None
+
+
+def get_approval_hub() -> ApprovalHub:
+    """Get or create the process-wide approval hub (attached to the blockchain service)"""
+    global _approval_hub
+
+    if _approval_hub is None:
+        from backend.blockchain.blockchain_auth import get_blockchain_service
+
+        blockchain = get_blockchain_service()
+
+        def fetch_counts(key_ids: List[str]) -> Dict[str, int]:
+            statuses = blockchain.get_approval_statuses(key_ids)
+            return {k: int(s["current_approvals"]) for k, s in statuses.items() if "error" not in s}
+
+        def index_live() -> bool:
+            return blockchain.approval_index is not None and blockchain.approval_index.is_live()
+
+        _approval_hub = ApprovalHub(
+            fetch_counts,
+            index_live=index_live,
+            poll_interval=float(os.getenv("APPROVAL_EVENTS_POLL_SECONDS") or "2"),
+        )
+        if blockchain.approval_index is not None:
+            blockchain.approval_index.add_listener(_approval_hub.publish_threadsafe)
+
+    return _approval_hub
@@ -0,0 +1,296 @@
+"""Local index of KeyAuthority approval votes.
+
+A background thread follows new blocks and fetches the contract's
+Approved(keyId, authority, count) logs, at most APPROVAL_INDEX_BLOCK_RANGE
+blocks per eth_getLogs call. Votes are persisted in the `approval_votes`
+table and the last processed block (number and hash) in `indexer_cursors`,
+so a restart resumes where it stopped. Current approval counts per key are
+kept in memory.
+
+Every poll re-reads the hash of the cursor block. If it changed, or the head
+is behind the cursor, the chain was reset (e.g. a Ganache restart, which
+redeploys at the same address) or reorganized, and the index is rebuilt
+from start_block.
+
+While the index is live (its last successful poll is recent), approval
+status is answered from memory without any RPC. Otherwise callers fall back
+to eth_call. That covers a stopped indexer and RPC errors. The index is
+not started for a deployed contract whose bytecode has no Approved event
+(deployed before the event existed): its logs would always be empty and
+every count would read 0. The index is for display only: access
+decisions (verify_approval) always ask the contract.
+
+Environment:
+- APPROVAL_INDEX: "on" (default) / "off"
+- APPROVAL_INDEX_POLL_SECONDS: poll interval (default 1)
+- APPROVAL_INDEX_BLOCK_RANGE: max blocks per eth_getLogs (default 2000)
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from backend.database import add_missing_columns
+from backend.models import ApprovalVote, IndexerCursor
+
+logger = logging.getLogger(__name__)
+
+EVENT_NAME = "Approved"
+
+
+def normalize_key_id(key_id: str) -> str:
+    key_id = str(key_id).strip().lower()
+    return key_id if key_id.startswith("0x") else "0x" + key_id
+
+
+def _hex(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    text = value.hex() if hasattr(value, "hex") else str(value)
+    return text if text.startswith("0x") else "0x" + text
+
+
+def index_enabled() -> bool:
+    return (os.getenv("APPROVAL_INDEX") or "on").strip().lower() not in {"0", "off", "false", "no"}
+
+
+class ApprovalIndex:
+    def __init__(
+        self,
+        w3,
+        contract,
+        session_factory: Optional[Callable] = None,
+        start_block: int = 0,
+        poll_interval: float = 1.0,
+        block_range: int = 2000,
+        max_staleness: Optional[float] = None,
+        event_topic: Optional[str] = None,
+    ) -> None:
+        if session_factory is None:
+            from backend.database import SessionLocal
+
+            session_factory = SessionLocal
+        self.w3 = w3
+        self.contract = contract
+        self._session_factory = session_factory
+        self.start_block = max(int(start_block), 0)
+        self.poll_interval = poll_interval
+        self.block_range = max(int(block_range), 1)
+        self.max_staleness = max_staleness if max_staleness is not None else max(5.0, poll_interval * 5)
+
+        self.contract_key = str(contract.address).lower()
+        # keccak("Approved(bytes32,address,uint256)"), for decoding raw receipt logs
+        self.event_topic = _hex(event_topic).lower() if event_topic else None
+        self._cursor_name = f"approvals:{self.contract_key}"
+        self._cursor = self.start_block - 1
+        self._cursor_hash: Optional[str] = None
+        self._head: Optional[int] = None
+        self._counts: Dict[str, int] = {}
+        self._synced_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._listeners: List[Callable[[str, int], None]] = []
+        self.polls = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    # Persistence
+
+    def load(self) -> None:
+        """Restore the cursor and approval counts saved by a previous run."""
+        db = self._session_factory()
+        try:
+            add_missing_columns(IndexerCursor.__tablename__, {"block_hash": "VARCHAR"}, bind=db.get_bind())
+            cursor = db.get(IndexerCursor, self._cursor_name)
+            rows = (
+                db.query(ApprovalVote.key_id, func.max(ApprovalVote.count))
+                .filter(ApprovalVote.contract == self.contract_key)
+                .group_by(ApprovalVote.key_id)
+                .all()
+            )
+        finally:
+            db.close()
+
+        with self._lock:
+            if cursor is not None:
+                self._cursor = cursor.block_number
+                self._cursor_hash = cursor.block_hash
+            self._counts = {key_id: count for key_id, count in rows}
+
+    def _reset(self) -> None:
+        """Forget everything indexed for this contract (the chain was reset)."""
+        db = self._session_factory()
+        try:
+            db.query(ApprovalVote).filter(ApprovalVote.contract == self.contract_key).delete(synchronize_session=False)
+            db.query(IndexerCursor).filter(IndexerCursor.name == self._cursor_name).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        with self._lock:
+            self._counts.clear()
+            self._cursor = self.start_block - 1
+            self._cursor_hash = None
+
+    @staticmethod
+    def _decode(event) -> Tuple[str, str, int, int, Optional[str]]:
+        args = event["args"]
+        return (
+            normalize_key_id(bytes(args["keyId"]).hex()),
+            str(args["authority"]).lower(),
+            int(args["count"]),
+            int(event["blockNumber"]),
+            _hex(event.get("transactionHash")),
+        )
+
+    def _apply(self, events: Iterable, cursor: Optional[int], cursor_hash: Optional[str] = None) -> List[str]:
+        """Persist events (and the new cursor) in one transaction; returns the keys whose count rose."""
+        rows = [self._decode(e) for e in events]
+        if rows or cursor is not None:
+            db = self._session_factory()
+            try:
+                for key_id, authority, count, block_number, tx_hash in rows:
+                    db.merge(ApprovalVote(
+                        contract=self.contract_key,
+                        key_id=key_id,
+                        authority=authority,
+                        count=count,
+                        block_number=block_number,
+                        tx_hash=tx_hash,
+                    ))
+                if cursor is not None:
+                    db.merge(IndexerCursor(name=self._cursor_name, block_number=cursor, block_hash=cursor_hash))
+                db.commit()
+            finally:
+                db.close()
+
+        changed = []
+        with self._lock:
+            for key_id, _, count, _, _ in rows:
+                if count > self._counts.get(key_id, 0):
+                    self._counts[key_id] = count
+                    if key_id not in changed:
+                        changed.append(key_id)
+            if cursor is not None and cursor >= self._cursor:
+                self._cursor = cursor
+                self._cursor_hash = cursor_hash
+            counts = [(key_id, self._counts[key_id]) for key_id in changed]
+
+        for key_id, count in counts:
+            for listener in self._listeners:
+                try:
+                    listener(key_id, count)
+                except Exception as e:
+                    logger.warning("Approval listener failed: %s", e)
+        return changed
+
+    def add_listener(self, callback: Callable[[str, int], None]) -> None:
+        """Call `callback(key_id, count)` (from the indexing thread) whenever a count rises."""
+        self._listeners.append(callback)
+
+    # Following the chain
+
+    def _block_hash(self, number: int) -> Optional[str]:
+        block = self.w3.eth.get_block(number)
+        return _hex(block["hash"]).lower() if block is not None else None
+
+    def poll_once(self) -> List[str]:
+        """Index logs up to the current head; returns the keys whose count rose."""
+        head = int(self.w3.eth.block_number)
+        if head < self._cursor:
+            logger.warning("Chain head %d is behind the approval index (%d); reindexing", head, self._cursor)
+            self._reset()
+        elif self._cursor_hash is not None and self._block_hash(self._cursor) != self._cursor_hash:
+            logger.warning("Block %d changed since it was indexed (chain reset or reorg); reindexing", self._cursor)
+            self._reset()
+
+        changed: List[str] = []
+        start = self._cursor + 1
+        while start <= head:
+            end = min(start + self.block_range - 1, head)
+            events = getattr(self.contract.events, EVENT_NAME)().get_logs(fromBlock=start, toBlock=end)
+            changed.extend(k for k in self._apply(events, end, self._block_hash(end)) if k not in changed)
+            start = end + 1
+
+        with self._lock:
+            self._head = head
+            self._synced_at = time.monotonic()
+        self.polls += 1
+        return changed
+
+    def apply_logs(self, logs: Iterable[dict]) -> List[str]:
+        """Index Approved events from raw receipt logs right away (read-your-writes)."""
+        events = []
+        for log in logs:
+            topics = [str(t).lower() for t in (log.get("topics") or [])]
+            if str(log.get("address", "")).lower() != self.contract_key or len(topics) != 3:
+                continue
+            if self.event_topic is not None and topics[0] != self.event_topic:
+                continue
+            block_number = log.get("blockNumber")
+            events.append({
+                "args": {
+                    "keyId": bytes.fromhex(topics[1][2:]),
+                    "authority": "0x" + topics[2][-40:],
+                    "count": int(log.get("data") or "0x0", 16),
+                },
+                "blockNumber": int(block_number, 16) if isinstance(block_number, str) else block_number,
+                "transactionHash": log.get("transactionHash"),
+            })
+        return self._apply(events, None)
+
+    def _run(self) -> None:
+        failing = False
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+                failing = False
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+                if not failing:
+                    logger.warning("Approval index poll failed: %s", e)
+                failing = True
+            self._stop.wait(self.poll_interval)
+
+    def start(self) -> "ApprovalIndex":
+        if self._thread is None:
+            self.load()
+            self._thread = threading.Thread(target=self._run, name="approval-index", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # Reads
+
+    def is_live(self) -> bool:
+        synced_at = self._synced_at
+        return synced_at is not None and time.monotonic() - synced_at <= self.max_staleness
+
+    def approvals(self, key_id: str) -> Optional[int]:
+        """Indexed approval count of a key, or None when the index is not live."""
+        if not self.is_live():
+            return None
+        with self._lock:
+            return self._counts.get(normalize_key_id(key_id), 0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "live": self.is_live(),
+            "keys": len(self._counts),
+            "cursor": self._cursor,
+            "head": self._head,
+            "polls": self.polls,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
@@ -8,11 +8,22 @@ The architecture and logic remain blockchain-based (4-of-7 threshold approval vo
 """
 import json
 import os
+from concurrent.futures import Future
 from typing import Any, Dict, List, Optional, Tuple
 from web3 import Web3
 from eth_account.messages import encode_defunct
 from datetime import datetime, timedelta
 from backend.utils.hashing import KeyIdHasher
+from backend.blockchain.approval_index import EVENT_NAME, ApprovalIndex, index_enabled
+from backend.blockchain.rpc_batch import RpcBatcher, ViewCall, encode_call
+from backend.blockchain.tx_scheduler import TxScheduler
+
+# Gas for approveKeys: fixed part plus first-vote storage writes and event per key
+APPROVE_KEYS_BASE_GAS = 60000
+APPROVE_KEYS_GAS_PER_KEY = 50000
+
+APPROVED_EVENT_SIGNATURE = "Approved(bytes32,address,uint256)"
+APPROVE_KEYS_SIGNATURE = "approveKeys(bytes32[])"
 
 class BlockchainAuthService:
     def __init__(
@@ -35,6 +46,13 @@ class BlockchainAuthService:
             rpc_url: Ethereum RPC endpoint (default: local Ganache at 127.0.0.1:7545)
         """
         self.w3 = Web3(Web3.HTTPProvider(rpc_url))
+        self.rpc = RpcBatcher(self.w3, rpc_url, max_batch=int(os.getenv("RPC_BATCH_SIZE") or "500"))
+        self.tx_scheduler = TxScheduler(
+            self.rpc,
+            poll_interval=float(os.getenv("TX_POLL_SECONDS") or "0.25"),
+            replace_after=float(os.getenv("TX_REPLACE_AFTER_SECONDS") or "30"),
+            timeout=float(os.getenv("TX_TIMEOUT_SECONDS") or "120"),
+        )
         self.contract_address = contract_address
         self.threshold = threshold  # expected threshold from deployment info
         
@@ -71,6 +89,9 @@ class BlockchainAuthService:
                 f"No contract code found at {contract_address}. "
                 "Update DEPLOYMENT_INFO.json with the latest deployed contract address."
             )
+        # Runtime bytecode: tells which functions/events the deployed contract
+        # really has (the local ABI file may be newer than the deployment)
+        self.runtime_code = bytes(code)
 
         # Validate on-chain threshold matches expected project threshold
         try:
@@ -87,6 +108,12 @@ class BlockchainAuthService:
         # Lock to the on-chain threshold after validation
         self.threshold = onchain_threshold
 
+        # Event-driven approval counts (see start_approval_index)
+        self.approval_index: Optional[ApprovalIndex] = None
+
+        # Keys per approveKeys transaction (bounded by the block gas limit)
+        self.approve_batch_size = int(os.getenv("APPROVE_BATCH_SIZE") or "100")
+
         # Authority addresses: resolve from contract + Ganache accounts
         self.authorities = self._resolve_authorities(authorities)
 
@@ -113,25 +140,17 @@ class BlockchainAuthService:
         except Exception:
             chain_accounts = []
 
+        # One batched authorities(addr) lookup for every candidate
+        flags = self.authority_flags(chain_accounts + preferred)
+
         # Prefer Ganache unlocked accounts that are authorities (these are transactable).
-        onchain_authority_accounts: List[str] = []
-        for addr in chain_accounts:
-            try:
-                if self.contract.functions.authorities(addr).call():
-                    onchain_authority_accounts.append(addr)
-            except Exception:
-                continue
+        onchain_authority_accounts: List[str] = [addr for addr in chain_accounts if flags.get(addr)]
 
         # If deployment listed preferred authorities, keep those that are authorities too.
         preferred_authorities: List[str] = []
         for addr in preferred:
-            if addr in preferred_authorities:
-                continue
-            try:
-                if self.contract.functions.authorities(addr).call():
-                    preferred_authorities.append(addr)
-            except Exception:
-                continue
+            if addr not in preferred_authorities and flags.get(addr):
+                preferred_authorities.append(addr)
 
         # Merge, favoring transactable Ganache accounts first.
         merged: List[str] = []
@@ -140,6 +159,78 @@ class BlockchainAuthService:
                 merged.append(addr)
 
         return merged
+
+    def has_event(self, signature: str) -> bool:
+        """Whether the deployed contract emits `signature` (its topic is a PUSH32 constant in the bytecode)."""
+        return bytes(Web3.keccak(text=signature)) in self.runtime_code
+
+    def has_function(self, signature: str) -> bool:
+        """Whether the deployed contract's dispatcher knows the selector of `signature`."""
+        return bytes(Web3.keccak(text=signature))[:4] in self.runtime_code
+
+    def _view_many(self, fn_name: str, args_list: List[tuple], output_type: str) -> List[Any]:
+        """Call one view function for many argument tuples in a single RPC round trip."""
+        calls = [ViewCall(self.contract, fn_name, tuple(args), (output_type,)) for args in args_list]
+        return self.rpc.call_views(calls)
+
+    def authority_flags(self, addresses: List[str], strict: bool = False) -> Dict[str, bool]:
+        """authorities(addr) for many addresses in one round trip, keyed by the given strings.
+
+        Invalid addresses count as False. Failed lookups count as False too,
+        unless strict is set: then the first lookup error is raised.
+        """
+        flags: Dict[str, bool] = {}
+        lookups: Dict[str, str] = {}
+        for addr in dict.fromkeys(addresses):
+            try:
+                lookups[addr] = Web3.to_checksum_address(addr)
+            except Exception:
+                flags[addr] = False
+        if not lookups:
+            return flags
+        try:
+            results = self._view_many("authorities", [(a,) for a in lookups.values()], "bool")
+        except Exception:
+            if strict:
+                raise
+            results = [False] * len(lookups)
+        for addr, result in zip(lookups, results):
+            if strict and isinstance(result, Exception):
+                raise result
+            flags[addr] = result is True
+        return flags
+
+    def start_approval_index(self, start_block: int = 0) -> Optional[ApprovalIndex]:
+        """Start following Approved events so status reads need no RPC.
+
+        Skipped when APPROVAL_INDEX=off or when the deployed contract never
+        emits Approved (deployed before the event was added). The local ABI
+        file is not enough: it may list the event while the deployment does
+        not, and an index over a silent contract would report 0 approvals.
+        """
+        if self.approval_index is not None:
+            return self.approval_index
+        if not index_enabled():
+            return None
+        if not self.has_event(APPROVED_EVENT_SIGNATURE):
+            print(f"Approval index disabled: deployed KeyAuthority has no {EVENT_NAME} event (redeploy the contract)")
+            return None
+
+        self.approval_index = ApprovalIndex(
+            self.w3,
+            self.contract,
+            start_block=start_block,
+            poll_interval=float(os.getenv("APPROVAL_INDEX_POLL_SECONDS") or "1"),
+            block_range=int(os.getenv("APPROVAL_INDEX_BLOCK_RANGE") or "2000"),
+            event_topic=Web3.keccak(text=APPROVED_EVENT_SIGNATURE).hex(),
+        ).start()
+        return self.approval_index
+
+    def _indexed_approvals(self, key_id: str) -> Optional[int]:
+        if self.approval_index is None:
+            return None
+        return self.approval_index.approvals(key_id)
+
     #Is this wallet a registered authority
     def is_authority(self, address: str) -> bool:
         try:
@@ -207,7 +298,8 @@ class BlockchainAuthService:
         """
         Get current approval vote count from blockchain.
         
-        Queries the smart contract to check how many authorities have voted to approve.
+        Answered from the approval index while it is live; otherwise queries the
+        smart contract to check how many authorities have voted to approve.
         Returns True only if >= 4 (threshold) authorities have approved.
         
         Args:
@@ -216,34 +308,67 @@ class BlockchainAuthService:
         Returns:
             Approval status with current count and threshold info
         """
-        try:
-            # Convert hex to bytes32
-            key_bytes = bytes.fromhex(key_id.replace("0x", ""))
-            
-            # Get approval count from contract
-            approval_count = self.contract.functions.approvals(key_bytes).call()
-            is_approved = self.contract.functions.isApproved(key_bytes).call()
-            
-            return {
-                "key_id": key_id,
-                "current_approvals": approval_count,
-                "required_approvals": self.threshold,
-                "threshold": self.threshold,
-                "total_authorities": len(self.authorities),
-                "is_approved": is_approved,
-                "approval_percentage": int((approval_count / self.threshold) * 100) if self.threshold else 0
-            }
-        except Exception as e:
-            return {
-                "error": str(e),
-                "key_id": key_id
-            }
+        return self.get_approval_statuses([key_id])[key_id]
+
+    def get_approval_statuses(self, key_ids: List[str]) -> Dict[str, dict]:
+        """
+        Approval status of many keys, keyed by key ID.
+
+        Keys missing from the approval index are read with one batched
+        approvals() call. is_approved is derived from the count, which
+        matches isApproved() because the on-chain threshold is immutable and
+        locked at startup. Invalid keys get an {"error", "key_id"} entry.
+        """
+        statuses: Dict[str, dict] = {}
+        pending: List[Tuple[str, bytes]] = []
+        for key_id in key_ids:
+            if key_id in statuses:
+                continue
+            try:
+                # Convert hex to bytes32
+                key_bytes = bytes.fromhex(key_id.replace("0x", ""))
+            except ValueError as e:
+                statuses[key_id] = {"error": str(e), "key_id": key_id}
+                continue
+            approval_count = self._indexed_approvals(key_id)
+            if approval_count is not None:
+                statuses[key_id] = self.status_for_count(key_id, approval_count)
+            else:
+                statuses[key_id] = {}
+                pending.append((key_id, key_bytes))
+
+        if pending:
+            try:
+                counts: List[Any] = self._view_many("approvals", [(key_bytes,) for _, key_bytes in pending], "uint256")
+            except Exception as e:
+                counts = [e] * len(pending)
+            for (key_id, _), count in zip(pending, counts):
+                if isinstance(count, Exception):
+                    statuses[key_id] = {"error": str(count), "key_id": key_id}
+                else:
+                    statuses[key_id] = self.status_for_count(key_id, int(count))
+        return statuses
+
+    def status_for_count(self, key_id: str, approval_count: int, is_approved: Optional[bool] = None) -> dict:
+        """Approval status payload for a known vote count."""
+        if is_approved is None:
+            is_approved = approval_count >= self.threshold
+        return {
+            "key_id": key_id,
+            "current_approvals": approval_count,
+            "required_approvals": self.threshold,
+            "threshold": self.threshold,
+            "total_authorities": len(self.authorities),
+            "is_approved": is_approved,
+            "approval_percentage": int((approval_count / self.threshold) * 100) if self.threshold else 0
+        }
 
     def verify_approval(self, key_id: str) -> bool:
         """
         Verify if a key has reached the approval threshold (4 out of 7).
         
-        Queries the smart contract to check the vote count.
+        This gates access, so it always asks the smart contract; the approval
+        index only serves status display.
         Returns True only if >= 4 authorities have approved.
         
         Args:
@@ -314,18 +439,93 @@ class BlockchainAuthService:
         """
         try:
             key_bytes = bytes.fromhex(key_id.replace("0x", ""))
-            tx = self.contract.functions.approveKey(key_bytes).transact({
-                'from': Web3.to_checksum_address(authority_address),
-                'gas': 200000
-            })
+            future = self.submit_transaction("approveKey", [key_bytes], authority_address, 200000)
             # Wait for receipt (Ganache mines instantly)
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx)
-            return receipt.transactionHash.hex(), None
+            receipt = future.result()
+            self._index_receipt(receipt)
+            if receipt["status"] != 1:
+                return None, f"Transaction {receipt['transactionHash']} reverted"
+            return receipt["transactionHash"], None
         except Exception as e:
             msg = str(e)
             print(f"approve_key error: {msg}")
             return None, msg
 
+    def approve_keys(self, key_ids: List[str], authority_addresses: List[str]) -> List[dict]:
+        """
+        Several authorities approve many keys, with pipelined transactions.
+
+        Each authority votes on up to `approve_batch_size` keys per approveKeys
+        transaction; keys it already approved are skipped on chain. Every
+        transaction is submitted through the transaction scheduler before any
+        receipt is awaited, and receipts are resolved in batches, so
+        4 authorities x 500 keys cost 4 transactions and about one block of
+        latency. A single key, or a deployed contract without approveKeys,
+        uses one approveKey transaction per key (still pipelined).
+
+        Args:
+            key_ids: hex key ids (0x...)
+            authority_addresses: authority accounts to send approvals from
+
+        Returns:
+            One {"authority", "tx_hashes", "error"} entry per authority; error is
+            the first failure of that authority's transactions, or None.
+        """
+        key_bytes = [bytes.fromhex(k.replace("0x", "")) for k in key_ids]
+        batched = len(key_bytes) > 1 and self.has_function(APPROVE_KEYS_SIGNATURE)
+        if batched:
+            size = max(self.approve_batch_size, 1)
+            calls = []
+            for i in range(0, len(key_bytes), size):
+                chunk = key_bytes[i:i + size]
+                calls.append(("approveKeys", [chunk], APPROVE_KEYS_BASE_GAS + APPROVE_KEYS_GAS_PER_KEY * len(chunk)))
+        else:
+            calls = [("approveKey", [k], 200000) for k in key_bytes]
+
+        results: List[dict] = []
+        submitted: List[Tuple[dict, Future]] = []
+        for authority_address in authority_addresses:
+            entry = {"authority": authority_address, "tx_hashes": [], "error": None}
+            results.append(entry)
+            for fn_name, args, gas in calls:
+                submitted.append((entry, self.submit_transaction(fn_name, args, authority_address, gas)))
+
+        for entry, future in submitted:
+            try:
+                receipt = future.result()
+            except Exception as e:
+                entry["error"] = entry["error"] or str(e)
+                continue
+            self._index_receipt(receipt)
+            if receipt["status"] != 1:
+                entry["error"] = entry["error"] or f"Transaction {receipt['transactionHash']} reverted"
+                continue
+            entry["tx_hashes"].append(receipt["transactionHash"])
+        return results
+
+    def submit_transaction(self, fn_name: str, args: List[Any], sender: str, gas: int) -> Future:
+        """Send a contract transaction without waiting; the future resolves to its receipt."""
+        try:
+            params = {
+                "to": self.contract.address,
+                "data": encode_call(self.contract, fn_name, args),
+                "gas": gas,
+            }
+            sender = Web3.to_checksum_address(sender)
+        except Exception as e:
+            future: Future = Future()
+            future.set_exception(e)
+            return future
+        return self.tx_scheduler.submit(sender, params)
+
+    def _index_receipt(self, receipt: dict) -> None:
+        if self.approval_index is None:
+            return
+        try:
+            self.approval_index.apply_logs(receipt.get("logs") or [])
+        except Exception as e:
+            print(f"approval index update error: {e}")
+
     def get_authorities_info(self) -> List[dict]:
         """
         Get information about all authorities
@@ -333,22 +533,16 @@ class BlockchainAuthService:
         Returns:
             List of authority information
         """
+        flags = self.authority_flags(self.authorities)
         authorities_info = []
         for i, auth_addr in enumerate(self.authorities, 1):
             authorities_info.append({
                 "index": i,
                 "address": auth_addr,
-                "is_authority": self._check_is_authority(auth_addr)
+                "is_authority": flags.get(auth_addr, False)
             })
         return authorities_info
 
-    def _check_is_authority(self, address: str) -> bool:
-        """Check if address is registered authority"""
-        try:
-            return self.contract.functions.authorities(Web3.to_checksum_address(address)).call()
-        except:
-            return False
-
 
 # Singleton instance
 _blockchain_service: Optional[BlockchainAuthService] = None
@@ -363,6 +557,7 @@ def get_blockchain_service(contract_address: str = None) -> BlockchainAuthServic
         if contract_address is None:
             deploy_authorities: Optional[List[str]] = None
             deploy_threshold: int = 4
+            deploy_block: int = 0
             possible = [
                 os.path.join(os.path.dirname(__file__), 'DEPLOYMENT_INFO.json'),
                 os.path.join(os.path.dirname(__file__), 'DEPLOYMENT_INFO.TXT'),
@@ -380,6 +575,10 @@ def get_blockchain_service(contract_address: str = None) -> BlockchainAuthServic
                                 deploy_authorities = deploy_info.get('authorities')
                                 if isinstance(deploy_info.get('threshold'), int):
                                     deploy_threshold = deploy_info['threshold']
+                                for block_key in ('deploymentBlock', 'blockNumber'):
+                                    if isinstance(deploy_info.get(block_key), int):
+                                        deploy_block = deploy_info[block_key]
+                                        break
                             except Exception:
                                 content = f.read()
                                 for line in content.splitlines():
@@ -407,11 +606,16 @@ def get_blockchain_service(contract_address: str = None) -> BlockchainAuthServic
             deploy_threshold  # type: ignore[name-defined].0k
         except Exception:
             deploy_threshold = 4
+        try:
+            deploy_block  # type: ignore[name-defined]
+        except Exception:
+            deploy_block = 0
 
         _blockchain_service = BlockchainAuthService(
             contract_address,
             authorities=deploy_authorities,
             threshold=deploy_threshold,
         )
+        _blockchain_service.start_approval_index(start_block=deploy_block)
     
     return _blockchain_service
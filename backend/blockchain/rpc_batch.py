@@ -0,0 +1,181 @@
+"""Batched contract view calls over JSON-RPC.
+
+Many eth_call requests go out as one JSON-RPC batch, a JSON array sent in a
+single HTTP POST. Reading N values therefore costs one round trip instead of
+N. Batches are capped at RPC_BATCH_SIZE calls (default 500). If the endpoint
+explicitly rejects batches (a single "invalid request" / "batch not supported"
+error in reply to the array), later calls are sent one at a time through the
+web3 provider. Any other failed batch (HTTP 5xx, timeout, malformed reply) is
+retried one call at a time for that request only, and batching stays on.
+Results stay the same either way.
+
+Environment:
+- RPC_BATCH_SIZE: max calls per JSON-RPC batch (default 500)
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Reply of an endpoint that does not understand JSON-RPC batches
+_INVALID_REQUEST = -32600
+_BATCH_UNSUPPORTED = ("batch", "not supported")
+
+
+class _BatchUnsupported(Exception):
+    pass
+
+
+class RpcError(Exception):
+    """A single call of a batch failed (the other results are still valid)."""
+
+
+class ViewCall(NamedTuple):
+    contract: Any
+    fn_name: str
+    args: Tuple
+    output_types: Tuple[str, ...]
+
+
+def encode_call(contract, fn_name: str, args: Sequence) -> str:
+    """ABI-encoded call data for contract.fn_name(*args)."""
+    # web3 v6 names it encodeABI, v7 encode_abi
+    encode = getattr(contract, "encode_abi", None) or contract.encodeABI
+    return encode(fn_name, args=list(args))
+
+
+class RpcBatcher:
+    def __init__(self, w3, endpoint_uri: Optional[str] = None, max_batch: int = 500, timeout: float = 10.0) -> None:
+        self.w3 = w3
+        self.endpoint_uri = endpoint_uri or getattr(getattr(w3, "provider", None), "endpoint_uri", None)
+        self.max_batch = max(int(max_batch), 1)
+        self.timeout = timeout
+        self.batch_supported = self.endpoint_uri is not None
+
+        self._session = requests.Session()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.round_trips = 0
+        self.calls = 0
+
+    def _next_id(self) -> int:
+        with self._lock:
+            return next(self._ids)
+
+    def _count(self, round_trips: int = 0, calls: int = 0) -> None:
+        # Updated from request threads and the transaction scheduler thread
+        with self._lock:
+            self.round_trips += round_trips
+            self.calls += calls
+
+    @staticmethod
+    def _rejects_batches(data: Any) -> bool:
+        error = data.get("error") if isinstance(data, dict) else None
+        if not isinstance(error, dict):
+            return False
+        message = str(error.get("message") or "").lower()
+        return error.get("code") == _INVALID_REQUEST or all(word in message for word in _BATCH_UNSUPPORTED)
+
+    def _post_batch(self, payload: List[dict]) -> Optional[Dict[Any, dict]]:
+        """Send one batch; returns responses by id, or None if this batch failed.
+
+        Raises _BatchUnsupported when the endpoint rejects batches outright.
+        """
+        self._count(round_trips=1)
+        try:
+            response = self._session.post(self.endpoint_uri, json=payload, timeout=self.timeout)
+            data = response.json()
+        except (requests.RequestException, ValueError) as e:
+            logger.warning("RPC batch to %s failed (%s); sending its calls one by one", self.endpoint_uri, e)
+            return None
+        if isinstance(data, list):
+            return {item.get("id"): item for item in data if isinstance(item, dict)}
+        if self._rejects_batches(data):
+            raise _BatchUnsupported()
+        logger.warning("Unexpected RPC batch reply from %s; sending its calls one by one", self.endpoint_uri)
+        return None
+
+    def request(self, method: str, params: list) -> Any:
+        """Send one request; returns its result or raises RpcError."""
+        response = self.w3.provider.make_request(method, params)
+        self._count(round_trips=1, calls=1)
+        error = response.get("error")
+        if error is not None:
+            raise RpcError(error.get("message") if isinstance(error, dict) else str(error))
+        return response.get("result")
+
+    def request_many(self, calls: Sequence[Tuple[str, list]]) -> List[dict]:
+        """Send raw (method, params) requests; returns one JSON-RPC response dict per call."""
+        self._count(calls=len(calls))
+        out: List[Optional[dict]] = [None] * len(calls)
+
+        start = 0
+        while self.batch_supported and start < len(calls):
+            chunk = list(range(start, min(start + self.max_batch, len(calls))))
+            payload = []
+            ids = {}
+            for i in chunk:
+                method, params = calls[i]
+                request_id = self._next_id()
+                ids[request_id] = i
+                payload.append({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+
+            try:
+                responses = self._post_batch(payload)
+            except _BatchUnsupported:
+                logger.warning("RPC endpoint %s does not accept batch requests; sending calls one by one", self.endpoint_uri)
+                self.batch_supported = False
+                break
+            if responses is not None:
+                for request_id, i in ids.items():
+                    out[i] = responses.get(request_id) or {"error": {"message": "missing response in batch"}}
+            start = chunk[-1] + 1
+
+        for i, item in enumerate(out):
+            if item is None:
+                method, params = calls[i]
+                out[i] = self.w3.provider.make_request(method, params)
+                self._count(round_trips=1)
+        return out  # type: ignore[return-value]
+
+    def call_views(self, calls: Sequence[ViewCall], block: Any = "latest") -> List[Any]:
+        """Evaluate view functions in one round trip.
+
+        Returns the decoded value per call (a tuple for multiple outputs),
+        or an RpcError instance for calls that failed.
+        """
+        results: List[Any] = [None] * len(calls)
+        rpc_calls: List[Tuple[str, list]] = []
+        positions: List[int] = []
+        for i, call in enumerate(calls):
+            try:
+                data = encode_call(call.contract, call.fn_name, call.args)
+            except Exception as e:
+                results[i] = RpcError(str(e))
+                continue
+            rpc_calls.append(("eth_call", [{"to": call.contract.address, "data": data}, block]))
+            positions.append(i)
+
+        for i, response in zip(positions, self.request_many(rpc_calls) if rpc_calls else []):
+            call = calls[i]
+            if response.get("error") is not None:
+                error = response["error"]
+                results[i] = RpcError(error.get("message") if isinstance(error, dict) else str(error))
+                continue
+            raw = response.get("result") or "0x"
+            if not isinstance(raw, str):
+                raw = bytes(raw).hex()
+            try:
+                values = self.w3.codec.decode(list(call.output_types), bytes.fromhex(raw[2:] if raw.startswith("0x") else raw))
+            except Exception as e:
+                results[i] = RpcError(str(e))
+                continue
+            results[i] = values[0] if len(values) == 1 else tuple(values)
+        return results
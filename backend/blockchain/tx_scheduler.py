@@ -0,0 +1,293 @@
+"""Nonce-managed, pipelined transaction submission.
+
+TxScheduler.submit() sends a transaction right away and returns a
+concurrent.futures.Future that resolves to its receipt. The caller does not
+wait for mining.
+
+- Nonces are tracked locally per sender. They are read once from the node
+  (pending count) and then incremented, so many transactions from one account
+  can be in flight. Assignment and send are serialized per account only, so
+  different authorities submit in parallel.
+- A "nonce too low" style rejection resyncs the account from the node and
+  retries with a fresh nonce, up to max_retries times. Any other failed send
+  also resyncs, so later transactions leave no nonce gap.
+- One background thread resolves every pending transaction with a single
+  batched eth_getTransactionReceipt round trip per poll.
+- A transaction still unmined after replace_after seconds is re-sent with the
+  same nonce and a higher gas price (replacement), at most max_replacements
+  times. Whichever version is mined resolves the future.
+- After timeout seconds the future fails with TimeoutError. The stuck nonce is
+  then cancelled (replaced by a 0-value transfer to the sender at a higher gas
+  price) so later transactions from that account are not stuck behind it, and
+  the account's nonce is resynced from the node. The cancellation is best
+  effort: if the original is mined first it still takes effect even though
+  its future reported a timeout.
+
+Receipts are the node's JSON with status, blockNumber and gasUsed converted
+to int; transactionHash and logs are left as hex strings.
+
+Environment (read by BlockchainAuthService):
+- TX_POLL_SECONDS: receipt poll interval (default 0.25)
+- TX_REPLACE_AFTER_SECONDS: replace unmined transactions after (default 30)
+- TX_TIMEOUT_SECONDS: give up after (default 120)
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from backend.blockchain.rpc_batch import RpcBatcher
+
+logger = logging.getLogger(__name__)
+
+_INT_FIELDS = ("status", "blockNumber", "gasUsed", "cumulativeGasUsed", "transactionIndex")
+_NONCE_ERRORS = ("nonce too low", "nonce is too low", "incorrect nonce", "invalid nonce")
+
+
+def _normalize_receipt(raw: Dict[str, Any]) -> Dict[str, Any]:
+    receipt = dict(raw)
+    for name in _INT_FIELDS:
+        if isinstance(receipt.get(name), str):
+            receipt[name] = int(receipt[name], 16)
+    return receipt
+
+
+@dataclass
+class _PendingTx:
+    sender: str
+    params: Dict[str, Any]
+    future: Future
+    nonce: Optional[int] = None
+    gas_price: Optional[int] = None
+    hashes: List[str] = field(default_factory=list)
+    first_sent: float = 0.0
+    sent_at: float = 0.0
+    replacements: int = 0
+
+
+class TxScheduler:
+    def __init__(
+        self,
+        rpc: RpcBatcher,
+        poll_interval: float = 0.25,
+        replace_after: float = 30.0,
+        timeout: float = 120.0,
+        max_replacements: int = 2,
+        max_retries: int = 2,
+        gas_bump: float = 1.125,
+        gas_price_ttl: float = 30.0,
+    ) -> None:
+        self.rpc = rpc
+        self.poll_interval = poll_interval
+        self.replace_after = replace_after
+        self.timeout = timeout
+        self.max_replacements = max_replacements
+        self.max_retries = max_retries
+        self.gas_bump = gas_bump
+        self.gas_price_ttl = gas_price_ttl
+
+        self._nonces: Dict[str, int] = {}
+        self._account_locks: Dict[str, threading.Lock] = {}
+        self._pending: Dict[str, _PendingTx] = {}  # every sent hash -> its transaction
+        self._gas_price: Optional[int] = None
+        self._gas_price_at = 0.0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.submitted = 0
+        self.mined = 0
+        self.replaced = 0
+        self.retried = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    # Nonces and gas price
+
+    def _account_lock(self, sender: str) -> threading.Lock:
+        with self._lock:
+            return self._account_locks.setdefault(sender, threading.Lock())
+
+    def _next_nonce(self, sender: str) -> int:
+        """Caller holds the account lock."""
+        nonce = self._nonces.get(sender)
+        if nonce is None:
+            nonce = int(self.rpc.request("eth_getTransactionCount", [sender, "pending"]), 16)
+        self._nonces[sender] = nonce + 1
+        return nonce
+
+    def _current_gas_price(self) -> int:
+        now = time.monotonic()
+        if self._gas_price is None or now - self._gas_price_at > self.gas_price_ttl:
+            self._gas_price = int(self.rpc.request("eth_gasPrice", []), 16)
+            self._gas_price_at = now
+        return self._gas_price
+
+    def _send_raw(self, record: _PendingTx) -> str:
+        tx = {
+            key: (hex(value) if isinstance(value, int) else value)
+            for key, value in record.params.items()
+        }
+        tx.update({"from": record.sender, "nonce": hex(record.nonce), "gasPrice": hex(record.gas_price)})
+        return self.rpc.request("eth_sendTransaction", [tx])
+
+    def _track(self, record: _PendingTx, tx_hash: str) -> None:
+        now = time.monotonic()
+        record.hashes.append(tx_hash)
+        record.first_sent = record.first_sent or now
+        record.sent_at = now
+        with self._lock:
+            self._pending[tx_hash] = record
+
+    # Submission
+
+    def submit(self, sender: str, params: Dict[str, Any]) -> Future:
+        """Send a transaction from `sender` now; the future resolves to its receipt.
+
+        `params` holds "to", "data", "gas" and optionally "value"/"gasPrice";
+        the nonce is assigned here.
+        """
+        record = _PendingTx(sender=sender, params=dict(params), future=Future())
+        record.gas_price = record.params.pop("gasPrice", None)
+        try:
+            self._send(record)
+        except Exception as e:
+            self.failed += 1
+            record.future.set_exception(e)
+            return record.future
+
+        self.submitted += 1
+        self._ensure_thread()
+        self._wake.set()
+        return record.future
+
+    def _send(self, record: _PendingTx) -> None:
+        if record.gas_price is None:
+            record.gas_price = self._current_gas_price()
+        retries = 0
+        with self._account_lock(record.sender):
+            while True:
+                record.nonce = self._next_nonce(record.sender)
+                try:
+                    tx_hash = self._send_raw(record)
+                    break
+                except Exception as e:
+                    # The nonce was not consumed: later transactions must reuse it
+                    self._nonces.pop(record.sender, None)
+                    if retries < self.max_retries and any(m in str(e).lower() for m in _NONCE_ERRORS):
+                        retries += 1
+                        self.retried += 1
+                        continue
+                    raise
+        self._track(record, tx_hash)
+
+    def _replace(self, record: _PendingTx) -> None:
+        """Re-send an unmined transaction with the same nonce and a higher gas price."""
+        record.gas_price = max(int(record.gas_price * self.gas_bump) + 1, self._current_gas_price())
+        with self._account_lock(record.sender):
+            tx_hash = self._send_raw(record)
+        record.replacements += 1
+        self.replaced += 1
+        self._track(record, tx_hash)
+
+    def _cancel(self, record: _PendingTx) -> None:
+        """Free the nonce of a timed-out transaction and resync the account."""
+        cancel = _PendingTx(
+            sender=record.sender,
+            params={"to": record.sender, "value": 0, "gas": 21000},
+            future=record.future,
+            nonce=record.nonce,
+            gas_price=max(int(record.gas_price * self.gas_bump) + 1, self._current_gas_price()),
+        )
+        with self._account_lock(record.sender):
+            # The next send reads the pending count again instead of queueing behind the gap
+            self._nonces.pop(record.sender, None)
+            try:
+                self._send_raw(cancel)
+                self.cancelled += 1
+            except Exception as e:
+                # e.g. the original was mined meanwhile ("nonce too low")
+                logger.warning("Cancelling transaction %s failed: %s", record.hashes[-1], e)
+
+    # Receipts
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="tx-scheduler", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.warning("Receipt poll failed: %s", e)
+
+    def _finish(self, record: _PendingTx) -> bool:
+        with self._lock:
+            for tx_hash in record.hashes:
+                self._pending.pop(tx_hash, None)
+        return not record.future.done()
+
+    def poll_once(self) -> int:
+        """Fetch receipts of all pending transactions in one batch; returns how many resolved."""
+        with self._lock:
+            hashes = list(self._pending)
+        if not hashes:
+            return 0
+
+        responses = self.rpc.request_many([("eth_getTransactionReceipt", [h]) for h in hashes])
+        now = time.monotonic()
+        resolved = 0
+        for tx_hash, response in zip(hashes, responses):
+            with self._lock:
+                record = self._pending.get(tx_hash)
+            if record is None:
+                continue
+
+            receipt = response.get("result")
+            if receipt:
+                if self._finish(record):
+                    record.future.set_result(_normalize_receipt(receipt))
+                    self.mined += 1
+                    resolved += 1
+            elif now - record.first_sent > self.timeout:
+                if self._finish(record):
+                    self.failed += 1
+                    self._cancel(record)
+                    record.future.set_exception(TimeoutError(
+                        f"Transaction {record.hashes[-1]} not mined after {self.timeout}s; "
+                        f"nonce {record.nonce} was cancelled (the original may still be mined if it lands first)"
+                    ))
+            elif (
+                tx_hash == record.hashes[-1]
+                and now - record.sent_at > self.replace_after
+                and record.replacements < self.max_replacements
+            ):
+                try:
+                    self._replace(record)
+                except Exception as e:
+                    # e.g. the original was mined meanwhile ("nonce too low"); the next poll sees it
+                    logger.warning("Replacing transaction %s failed: %s", tx_hash, e)
+                    record.sent_at = now
+        return resolved
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            pending = len({id(r) for r in self._pending.values()})
+        return {
+            "pending": pending,
+            "submitted": self.submitted,
+            "mined": self.mined,
+            "replaced": self.replaced,
+            "retried": self.retried,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+        }
@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 
@@ -15,3 +16,35 @@ engine = create_engine(
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
+
+
+def add_missing_columns(table_name: str, columns: dict, bind=None) -> list:
+    """Add columns that create_all() cannot add to an existing table.
+
+    `columns` maps column name -> SQL type/constraint DDL. Returns the names
+    that were added.
+    """
+    bind = bind or engine
+    existing = {c["name"] for c in inspect(bind).get_columns(table_name)}
+    added = []
+    with bind.begin() as conn:
+        for name, ddl in columns.items():
+            if name not in existing:
+                conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {name} {ddl}"))
+                added.append(name)
+    return added
+
+
+def upsert_rows(db, model, rows: list, key_columns: list) -> None:
+    """Insert `rows` (dicts) or update them on a key conflict, as one bulk
+    INSERT ... ON CONFLICT DO UPDATE statement (no SELECT per row, unlike
+    Session.merge). Runs in the session's transaction; the caller commits.
+    """
+    if not rows:
+        return
+    stmt = sqlite_insert(model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={name: stmt.excluded[name] for name in rows[0] if name not in key_columns},
+    )
+    db.execute(stmt, rows)
@@ -16,10 +16,30 @@ from backend.api.access_routes import router as access_router
 from backend.api.storage_routes import router as storage_router
 from backend.models import User
 from backend.auth.routes import hash_password, verify_password
+from backend.abe.policy_store import backfill_policy_ids, ensure_policy_schema
+from backend.abe.access_matrix import ensure_access_matrix
+from backend.abe.share_metadata import get_share_metadata
+from backend.abe.share_store import migrate_legacy_shares
 
 logger = logging.getLogger("backend")
 load_dotenv(dotenv_path=Path(__file__).resolve().parents[1] / ".env")
 Base.metadata.create_all(bind=engine)
+ensure_policy_schema(engine)
+
+def init_policy_ids():
+    db = SessionLocal()
+    try:
+        updated = backfill_policy_ids(db)
+        if updated:
+            logger.info("Interned policies for %d existing files", updated)
+        return updated
+    except Exception as e:
+        logger.warning("Error backfilling policy ids: %s", e)
+        return 0
+    finally:
+        db.close()
+
+policies_backfilled = init_policy_ids()
 
 def init_test_users():
     db = SessionLocal()
@@ -65,6 +85,34 @@ def init_test_users():
 
 init_test_users()
 
+def init_access_matrix():
+    db = SessionLocal()
+    try:
+        # Backfilled policies were never granted: rebuild to include them
+        grants = ensure_access_matrix(db, force=bool(policies_backfilled))
+        if grants is not None:
+            logger.info("Access matrix built (%d grants)", grants)
+    except Exception as e:
+        logger.warning("Error building access matrix: %s", e)
+    finally:
+        db.close()
+
+init_access_matrix()
+
+def init_share_store():
+    try:
+        get_share_metadata().ensure_generation()
+    except Exception as e:
+        logger.warning("Error initializing share metadata: %s", e)
+    try:
+        migrated = migrate_legacy_shares()
+        if migrated:
+            logger.info("Migrated key shares of %d files into the share store", migrated)
+    except Exception as e:
+        logger.warning("Error migrating key shares: %s", e)
+
+init_share_store()
+
 app = FastAPI(
     title="Secure Data Sharing API",
     description="Secure file sharing with attribute policies and a local blockchain approval flow.",
@@ -87,7 +135,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Disposition"],
+    expose_headers=["Content-Disposition", "Content-Range", "Accept-Ranges", "Content-Length"],
 )
 
 app.include_router(auth_router)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, LargeBinary
+from sqlalchemy import Column, ForeignKey, Integer, String, LargeBinary
 from backend.database import Base
 
 class User(Base):
@@ -22,6 +22,15 @@ class SecureFile(Base):
     file_path = Column(String, nullable=False)
     encrypted_key = Column(LargeBinary, nullable=False)
     policy = Column(String, nullable=False)
+    # Interned canonical policy (NULL for rows not yet backfilled)
+    policy_id = Column(Integer, ForeignKey("policies.id"), index=True, nullable=True)
+
+
+class Policy(Base):
+    __tablename__ = "policies"
+
+    id = Column(Integer, primary_key=True, index=True)
+    canonical = Column(String, unique=True, index=True, nullable=False)
 
 
 class RecoveryCode(Base):
@@ -30,3 +39,77 @@ class RecoveryCode(Base):
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True, nullable=False)
     code_hash = Column(String, nullable=False)
+
+
+class AttributeSet(Base):
+    __tablename__ = "attribute_sets"
+
+    id = Column(Integer, primary_key=True, index=True)
+    fingerprint = Column(String, unique=True, index=True, nullable=False)
+    attributes = Column(String, nullable=False)  # normalized tokens, newline-separated
+
+
+class SchemaVersion(Base):
+    """Format version of a derived table; it is rebuilt when the version changes."""
+    __tablename__ = "schema_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False)
+
+
+class AccessGrant(Base):
+    """Materialized decision: users with this attribute set satisfy this policy."""
+    __tablename__ = "access_grants"
+
+    attribute_set_id = Column(Integer, ForeignKey("attribute_sets.id"), primary_key=True)
+    policy_id = Column(Integer, ForeignKey("policies.id"), primary_key=True, index=True)
+
+
+class ShareSet(Base):
+    """Shamir share metadata of a file (shares themselves live in the share store)."""
+    __tablename__ = "share_sets"
+
+    file_id = Column(String, primary_key=True)
+    authorities = Column(String, nullable=False)  # JSON list; position + 1 = share index
+    threshold = Column(Integer, nullable=False)
+    total_shares = Column(Integer, nullable=False)
+    mode = Column(String, nullable=False, default="prime")
+    created_at = Column(String, nullable=False)
+
+
+class KeyShare(Base):
+    """Shamir key share of one authority for one file (SHARE_STORE=database)."""
+    __tablename__ = "key_shares"
+
+    file_id = Column(String, primary_key=True)
+    authority = Column(String, primary_key=True)
+    share = Column(LargeBinary, nullable=False)
+
+
+class CacheGeneration(Base):
+    """Counters bumped on writes so other processes can drop stale caches."""
+    __tablename__ = "cache_generations"
+
+    name = Column(String, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
+
+
+class ApprovalVote(Base):
+    """Indexed Approved(keyId, authority, count) events of the KeyAuthority contract."""
+    __tablename__ = "approval_votes"
+
+    contract = Column(String, primary_key=True)  # lowercase contract address
+    key_id = Column(String, primary_key=True)  # 0x-prefixed bytes32
+    authority = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False)  # approvals of key_id after this vote
+    block_number = Column(Integer, nullable=False, index=True)
+    tx_hash = Column(String, nullable=True)
+
+
+class IndexerCursor(Base):
+    """Last block processed by a log indexer."""
+    __tablename__ = "indexer_cursors"
+
+    name = Column(String, primary_key=True)
+    block_number = Column(Integer, nullable=False, default=-1)
+    block_hash = Column(String, nullable=True)
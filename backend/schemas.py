@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 class UserCreate(BaseModel):
     username: str
@@ -28,3 +28,12 @@ class UserRoleAssign(BaseModel):
     role: str
     department: str
     clearance: str
+
+
+class PolicyEvaluationRequest(BaseModel):
+    # Rows: users (by username) followed by raw attribute sets
+    usernames: List[str] = []
+    attribute_sets: List[List[str]] = []
+    # Columns: stored files (by id) followed by draft policies
+    file_ids: List[int] = []
+    policies: List[str] = []
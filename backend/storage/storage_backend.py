@@ -0,0 +1,190 @@
+"""Storage of encrypted file blobs: MongoDB GridFS or the local filesystem.
+
+SecureFile.file_path values:
+- "gridfs:<ObjectId>" (or a bare 24-char ObjectId from older records): GridFS
+- "local:<name>": a file in LOCAL_STORAGE_DIR
+- anything else: a legacy filesystem path
+
+Besides the whole-blob helpers (save/load/delete_encrypted_blob) the backend
+exposes streaming hooks used by backend.utils.blob_io, so uploads and
+downloads never hold a whole blob in memory:
+- open_encrypted_blob: seekable reader (GridFS download stream / file handle)
+- open_encrypted_blob_writer: writer with write(data), close() -> file_path
+  and abort() (GridFS upload stream / temp file renamed on close)
+
+Environment:
+- STORAGE_BACKEND: "mongo" (default) / "local"
+- STORAGE_ALLOW_LOCAL_FALLBACK: write locally when MongoDB is unreachable (default true)
+- MONGODB_DB: database name (default secure_data_sharing)
+- MONGODB_FILES_BUCKET: GridFS bucket (default encrypted_files)
+- LOCAL_STORAGE_DIR: local blob directory (default backend/storage/encrypted_files)
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import uuid
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_OBJECT_ID = re.compile(r"^[0-9a-fA-F]{24}$")
+
+_bucket = None
+_bucket_lock = threading.Lock()
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    value = (os.getenv(name) or "").strip().lower()
+    if not value:
+        return default
+    return value in {"1", "true", "yes", "y", "on"}
+
+
+def _local_dir() -> str:
+    directory = os.getenv("LOCAL_STORAGE_DIR") or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "encrypted_files"
+    )
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def _gridfs_bucket():
+    """GridFS bucket for encrypted blobs (connected and pinged on first use)."""
+    global _bucket
+
+    with _bucket_lock:
+        if _bucket is None:
+            from gridfs import GridFSBucket
+
+            from backend.mongo_client import get_mongo_client
+
+            client = get_mongo_client()
+            client.admin.command("ping")
+            db = client[(os.getenv("MONGODB_DB") or "secure_data_sharing").strip()]
+            _bucket = GridFSBucket(db, bucket_name=(os.getenv("MONGODB_FILES_BUCKET") or "encrypted_files").strip())
+        return _bucket
+
+
+def _resolve(file_path: str) -> Tuple[str, str]:
+    """("gridfs", object id) or ("local", filesystem path) for a stored file_path."""
+    file_path = str(file_path or "")
+    if file_path.startswith("gridfs:"):
+        return "gridfs", file_path[len("gridfs:"):]
+    if file_path.startswith("local:"):
+        # basename: a stored key never points outside the storage directory
+        return "local", os.path.join(_local_dir(), os.path.basename(file_path[len("local:"):]))
+    if _OBJECT_ID.match(file_path):
+        return "gridfs", file_path
+    return "local", file_path
+
+
+# Streaming writers
+
+
+class _LocalBlobWriter:
+    """Writes to <name>.part and renames it on close, so readers never see a partial blob."""
+
+    def __init__(self, directory: str) -> None:
+        self._name = uuid.uuid4().hex
+        self._path = os.path.join(directory, self._name)
+        self._tmp_path = self._path + ".part"
+        self._file = open(self._tmp_path, "wb")
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+
+    def close(self) -> str:
+        self._file.close()
+        os.replace(self._tmp_path, self._path)
+        return f"local:{self._name}"
+
+    def abort(self) -> None:
+        self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+class _GridFSBlobWriter:
+    """GridFS upload stream; chunks are sent to MongoDB as they fill."""
+
+    def __init__(self, stream) -> None:
+        self._stream = stream
+
+    def write(self, data: bytes) -> None:
+        self._stream.write(data)
+
+    def close(self) -> str:
+        self._stream.close()
+        return f"gridfs:{self._stream._id}"
+
+    def abort(self) -> None:
+        self._stream.abort()
+
+
+def open_encrypted_blob_writer(filename: Optional[str] = None, metadata: Optional[dict] = None):
+    """Open a streaming writer for a new encrypted blob in the configured backend."""
+    if (os.getenv("STORAGE_BACKEND") or "mongo").strip().lower() == "mongo":
+        try:
+            stream = _gridfs_bucket().open_upload_stream(filename or "encrypted_blob", metadata=metadata)
+            return _GridFSBlobWriter(stream)
+        except Exception as e:
+            if not _env_bool("STORAGE_ALLOW_LOCAL_FALLBACK", default=True):
+                raise
+            logger.warning("MongoDB unavailable (%s); storing blob locally", e)
+    return _LocalBlobWriter(_local_dir())
+
+
+def open_encrypted_blob(file_path: str):
+    """Open a stored blob as a seekable binary file object (read lazily)."""
+    kind, ref = _resolve(file_path)
+    if kind == "gridfs":
+        from bson import ObjectId
+
+        return _gridfs_bucket().open_download_stream(ObjectId(ref))
+    return open(ref, "rb")
+
+
+# Whole-blob helpers
+
+
+def save_encrypted_blob(data: bytes, filename: Optional[str] = None, metadata: Optional[dict] = None) -> str:
+    """Store `data`; returns the file_path to keep in SecureFile."""
+    writer = open_encrypted_blob_writer(filename=filename, metadata=metadata)
+    try:
+        writer.write(data)
+        return writer.close()
+    except Exception:
+        writer.abort()
+        raise
+
+
+def load_encrypted_blob(file_path: str) -> bytes:
+    blob = open_encrypted_blob(file_path)
+    try:
+        return blob.read()
+    finally:
+        blob.close()
+
+
+def delete_encrypted_blob(file_path: str) -> None:
+    """Delete a stored blob; a blob that is already gone is not an error."""
+    kind, ref = _resolve(file_path)
+    if kind == "gridfs":
+        from bson import ObjectId
+        from gridfs.errors import NoFile
+
+        try:
+            _gridfs_bucket().delete(ObjectId(ref))
+        except NoFile:
+            pass
+        return
+    try:
+        os.remove(ref)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import io
+from itertools import chain
+from typing import Iterable, Iterator, Optional
+
+
+def open_stored_blob(file_path: str):
+    """Open a stored encrypted blob as a seekable binary file object.
+
+    Uses the storage backend's native reader (GridFS download stream / local
+    file handle) from `open_encrypted_blob`; backends without that hook fall
+    back to loading the blob into memory.
+    """
+    from backend.storage import storage_backend
+
+    opener = getattr(storage_backend, "open_encrypted_blob", None)
+    if opener is not None:
+        return opener(file_path)
+    return io.BytesIO(storage_backend.load_encrypted_blob(file_path))
+
+
+class _BufferedBlobWriter:
+    """Fallback writer for storage backends without `open_encrypted_blob_writer`.
+
+    Ciphertext is collected in memory and saved with save_encrypted_blob on close.
+    """
+
+    def __init__(self, storage_backend, filename: Optional[str], metadata: Optional[dict]) -> None:
+        self._storage_backend = storage_backend
+        self._filename = filename
+        self._metadata = metadata
+        self._buffer = io.BytesIO()
+
+    def write(self, data: bytes) -> None:
+        self._buffer.write(data)
+
+    def close(self) -> str:
+        return self._storage_backend.save_encrypted_blob(
+            self._buffer.getvalue(),
+            filename=self._filename,
+            metadata=self._metadata,
+        )
+
+    def abort(self) -> None:
+        self._buffer = io.BytesIO()
+
+
+def open_stored_blob_writer(filename: Optional[str] = None, metadata: Optional[dict] = None):
+    """Open a writer that streams an encrypted blob into the storage backend.
+
+    The writer exposes write(data), close() -> file_path and abort(). Uses the
+    storage backend's `open_encrypted_blob_writer` (GridFS upload stream / local
+    file) when available, so ciphertext is written chunk by chunk.
+    """
+    from backend.storage import storage_backend
+
+    opener = getattr(storage_backend, "open_encrypted_blob_writer", None)
+    if opener is not None:
+        return opener(filename=filename, metadata=metadata)
+    return _BufferedBlobWriter(storage_backend, filename, metadata)
+
+
+def close_after(chunks: Iterable[bytes], fileobj) -> Iterator[bytes]:
+    """Yield from `chunks`, closing `fileobj` once the consumer is done."""
+    try:
+        yield from chunks
+    finally:
+        try:
+            fileobj.close()
+        except Exception:
+            pass
+
+
+def prefetch_first(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Pull the first chunk eagerly so errors surface before a response starts."""
+    it = iter(chunks)
+    for first in it:
+        return chain([first], it)
+    return iter(())
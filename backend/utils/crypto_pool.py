@@ -0,0 +1,104 @@
+"""Worker pool for CPU-bound crypto stages called from async routes.
+
+AES (via the cryptography library), bcrypt and hashing release the GIL, so a
+thread pool scales across cores without blocking the event loop. A process
+pool can be selected for picklable, stateless work.
+
+Environment:
+- CRYPTO_POOL_KIND: "thread" (default) or "process"
+- CRYPTO_POOL_WORKERS: worker count (default: CPU count)
+- CRYPTO_POOL_MAX_PENDING: jobs allowed in flight before callers wait
+  (default: 2 x workers). This is the backpressure limit: an upload that
+  cannot submit its next chunk stops reading from the client.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import threading
+import weakref
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        value = int((os.getenv(name) or "").strip())
+    except ValueError:
+        return default
+    return value if value > 0 else default
+
+
+class CryptoPool:
+    def __init__(self, kind: str = "thread", workers: Optional[int] = None, max_pending: Optional[int] = None) -> None:
+        kind = (kind or "thread").strip().lower()
+        if kind not in {"thread", "process"}:
+            raise ValueError(f"Unsupported crypto pool kind: {kind}")
+
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 2
+
+        self._threads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="crypto")
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+        # One semaphore per event loop (asyncio primitives are loop-bound).
+        self._slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+    def _executor(self, shared_state: bool) -> Executor:
+        if self.kind == "thread" or shared_state:
+            return self._threads
+        with self._lock:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(max_workers=self.workers)
+            return self._processes
+
+    def _semaphore(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        sem = self._slots.get(loop)
+        if sem is None:
+            sem = asyncio.Semaphore(self.max_pending)
+            self._slots[loop] = sem
+        return sem
+
+    async def run(self, func: Callable[..., Any], *args: Any, shared_state: bool = False, **kwargs: Any) -> Any:
+        """Run `func(*args, **kwargs)` in the pool and await its result.
+
+        Set `shared_state=True` for callables bound to in-process state (an
+        incremental encryptor, the ABE manager singleton); those always run in
+        the thread pool, even when the process pool is configured.
+        """
+        loop = asyncio.get_running_loop()
+        async with self._semaphore(loop):
+            return await loop.run_in_executor(
+                self._executor(shared_state),
+                functools.partial(func, *args, **kwargs),
+            )
+
+    def stats(self) -> dict:
+        return {"kind": self.kind, "workers": self.workers, "max_pending": self.max_pending}
+
+    def shutdown(self) -> None:
+        self._threads.shutdown(wait=False)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False)
+
+
+# Singleton instance
+_crypto_pool: Optional[CryptoPool] = None
+
+
+def get_crypto_pool() -> CryptoPool:
+    """Get or create the crypto worker pool (configured from the environment)."""
+    global _crypto_pool
+
+    if _crypto_pool is None:
+        _crypto_pool = CryptoPool(
+            kind=os.getenv("CRYPTO_POOL_KIND") or "thread",
+            workers=_env_int("CRYPTO_POOL_WORKERS", os.cpu_count() or 1),
+            max_pending=_env_int("CRYPTO_POOL_MAX_PENDING", 0) or None,
+        )
+
+    return _crypto_pool
@@ -10,6 +10,8 @@ contract KeyAuthority {
     mapping(bytes32 => uint) public approvals;
     mapping(bytes32 => mapping(address => bool)) public approvedBy;
 
+    event Approved(bytes32 indexed keyId, address indexed authority, uint count);
+
     constructor(address[] memory _authorities, uint _threshold) {
         owner = msg.sender;
         threshold = _threshold;
@@ -27,8 +29,23 @@ contract KeyAuthority {
     function approveKey(bytes32 keyId) public onlyAuthority {
         require(!approvedBy[keyId][msg.sender], "Already approved");
 
+        _approve(keyId);
+    }
+
+    // Vote on many keys in one transaction; keys the caller already approved are skipped.
+    function approveKeys(bytes32[] calldata keyIds) external onlyAuthority {
+        for (uint i = 0; i < keyIds.length; i++) {
+            if (!approvedBy[keyIds[i]][msg.sender]) {
+                _approve(keyIds[i]);
+            }
+        }
+    }
+
+    function _approve(bytes32 keyId) internal {
         approvedBy[keyId][msg.sender] = true;
         approvals[keyId] += 1;
+
+        emit Approved(keyId, msg.sender, approvals[keyId]);
     }
 
     function isApproved(bytes32 keyId) public view returns (bool) {
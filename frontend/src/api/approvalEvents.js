@@ -0,0 +1,61 @@
+import axios from "axios";
+
+const POLL_FALLBACK_MS = 3000;
+
+/*
+ * Follow the approval progress of one key.
+ * Uses the server-sent event stream (/api/access/approval-events) and falls
+ * back to polling /api/access/approval-status if the stream is unavailable.
+ * onStatus receives the same payload as the approval-status endpoint.
+ * Returns a function that stops watching.
+ */
+export function watchApproval(baseUrl, keyId, onStatus, onError) {
+  let stopped = false;
+  let source = null;
+  let timer = null;
+
+  const stop = () => {
+    stopped = true;
+    if (source) source.close();
+    if (timer) clearInterval(timer);
+  };
+
+  const poll = () => {
+    timer = setInterval(async () => {
+      try {
+        const res = await axios.get(`${baseUrl}/api/access/approval-status/${keyId}`);
+        if (stopped) return;
+        onStatus(res.data);
+        if (res.data?.is_approved) stop();
+      } catch (err) {
+        stop();
+        if (onError) onError(err);
+      }
+    }, POLL_FALLBACK_MS);
+  };
+
+  if (typeof window === "undefined" || !window.EventSource) {
+    poll();
+    return stop;
+  }
+
+  source = new EventSource(
+    `${baseUrl}/api/access/approval-events?key_id=${encodeURIComponent(keyId)}`
+  );
+  source.addEventListener("approval", (event) => {
+    if (stopped) return;
+    const status = JSON.parse(event.data);
+    onStatus(status);
+    if (status.is_approved) stop();
+  });
+  source.addEventListener("done", stop);
+  source.onerror = () => {
+    // Stream refused or dropped before approval: fall back to polling
+    if (stopped) return;
+    source.close();
+    source = null;
+    poll();
+  };
+
+  return stop;
+}
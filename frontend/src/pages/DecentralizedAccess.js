@@ -1,5 +1,6 @@
 import axios from 'axios';
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
+import { watchApproval } from '../api/approvalEvents';
 
 const API_URL = 'http://localhost:8000';
 
@@ -11,10 +12,12 @@ export default function DecentralizedAccess() {
   const [userApprovals, setUserApprovals] = useState([]);
   const [loading, setLoading] = useState(false);
   const [message, setMessage] = useState('');
+  const stopWatching = useRef(null);
 
   useEffect(() => {
     checkBlockchain();
     getAuthorities();
+    return () => stopWatching.current && stopWatching.current();
   }, []);
 
   const checkBlockchain = async () => {
@@ -57,8 +60,8 @@ export default function DecentralizedAccess() {
       setMessage(`Approval request created. Key ID: ${response.data.key_id.substring(0, 10)}...`);
       localStorage.setItem('current_key_id', response.data.key_id);
       
-      // Start polling approval status
-      pollApprovalStatus(response.data.key_id);
+      // Follow approval progress (pushed by the backend)
+      watchApprovalStatus(response.data.key_id);
     } catch (error) {
       setMessage('Failed to request approval: ' + error.response?.data?.detail);
     } finally {
@@ -66,24 +69,19 @@ export default function DecentralizedAccess() {
     }
   };
 
-  const pollApprovalStatus = async (keyId) => {
-    const interval = setInterval(async () => {
-      try {
-        const response = await axios.get(`${API_URL}/api/access/approval-status/${keyId}`);
-        setApprovalStatus(response.data);
-        const totalAuthorities = response.data?.total_authorities ?? authorities.length;
-        const threshold = response.data?.threshold ?? response.data?.required_approvals ?? 4;
+  const watchApprovalStatus = (keyId) => {
+    if (stopWatching.current) stopWatching.current();
+    stopWatching.current = watchApproval(API_URL, keyId, (status) => {
+      setApprovalStatus(status);
+      const totalAuthorities = status?.total_authorities ?? authorities.length;
+      const threshold = status?.threshold ?? status?.required_approvals ?? 4;
 
-        if (response.data.is_approved) {
-          setMessage(`Key approved. ${response.data.current_approvals}/${totalAuthorities} authorities approved (threshold: ${threshold}).`);
-          clearInterval(interval);
-        } else {
-          setMessage(`Waiting for approvals: ${response.data.current_approvals}/${totalAuthorities} (threshold: ${threshold})`);
-        }
-      } catch (error) {
-        clearInterval(interval);
+      if (status.is_approved) {
+        setMessage(`Key approved. ${status.current_approvals}/${totalAuthorities} authorities approved (threshold: ${threshold}).`);
+      } else {
+        setMessage(`Waiting for approvals: ${status.current_approvals}/${totalAuthorities} (threshold: ${threshold})`);
       }
-    }, 3000);
+    });
   };
 
   const simulateApprovals = async () => {
@@ -1,5 +1,6 @@
 import axios from "axios";
 import { useEffect, useState } from "react";
+import { watchApproval } from "../api/approvalEvents";
 
 export default function Download() {
   const [files, setFiles] = useState([]);
@@ -150,6 +151,14 @@ export default function Download() {
     fetchFiles();
   }, []);
 
+  // Approvals may also come from authorities elsewhere: follow the key's progress
+  useEffect(() => {
+    if (!keyId) return undefined;
+    return watchApproval(API_BASE, keyId, (status) => {
+      if (status?.is_approved) setApprovalStatus("approved");
+    });
+  }, [keyId]);
+
   const fetchFiles = async () => {
     try {
       const res = await axios.get(`${API_BASE}/files/all`);
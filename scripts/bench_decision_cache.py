@@ -0,0 +1,33 @@
+"""Time policy_satisfied() cache hits against direct evaluation.
+
+Run from the project root: python scripts/bench_decision_cache.py
+Wall-clock numbers depend on the machine; this is not a pass/fail check.
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from backend.abe.cpabe_utils import compile_policy, normalize_attributes, policy_satisfied
+from backend.abe.decision_cache import get_decision_cache
+
+attrs = {"role:employee", "dept:Sales", "department:Sales", "clearance:high"}
+policies = {
+    "small": "role:employee AND dept:Sales",
+    "large": " OR ".join(f"(role:r{i} AND dept:d{i} AND clearance >= medium)" for i in range(12))
+    + " OR (role:employee AND 2 of (dept:Sales, clearance:high, role:x))",
+}
+
+for name, policy in policies.items():
+    compiled = compile_policy(policy)
+    policy_satisfied(attrs, policy)  # warm the cache
+
+    def best(fn):
+        return min(timeit.repeat(fn, number=2000, repeat=5)) / 2000 * 1e6
+
+    hit = best(lambda: policy_satisfied(attrs, policy))
+    evaluation = best(lambda: compiled.evaluate(normalize_attributes(attrs)))
+    print(f"{name:6} policy: cache hit {hit:.2f}us, normalize + evaluate {evaluation:.2f}us")
+
+print("decision cache:", get_decision_cache().stats())
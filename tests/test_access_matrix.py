@@ -0,0 +1,107 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.models import AccessGrant, AttributeSet, SchemaVersion, SecureFile, User
+from backend.abe.access_matrix import (
+    MATRIX_VERSION,
+    accessible_file_ids,
+    ensure_access_matrix,
+    ensure_attribute_set,
+    grant_policy,
+    rebuild_access_matrix,
+    release_policy,
+    user_attributes,
+)
+from backend.abe.policy_store import intern_policy
+
+
+def _add_file(db, policy):
+    row = intern_policy(db, policy)
+    f = SecureFile(filename="f", owner="admin", file_path="p", encrypted_key=b"{}", policy=policy, policy_id=row.id)
+    db.add(f)
+    db.commit()
+    grant_policy(db, row)
+    return f
+
+
+def test_access_matrix_incremental_maintenance():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    alice = User(username="alice", password="x", role="employee", department="IT", clearance="high")
+    carol = User(username="carol", password="x", role="employee", department="it", clearance="HIGH")
+    bob = User(username="bob", password="x", role="accountant", department="Finance", clearance="medium")
+    db.add_all([alice, carol, bob])
+    db.commit()
+    rebuild_access_matrix(db)
+    # Equal attribute sets (after normalization) share one row
+    assert db.query(AttributeSet).count() == 2
+
+    it_file = _add_file(db, "dept:IT AND clearance >= high")
+    fin_file = _add_file(db, "dept:Finance OR role:admin")
+    assert accessible_file_ids(db, user_attributes(alice)) == [it_file.id]
+    assert accessible_file_ids(db, user_attributes(bob)) == [fin_file.id]
+
+    # Attribute change only materializes the new set
+    alice.role = "admin"
+    db.commit()
+    ensure_attribute_set(db, user_attributes(alice))
+    assert accessible_file_ids(db, user_attributes(alice)) == [it_file.id, fin_file.id]
+    assert accessible_file_ids(db, user_attributes(carol)) == [it_file.id]
+
+    policy_id = fin_file.policy_id
+    db.delete(fin_file)
+    db.commit()
+    assert release_policy(db, policy_id)
+    assert db.query(AccessGrant).filter(AccessGrant.policy_id == policy_id).count() == 0
+    assert accessible_file_ids(db, user_attributes(bob)) == []
+    db.close()
+
+
+def test_access_matrix_is_built_once_per_version():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add(User(username="alice", password="x", role="employee", department="IT", clearance="high"))
+    db.commit()
+
+    it_file = _add_file(db, "dept:IT")
+    assert ensure_access_matrix(db) == 1
+    set_ids = [row.id for row in db.query(AttributeSet)]
+
+    # A restarted worker keeps the incrementally maintained rows
+    assert ensure_access_matrix(db) is None
+    assert [row.id for row in db.query(AttributeSet)] == set_ids
+
+    # An outdated matrix is rebuilt
+    db.get(SchemaVersion, "access_matrix").version = MATRIX_VERSION - 1
+    db.commit()
+    assert ensure_access_matrix(db) == 1
+    assert db.get(SchemaVersion, "access_matrix").version == MATRIX_VERSION
+    assert accessible_file_ids(db, {"dept:IT"}) == [it_file.id]
+    db.close()
+
+
+def test_release_keeps_grants_of_a_policy_reused_by_a_new_file():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    bob = User(username="bob", password="x", role="accountant", department="Finance", clearance="medium")
+    db.add(bob)
+    db.commit()
+    rebuild_access_matrix(db)
+
+    old = _add_file(db, "dept:Finance")
+    policy_id = old.policy_id
+    db.delete(old)
+    # A new upload re-interns the policy before the release runs; its grants
+    # already exist, so it adds none of its own
+    new = SecureFile(filename="g", owner="admin", file_path="q", encrypted_key=b"{}", policy="dept:Finance", policy_id=policy_id)
+    db.add(new)
+    db.commit()
+
+    assert not release_policy(db, policy_id)
+    assert accessible_file_ids(db, user_attributes(bob)) == [new.id]
+    db.close()
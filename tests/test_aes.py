@@ -1,5 +1,22 @@
+import io
 import time
-from backend.aes.aes_utils import generate_aes_key, encrypt_file, decrypt_file, encrypt_blob, decrypt_blob
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from backend.aes.aes_utils import (
+    generate_aes_key,
+    encrypt_file,
+    decrypt_file,
+    encrypt_blob,
+    decrypt_blob,
+    encrypt_stream,
+    decrypt_stream,
+    decrypt_range,
+    decrypt_fileobj,
+    read_segmented_layout,
+    StreamEncryptor,
+    SegmentedEncryptor,
+)
 
 def test_aes():
     data = b"This is a test file"
@@ -27,5 +44,86 @@ def test_blob_roundtrip_and_legacy_compat():
     legacy_blob = iv + ct
     assert decrypt_blob(legacy_blob, key) == data
 
+
+def test_stream_roundtrip_matches_blob_format():
+    data = bytes(range(256)) * 1000 + b"tail"
+    key = generate_aes_key()
+
+    # Feed odd-sized chunks so block boundaries never line up with chunk boundaries.
+    chunks = [data[i:i + 1000] for i in range(0, len(data), 1000)]
+    blob = b"".join(encrypt_stream(chunks, key, chunk_size=4096))
+
+    assert decrypt_blob(blob, key) == data
+    assert b"".join(decrypt_stream([blob[i:i + 7] for i in range(0, len(blob), 7)], key)) == data
+
+
+def test_stream_decrypts_legacy_blob():
+    data = b"legacy stream"
+    key = generate_aes_key()
+
+    iv, ct = encrypt_file(data, key)
+    assert b"".join(decrypt_stream([iv + ct], key)) == data
+
+
+def test_stream_decrypts_cbc_stream_blob():
+    data = b"version 1 blob"
+    key = generate_aes_key()
+
+    encryptor = StreamEncryptor(key, chunk_size=1024)
+    blob = encryptor.update(data) + encryptor.finalize()
+    assert decrypt_blob(blob, key) == data
+
+
+def test_segmented_range_decrypt_reads_only_covering_segments():
+    data = bytes(range(256)) * 40
+    key = generate_aes_key()
+    blob = encrypt_blob(data, key, chunk_size=1000)
+
+    layout = read_segmented_layout(io.BytesIO(blob))
+    assert layout.plaintext_size == len(data)
+    assert list(layout.segments_for_range(2500, 3100)) == [2, 3]
+
+    for start, stop in [(0, 1), (999, 1001), (2500, 3100), (len(data) - 5, len(data) + 10)]:
+        assert b"".join(decrypt_range(io.BytesIO(blob), key, start, stop)) == data[start:stop]
+
+
+def test_segmented_blob_rejects_tampering_and_truncation():
+    data = b"x" * 5000
+    key = generate_aes_key()
+    blob = encrypt_blob(data, key, chunk_size=1000)
+
+    tampered = bytearray(blob)
+    tampered[100] ^= 1
+    with pytest.raises(ValueError):
+        decrypt_blob(bytes(tampered), key)
+
+    # Dropping the final segment must not yield a shorter "valid" file.
+    with pytest.raises(ValueError):
+        decrypt_blob(blob[:-1016], key)
+
+
+def test_decrypt_fileobj_streams_all_formats():
+    data = b"streamed download " * 500
+    key = generate_aes_key()
+
+    iv, ct = encrypt_file(data, key)
+    for blob in (encrypt_blob(data, key, chunk_size=1024), iv + ct):
+        chunks = list(decrypt_fileobj(io.BytesIO(blob), key, chunk_size=512))
+        assert len(chunks) > 1
+        assert b"".join(chunks) == data
+
+
+def test_parallel_segment_encryption_keeps_order():
+    data = bytes(range(256)) * 4000
+    key = generate_aes_key()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        encryptor = SegmentedEncryptor(key, segment_size=1024, executor=executor)
+        blob = encryptor.update(data[:500_000]) + encryptor.update(data[500_000:]) + encryptor.finalize()
+        assert b"".join(decrypt_stream([blob], key, executor=executor)) == data
+
+    assert decrypt_blob(blob, key) == data
+    assert b"".join(decrypt_range(io.BytesIO(blob), key, 300_000, 300_100)) == data[300_000:300_100]
+
 if __name__ == "__main__":
     test_aes()
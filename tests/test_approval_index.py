@@ -0,0 +1,163 @@
+import asyncio
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.blockchain.approval_events import ApprovalHub
+from backend.blockchain.approval_index import ApprovalIndex
+
+KEY = "0x" + "ab" * 32
+OTHER = "0x" + "cd" * 32
+
+
+class FakeChain:
+    """Minimal w3 + contract pair serving Approved logs from a list."""
+
+    def __init__(self):
+        self.logs = []
+        self.block_number = 0
+        self.epoch = 0  # bumped on restart: same numbers, different hashes
+        self.get_logs_calls = []
+        self.address = "0x" + "11" * 20
+        self.eth = self
+        self.events = SimpleNamespace(Approved=lambda: self)
+
+    def approve(self, key_id, authority, count):
+        self.block_number += 1
+        self.logs.append({
+            "args": {"keyId": bytes.fromhex(key_id[2:]), "authority": authority, "count": count},
+            "blockNumber": self.block_number,
+            "transactionHash": bytes([self.block_number]) * 32,
+        })
+
+    def restart(self):
+        self.logs, self.block_number = [], 0
+        self.epoch += 1
+
+    def get_block(self, number):
+        return {"hash": bytes([self.epoch, number % 256]) * 16}
+
+    def get_logs(self, fromBlock, toBlock):
+        self.get_logs_calls.append((fromBlock, toBlock))
+        return [log for log in self.logs if fromBlock <= log["blockNumber"] <= toBlock]
+
+
+def _sessions(path):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def test_index_follows_logs_and_resumes_from_database(tmp_path):
+    chain = FakeChain()
+    sessions = _sessions(tmp_path / "index.db")
+    index = ApprovalIndex(chain, chain, sessions, block_range=2)
+
+    assert index.approvals(KEY) is None  # not synced yet: callers use RPC
+    for i in range(3):
+        chain.approve(KEY, f"0xauth{i}", i + 1)
+    chain.approve(OTHER, "0xauth0", 1)
+
+    assert index.poll_once() == [KEY, OTHER]
+    assert chain.get_logs_calls == [(0, 1), (2, 3), (4, 4)]
+    assert index.approvals(KEY) == 3
+    assert index.approvals(OTHER.upper().replace("0X", "")) == 1
+    assert index.approvals("0x" + "ef" * 32) == 0
+
+    chain.approve(KEY, "0xauth3", 4)
+    restarted = ApprovalIndex(chain, chain, sessions)
+    restarted.load()
+    chain.get_logs_calls.clear()
+    assert restarted.poll_once() == [KEY]
+    assert chain.get_logs_calls == [(5, 5)]
+    assert restarted.approvals(KEY) == 4
+
+
+def test_index_resets_when_chain_restarts(tmp_path):
+    chain = FakeChain()
+    index = ApprovalIndex(chain, chain, _sessions(tmp_path / "index.db"))
+    chain.approve(KEY, "0xauth0", 1)
+    chain.approve(KEY, "0xauth1", 2)
+    index.poll_once()
+
+    chain.restart()
+    chain.approve(OTHER, "0xauth0", 1)
+    index.poll_once()
+    assert index.approvals(KEY) == 0
+    assert index.approvals(OTHER) == 1
+
+
+def test_index_resets_when_restarted_chain_passes_the_cursor(tmp_path):
+    chain = FakeChain()
+    sessions = _sessions(tmp_path / "index.db")
+    index = ApprovalIndex(chain, chain, sessions)
+    for i in range(4):
+        chain.approve(KEY, f"0xauth{i}", i + 1)
+    index.poll_once()
+    assert index.approvals(KEY) == 4
+
+    chain.restart()
+    for i in range(6):
+        chain.approve(OTHER, f"0xauth{i % 2}", 1)
+
+    restarted = ApprovalIndex(chain, chain, sessions)
+    restarted.load()
+    restarted.poll_once()
+    assert restarted.approvals(KEY) == 0
+    assert restarted.approvals(OTHER) == 1
+
+
+def test_hub_fans_out_index_updates_to_subscribers(tmp_path):
+    chain = FakeChain()
+    index = ApprovalIndex(chain, chain, _sessions(tmp_path / "index.db"))
+    index.poll_once()  # live from the start, so the fallback watcher never polls
+    fetched = []
+
+    def fetch_counts(key_ids):
+        fetched.append(sorted(key_ids))
+        return {k: index.approvals(k) or 0 for k in key_ids}
+
+    async def scenario():
+        hub = ApprovalHub(fetch_counts, index_live=index.is_live, poll_interval=0.01)
+        index.add_listener(hub.publish_threadsafe)
+        subs = [hub.subscribe([KEY]) for _ in range(1000)]
+        both = hub.subscribe([KEY, OTHER.upper()])
+        for sub in subs + [both]:
+            hub.snapshot(sub, fetch_counts(list(sub.key_ids)))
+        assert await both.get(0) == {KEY: 0, OTHER: 0}
+        assert hub.stats() == {"keys": 2, "subscriptions": 1001}
+
+        chain.approve(KEY, "0xauth0", 1)
+        chain.approve(KEY, "0xauth1", 2)
+        await asyncio.get_running_loop().run_in_executor(None, index.poll_once)
+        await asyncio.sleep(0.05)  # watcher is idle while the index is live
+        assert await subs[-1].get(1) == {KEY: 2}
+        assert await both.get(1) == {KEY: 2}
+        assert await both.get(0.01) == {}
+
+        for sub in subs + [both]:
+            hub.unsubscribe(sub)
+        assert hub.stats() == {"keys": 0, "subscriptions": 0}
+
+    asyncio.run(scenario())
+    assert len(fetched) == 1001  # snapshots only; no per-subscriber polling
+
+
+def test_index_applies_raw_receipt_logs(tmp_path):
+    chain = FakeChain()
+    topic = "0x" + "99" * 32
+    index = ApprovalIndex(chain, chain, _sessions(tmp_path / "index.db"), event_topic=topic)
+    index.poll_once()
+
+    log = {
+        "address": chain.address.upper().replace("0X", "0x"),
+        "topics": [topic, KEY, "0x" + "00" * 12 + "22" * 20],
+        "data": "0x" + (3).to_bytes(32, "big").hex(),
+        "blockNumber": "0x7",
+        "transactionHash": "0x" + "33" * 32,
+    }
+    other_event = dict(log, topics=["0x" + "98" * 32] + log["topics"][1:])
+    assert index.apply_logs([log, other_event]) == [KEY]
+    assert index.approvals(KEY) == 3
@@ -0,0 +1,99 @@
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import pytest
+from web3 import Web3
+
+from backend.blockchain.blockchain_auth import APPROVE_KEYS_SIGNATURE, APPROVED_EVENT_SIGNATURE, BlockchainAuthService
+from backend.blockchain.rpc_batch import RpcError
+
+KEY = "0x" + "ab" * 32
+APPROVED_ABI = [{
+    "type": "event",
+    "name": "Approved",
+    "anonymous": False,
+    "inputs": [
+        {"name": "keyId", "type": "bytes32", "indexed": True},
+        {"name": "authority", "type": "address", "indexed": True},
+        {"name": "count", "type": "uint256", "indexed": False},
+    ],
+}]
+
+
+def _service(runtime_code: bytes, approvals: int = 0) -> BlockchainAuthService:
+    """A service over a fake deployment, skipping the connection checks of __init__."""
+    service = BlockchainAuthService.__new__(BlockchainAuthService)
+    service.contract_abi = APPROVED_ABI
+    service.runtime_code = runtime_code
+    service.contract = SimpleNamespace(address="0x" + "11" * 20)
+    service.rpc = SimpleNamespace(call_views=lambda calls: [approvals] * len(calls))
+    service.approval_index = None
+    service.threshold = 4
+    service.authorities = ["0xauth"] * 7
+    service.approve_batch_size = 100
+    return service
+
+
+def _record_transactions(service: BlockchainAuthService) -> list:
+    sent = []
+
+    def submit(fn_name, args, sender, gas):
+        sent.append((fn_name, len(args[0]) if isinstance(args[0], list) else 1, sender))
+        future: Future = Future()
+        future.set_result({"status": 1, "transactionHash": f"0x{len(sent):02x}", "logs": []})
+        return future
+
+    service.submit_transaction = submit
+    return sent
+
+
+def test_index_stays_off_when_deployed_contract_never_emits_approved(monkeypatch):
+    monkeypatch.setenv("APPROVAL_INDEX", "on")
+    # ABI lists Approved, but the deployed bytecode predates the event
+    service = _service(b"\x60\x80\x60\x40" * 16, approvals=3)
+
+    assert service.start_approval_index() is None
+    assert service.approval_index is None
+    status = service.get_approval_status(KEY)
+    assert status["current_approvals"] == 3  # read from the contract, not a silent index
+
+
+def test_deployed_event_is_detected_from_bytecode():
+    topic = bytes(Web3.keccak(text=APPROVED_EVENT_SIGNATURE))
+    assert _service(b"\x60\x80\x7f" + topic + b"\xa2").has_event(APPROVED_EVENT_SIGNATURE)
+    assert not _service(b"\x60\x80").has_event(APPROVED_EVENT_SIGNATURE)
+
+
+def test_bulk_approval_uses_approve_keys_only_when_deployed():
+    selector = bytes(Web3.keccak(text=APPROVE_KEYS_SIGNATURE))[:4]
+    keys = ["0x" + f"{i:02x}" * 32 for i in range(3)]
+
+    new = _service(b"\x63" + selector + b"\x14")
+    sent = _record_transactions(new)
+    new.approve_keys(keys, ["0xa", "0xb"])
+    assert sent == [("approveKeys", 3, "0xa"), ("approveKeys", 3, "0xb")]
+
+    # Local ABI lists approveKeys, the deployed contract does not
+    old = _service(b"\x60\x80")
+    sent = _record_transactions(old)
+    results = old.approve_keys(keys, ["0xa"])
+    assert [fn for fn, _, _ in sent] == ["approveKey"] * 3
+    assert results[0]["error"] is None and len(results[0]["tx_hashes"]) == 3
+
+
+def test_single_key_approval_uses_approve_key():
+    selector = bytes(Web3.keccak(text=APPROVE_KEYS_SIGNATURE))[:4]
+    service = _service(b"\x63" + selector)
+    sent = _record_transactions(service)
+    service.approve_keys([KEY], ["0xa"])
+    assert sent == [("approveKey", 1, "0xa")]
+
+
+def test_strict_authority_lookup_raises_rpc_failures():
+    service = _service(b"")
+    service.rpc = SimpleNamespace(call_views=lambda calls: [RpcError("connection refused")] * len(calls))
+    address = "0x" + "22" * 20
+
+    assert service.authority_flags([address]) == {address: False}
+    with pytest.raises(RpcError):
+        service.authority_flags([address], strict=True)
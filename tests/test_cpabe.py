@@ -34,5 +34,113 @@ def test_cpabe():
     with pytest.raises(Exception):
         decrypt_aes_key(encrypted_key, invalid_user)
 
+
+def test_policy_compiler_handles_nesting_and_precedence():
+    from backend.abe.cpabe_utils import compile_policy, policy_satisfied
+
+    attrs = {"role:admin", "department:IT", "clearance:high"}
+
+    assert policy_satisfied(attrs, "((role:admin))")
+    assert policy_satisfied(attrs, "role:user OR (role:admin AND (dept:it OR dept:HR))")
+    # AND binds looser than OR (legacy precedence): (role:user OR role:admin) AND dept:HR
+    assert not policy_satisfied(attrs, "role:user OR role:admin AND dept:HR")
+
+    # Malformed policies deny instead of raising
+    assert not policy_satisfied(attrs, "(role:admin")
+    assert not policy_satisfied(attrs, "")
+
+    compile_policy.cache_clear()
+    policy_satisfied(attrs, "role:admin AND dept:IT")
+    policy_satisfied({"role:user"}, "role:admin AND dept:IT")
+    assert compile_policy.cache_info().hits == 1
+
+
+def test_threshold_gates_and_ranked_comparisons():
+    from backend.abe.cpabe_utils import policy_satisfied
+
+    attrs = {"role:admin", "department:IT", "clearance:medium"}
+
+    assert policy_satisfied(attrs, "2 of (role:admin, dept:HR, clearance:medium)")
+    assert not policy_satisfied(attrs, "3 of (role:admin, dept:HR, clearance:medium)")
+    assert policy_satisfied(attrs, "clearance >= medium AND dept:IT")
+    assert not policy_satisfied(attrs, "clearance > medium")
+    assert policy_satisfied(attrs, "1 of (role:user, (dept:IT AND clearance <= medium))")
+
+    # Unsatisfiable or unknown forms deny
+    assert not policy_satisfied(attrs, "4 of (role:admin, dept:IT)")
+    assert not policy_satisfied(attrs, "clearance >= secret")
+
+
+def test_canonical_policy_merges_equivalent_spellings():
+    from backend.abe.cpabe_utils import canonical_policy, policy_satisfied
+
+    a = canonical_policy("role:admin AND department:IT")
+    assert a == canonical_policy("((DEPT:it)) and role:Admin and role:admin")
+    assert canonical_policy(a) == a
+
+    b = canonical_policy("(dept:HR OR role:admin) AND 2 of (clearance:high, role:x, dept:IT)")
+    assert b == canonical_policy("2 OF (dept:it, role:x, clearance:high) AND (role:admin OR dept:hr)")
+    assert canonical_policy(b) == b
+    assert policy_satisfied({"role:admin", "dept:IT", "clearance:high"}, b)
+
+
+def test_bsw07_decryption_plans_reconstruct_the_secret():
+    from backend.abe.bsw07 import decryption_plan, share_secret
+    from backend.abe.cpabe_utils import normalize_attributes, parse_policy
+
+    order = 2**127 - 1
+    tree = parse_policy("(role:admin OR role:manager) AND 2 of (dept:IT, clearance:high, (role:x AND dept:hr))")
+    shares = [share for _, share in share_secret(tree, 123456789, order)]
+    attrs = normalize_attributes({"role:admin", "role:manager", "dept:IT", "clearance:high", "role:x", "dept:HR"})
+
+    minimal = decryption_plan(tree, attrs, order, "minimal")
+    full = decryption_plan(tree, attrs, order, "full")
+    for paired, terms in (minimal, full):
+        assert sum(coef * shares[pos] for pos, coef in terms) % order == 123456789
+    assert len(minimal[0]) == 3
+    assert len(full[0]) == len(shares)
+
+    assert decryption_plan(tree, normalize_attributes({"role:admin", "dept:IT"}), order) is None
+
+
+def test_bsw07_engine_wraps_keys_under_policy():
+    pytest.importorskip("charm")
+    from backend.abe.bsw07 import BSW07Engine
+
+    engine = BSW07Engine()
+    aes_key = b"0123456789abcdef0123456789abcdef"
+    struct = engine.wrap_key(aes_key, "role:admin AND 2 of (dept:IT, clearance:high, role:x)")
+
+    restored = BSW07Engine(params=engine.export_params(), strategy="full")
+    key = restored.user_key({"role:admin", "department:IT", "clearance:high"})
+    assert restored.unwrap_key(struct, key) == aes_key
+
+    with pytest.raises(ValueError):
+        restored.unwrap_key(struct, restored.user_key({"role:admin", "dept:IT"}))
+
+
+def test_abe_params_file_is_private_and_created_once(tmp_path, monkeypatch):
+    import json
+    import os
+    import stat
+
+    from backend.abe import cpabe_utils
+
+    legacy = tmp_path / "storage" / "abe_params.json"
+    legacy.parent.mkdir()
+    legacy.write_text(json.dumps({"msk": "old"}))
+    monkeypatch.setattr(cpabe_utils, "LEGACY_ABE_PARAMS_PATH", str(legacy))
+
+    path = str(tmp_path / "config" / "abe_params.json")
+    assert cpabe_utils._load_abe_params(path) == {"msk": "old"}  # moved out of storage
+    assert not legacy.exists()
+
+    os.remove(path)
+    assert cpabe_utils._save_abe_params(path, {"msk": "new"}) is None
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    # A second worker keeps the first worker's keys
+    assert cpabe_utils._save_abe_params(path, {"msk": "other"}) == {"msk": "new"}
+
+
 if __name__ == "__main__":
     test_cpabe()
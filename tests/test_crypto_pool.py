@@ -0,0 +1,30 @@
+import asyncio
+import threading
+import time
+
+from backend.utils.crypto_pool import CryptoPool
+
+
+def test_crypto_pool_runs_off_loop_and_limits_in_flight_jobs():
+    pool = CryptoPool(kind="thread", workers=4, max_pending=2)
+    lock = threading.Lock()
+    running = {"now": 0, "peak": 0}
+
+    def work(x):
+        with lock:
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+        time.sleep(0.02)
+        with lock:
+            running["now"] -= 1
+        return x * 2
+
+    async def main():
+        return await asyncio.gather(*(pool.run(work, i) for i in range(8)))
+
+    try:
+        assert asyncio.run(main()) == [i * 2 for i in range(8)]
+    finally:
+        pool.shutdown()
+
+    assert running["peak"] <= 2
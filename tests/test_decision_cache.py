@@ -0,0 +1,73 @@
+import pytest
+
+from backend.abe.cpabe_utils import policy_satisfied
+from backend.abe.decision_cache import DecisionCache, get_decision_cache
+
+
+def test_decisions_are_shared_by_equal_attribute_sets():
+    cache = get_decision_cache()
+    cache.clear()
+    before = cache.stats()
+
+    policy = "role:employee AND (dept:Sales OR dept:HR) AND clearance >= medium"
+    assert policy_satisfied({"role:employee", "dept:Sales", "clearance:high"}, policy)
+    # Same set after normalization, and an equivalent spelling of the policy
+    assert policy_satisfied({"ROLE:employee", "department:sales", "clearance:high"},
+                            "clearance >= medium AND (dept:hr OR dept:sales) AND role:employee")
+    assert not policy_satisfied({"role:employee", "dept:IT", "clearance:high"}, policy)
+
+    stats = cache.stats()
+    assert stats["hits"] - before["hits"] == 1
+    assert stats["misses"] - before["misses"] == 2
+
+
+def test_decision_cache_bounds_and_policy_invalidation():
+    cache = DecisionCache(max_entries=2)
+    calls = []
+    compute = lambda: calls.append(1) or True
+
+    cache.decide("fp1", 1, compute)
+    cache.decide("fp2", 1, compute)
+    cache.decide("fp1", 2, compute)
+    assert cache.stats()["size"] == 2 and cache.stats()["evictions"] == 1
+
+    assert cache.invalidate_policy(1) == 1
+    cache.decide("fp2", 1, compute)
+    assert len(calls) == 4
+    assert cache.stats()["hit_ratio"] == 0.0
+
+
+def test_role_department_policies_are_cached():
+    cache = get_decision_cache()
+    cache.clear()
+    before = cache.stats()
+    assert policy_satisfied({"role:admin", "dept:IT"}, "role:admin AND dept:IT")
+    assert policy_satisfied({"role:admin", "department:it"}, "role:admin AND dept:IT")
+    stats = cache.stats()
+    assert stats["size"] == 1
+    assert (stats["hits"] - before["hits"], stats["misses"] - before["misses"]) == (1, 1)
+
+
+def test_hit_does_not_evaluate_and_moves_counters():
+    cache = DecisionCache(max_entries=2)
+    calls = []
+    compute = lambda: calls.append(1) or True
+
+    assert cache.decide("fp1", 1, compute)
+    assert cache.decide("fp1", 1, compute)
+    assert cache.decide("fp1", 1, lambda: pytest.fail("hit must not evaluate"))
+    assert len(calls) == 1
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (2, 1)
+
+
+def test_eviction_is_least_recently_used():
+    cache = DecisionCache(max_entries=2)
+    cache.decide("fp1", 1, lambda: True)
+    cache.decide("fp2", 1, lambda: True)
+    cache.decide("fp1", 1, lambda: True)  # fp1 is now the most recent
+    cache.decide("fp3", 1, lambda: True)
+
+    cache.decide("fp1", 1, lambda: pytest.fail("fp1 was evicted"))
+    calls = []
+    cache.decide("fp2", 1, lambda: calls.append(1) or True)
+    assert calls == [1]
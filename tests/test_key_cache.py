@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from backend.abe.cpabe_utils import encrypt_aes_key
+from backend.abe.key_cache import KeyCache
+
+
+def _stored(aes_key: bytes, policy: str) -> bytes:
+    struct = encrypt_aes_key(aes_key, policy)
+    return json.dumps({
+        "encrypted_key": struct["encrypted_key"].decode(),
+        "policy": struct["policy"],
+        "fernet_key": struct["fernet_key"].decode(),
+    }).encode()
+
+
+def test_key_cache_hits_and_still_enforces_policy():
+    aes_key = b"0123456789abcdef0123456789abcdef"
+    stored = _stored(aes_key, "role:admin AND dept:IT")
+    cache = KeyCache(max_entries=4, ttl_seconds=60, cache_unwrapped=True)
+
+    admin = {"attributes": {"role:admin", "dept:IT"}}
+    assert cache.unwrap(1, stored, admin) == aes_key
+    assert cache.unwrap(1, stored, admin) == aes_key
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    with pytest.raises(Exception):
+        cache.unwrap(1, stored, {"attributes": {"role:user"}})
+
+
+def test_key_cache_zeroizes_unwrapped_key_on_invalidate():
+    aes_key = b"k" * 32
+    stored = _stored(aes_key, "role:admin")
+    cache = KeyCache(cache_unwrapped=True)
+    cache.unwrap(7, stored, {"attributes": {"role:admin"}})
+
+    entry = next(iter(cache._entries.values()))
+    held = entry.aes_key
+    cache.invalidate(7)
+
+    assert held == bytearray(32)
+    assert cache.stats()["size"] == 0
+
+
+def test_key_cache_hit_survives_concurrent_eviction():
+    aes_key = b"k" * 32
+    stored = _stored(aes_key, "role:admin")
+    cache = KeyCache(cache_unwrapped=True)
+    admin = {"attributes": {"role:admin"}}
+    cache.unwrap(7, stored, admin)
+
+    lookup = cache._lookup
+
+    def lookup_then_evict(*args):
+        result = lookup(*args)
+        cache.invalidate(7)  # another thread expires the entry right after the lookup
+        return result
+
+    cache._lookup = lookup_then_evict
+    assert cache.unwrap(7, stored, admin) == aes_key
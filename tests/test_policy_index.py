@@ -0,0 +1,68 @@
+import pytest
+
+from backend.abe.cpabe_utils import policy_satisfied
+from backend.abe.policy_index import PolicyBitsetIndex
+
+POLICIES = [
+    "role:admin AND dept:IT",
+    "(role:admin OR role:manager) AND (dept:IT OR dept:HR)",
+    "role:employee OR (dept:Finance AND clearance:medium)",
+    "clearance:high",
+    "(role:admin",  # malformed -> never accessible
+]
+
+USERS = [
+    {"role:admin", "department:IT", "clearance:high"},
+    {"role:accountant", "dept:Finance", "clearance:medium"},
+    {"role:worker", "dept:HR", "clearance:low"},
+]
+
+
+def _rows():
+    return [(i, POLICIES[i % len(POLICIES)]) for i in range(50)]
+
+
+def test_bitset_index_matches_policy_satisfied():
+    index = PolicyBitsetIndex()
+    for attrs in USERS:
+        expected = [i for i, p in _rows() if policy_satisfied(attrs, p)]
+        assert index.accessible(_rows(), attrs, use_numpy=False) == expected
+
+    # Each distinct policy is compiled once, however many rows reference it
+    assert len(index) == len(POLICIES)
+
+
+def test_bitset_index_numpy_path_matches_python_path():
+    pytest.importorskip("numpy")
+
+    index = PolicyBitsetIndex()
+    for attrs in USERS:
+        assert index.accessible(_rows(), attrs, use_numpy=True) == index.accessible(_rows(), attrs, use_numpy=False)
+
+
+def test_bitset_index_supports_threshold_and_comparisons():
+    policies = [
+        "2 of (role:admin, dept:HR, clearance >= medium)",
+        "clearance < high AND (role:accountant OR role:worker)",
+    ]
+    rows = [(i, p) for i, p in enumerate(policies)]
+    index = PolicyBitsetIndex()
+    for attrs in USERS:
+        expected = [i for i, p in rows if policy_satisfied(attrs, p)]
+        assert index.accessible(rows, attrs, use_numpy=False) == expected
+
+
+def test_policy_matrix_groups_sets_and_packs_bits():
+    from backend.abe.policy_index import evaluate_policy_matrix
+
+    sets = [{"role:admin", "dept:IT"}, {"role:user"}, {"ROLE:admin", "department:it"}]
+    policies = ["role:admin AND dept:IT", "(broken", "role:user OR role:admin"] * 4
+
+    for use_numpy in (False, True):
+        matrix = evaluate_policy_matrix(sets, policies, use_numpy=use_numpy)
+        assert (matrix.rows, matrix.columns, matrix.row_bytes) == (3, 12, 2)
+        assert matrix.distinct_rows == 2
+        assert matrix.invalid_policies == [1, 4, 7, 10]
+        assert matrix.row(0) == [True, False, True] * 4
+        assert matrix.row(1) == [False, False, True] * 4
+        assert matrix.bits[:2] == matrix.bits[4:]
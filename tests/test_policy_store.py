@@ -0,0 +1,36 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.models import Policy, SecureFile
+from backend.abe.policy_store import backfill_policy_ids, ensure_policy_schema, intern_policy
+
+
+def test_policy_interning_and_backfill_of_legacy_schema():
+    engine = create_engine("sqlite://")
+    # Database created before the policies table existed
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE secure_files (id INTEGER PRIMARY KEY, filename VARCHAR NOT NULL,"
+            " owner VARCHAR NOT NULL, file_path VARCHAR NOT NULL,"
+            " encrypted_key BLOB NOT NULL, policy VARCHAR NOT NULL)"
+        ))
+        for i, policy in enumerate(["role:admin AND dept:IT", "DEPARTMENT:it and role:ADMIN", "(role:admin"]):
+            conn.execute(text(
+                "INSERT INTO secure_files (id, filename, owner, file_path, encrypted_key, policy)"
+                " VALUES (:id, 'f', 'admin', 'p', x'00', :policy)"
+            ), {"id": i + 1, "policy": policy})
+    Base.metadata.create_all(bind=engine)
+    ensure_policy_schema(engine)
+
+    db = sessionmaker(bind=engine)()
+    assert backfill_policy_ids(db, batch_size=2) == 2
+    assert db.query(Policy).count() == 1
+
+    files = db.query(SecureFile).order_by(SecureFile.id).all()
+    assert files[0].policy_id == files[1].policy_id is not None
+    assert files[2].policy_id is None
+
+    assert intern_policy(db, "dept:it AND role:admin").id == files[0].policy_id
+    assert db.query(Policy).count() == 1
+    db.close()
@@ -0,0 +1,38 @@
+import pytest
+from fastapi import HTTPException
+
+pytest.importorskip("web3")
+from backend.api.file_routes import _parse_range_header
+
+
+def test_valid_ranges_are_clamped_to_the_file():
+    assert _parse_range_header("bytes=0-4", 10) == (0, 5)
+    assert _parse_range_header("bytes=5-", 10) == (5, 10)
+    assert _parse_range_header("bytes=-3", 10) == (7, 10)
+    assert _parse_range_header("bytes=8-100", 10) == (8, 10)
+
+
+def test_invalid_or_unsupported_ranges_are_ignored():
+    assert _parse_range_header("bytes=5-3", 10) is None
+    assert _parse_range_header("bytes=0-1,4-5", 10) is None
+    assert _parse_range_header("items=0-1", 10) is None
+    assert _parse_range_header("bytes=a-b", 10) is None
+    assert _parse_range_header("bytes=--5", 10) is None
+    assert _parse_range_header("bytes=+2-4", 10) is None
+    assert _parse_range_header("bytes=2-+4", 10) is None
+    assert _parse_range_header("bytes= 2- 4", 10) is None
+    assert _parse_range_header("bytes=-", 10) is None
+
+
+def test_range_past_the_end_is_not_satisfiable():
+    with pytest.raises(HTTPException) as e:
+        _parse_range_header("bytes=10-20", 10)
+    assert e.value.status_code == 416
+    assert e.value.headers["Content-Range"] == "bytes */10"
+
+    # Resuming a download that already finished
+    for header in ("bytes=10-", "bytes=11-"):
+        with pytest.raises(HTTPException) as e:
+            _parse_range_header(header, 10)
+        assert e.value.status_code == 416
+        assert e.value.headers["Content-Range"] == "bytes */10"
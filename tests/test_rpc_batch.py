@@ -0,0 +1,91 @@
+from types import SimpleNamespace
+
+from backend.blockchain.rpc_batch import RpcBatcher, RpcError, ViewCall
+
+
+class FakeNode:
+    """JSON-RPC endpoint answering eth_call with the uint encoded in the call data."""
+
+    def __init__(self, batching=True):
+        self.batching = batching
+        self.posts = []
+        self.single = []
+
+    def answer(self, params):
+        value = int(params[0]["data"].split(":")[1])
+        if value < 0:
+            return {"error": {"message": "execution reverted"}}
+        return {"result": "0x" + value.to_bytes(32, "big").hex()}
+
+    def post(self, url, json, timeout):
+        self.posts.append(json)
+        if not self.batching:
+            return SimpleNamespace(json=lambda: {"error": {"message": "batch requests not supported"}})
+        # Responses may come back in any order
+        body = [dict(self.answer(item["params"]), id=item["id"]) for item in reversed(json)]
+        return SimpleNamespace(json=lambda: body)
+
+    def make_request(self, method, params):
+        self.single.append(params)
+        return self.answer(params)
+
+
+class FakeCodec:
+    @staticmethod
+    def decode(types, data):
+        return [int.from_bytes(data, "big")]
+
+
+def _batcher(node, max_batch):
+    w3 = SimpleNamespace(provider=node, codec=FakeCodec())
+    batcher = RpcBatcher(w3, "http://node", max_batch=max_batch)
+    batcher._session = node
+    return batcher
+
+
+def _calls(values):
+    contract = SimpleNamespace(address="0xabc", encodeABI=lambda fn, args: f"{fn}:{args[0]}")
+    return [ViewCall(contract, "approvals", (v,), ("uint256",)) for v in values]
+
+
+def test_view_calls_are_batched_in_chunks():
+    node = FakeNode()
+    batcher = _batcher(node, max_batch=4)
+    results = batcher.call_views(_calls([1, 2, -1, 4, 5, 6]))
+
+    assert results[:2] == [1, 2] and results[3:] == [4, 5, 6]
+    assert isinstance(results[2], RpcError)
+    assert [len(p) for p in node.posts] == [4, 2]
+    assert batcher.round_trips == 2 and batcher.calls == 6
+
+
+def test_falls_back_to_single_requests_when_batches_are_rejected():
+    node = FakeNode(batching=False)
+    batcher = _batcher(node, max_batch=10)
+    assert batcher.call_views(_calls([3, 7])) == [3, 7]
+    assert batcher.call_views(_calls([9])) == [9]
+
+    assert len(node.posts) == 1  # rejection detected once
+    assert len(node.single) == 3
+    assert not batcher.batch_supported
+
+
+def test_transient_batch_failure_keeps_batching_enabled():
+    node = FakeNode()
+    batcher = _batcher(node, max_batch=10)
+    post = node.post
+    replies = iter([SimpleNamespace(json=lambda: {"error": {"code": -32000, "message": "upstream 502"}})])
+
+    def flaky_post(url, json, timeout):
+        reply = next(replies, None)
+        if reply is None:
+            return post(url, json, timeout)
+        node.posts.append(json)
+        return reply
+
+    node.post = flaky_post
+    assert batcher.call_views(_calls([3, 7])) == [3, 7]  # this request: one by one
+    assert batcher.call_views(_calls([9, 1])) == [9, 1]  # next one: batched again
+
+    assert batcher.batch_supported
+    assert len(node.posts) == 2 and len(node.single) == 2
@@ -0,0 +1,37 @@
+import itertools
+import os
+
+from backend.abe.abe_key_manager import lagrange_basis, shamir_combine, shamir_split_batch
+
+
+def test_batch_split_reconstructs_from_every_threshold_subset():
+    keys = [int.from_bytes(os.urandom(32), "big") >> 1 for _ in range(5)]
+    all_shares = shamir_split_batch(keys, 4, 7)
+    assert [len(shares) for shares in all_shares] == [7] * 5
+
+    lagrange_basis.cache_clear()
+    for key, shares in zip(keys, all_shares):
+        for subset in itertools.combinations(range(1, 8), 4):
+            assert shamir_combine([shares[i - 1] for i in subset], subset) == key
+        # Fewer than threshold shares do not reveal the key
+        assert shamir_combine(shares[:3], [1, 2, 3]) != key
+
+    info = lagrange_basis.cache_info()
+    assert info.misses == 35 + 1
+
+
+def test_gf256_shares_secrets_of_any_length():
+    from backend.abe import gf256_shamir
+
+    for a in range(1, 256):
+        assert gf256_shamir.gf_mul(a, gf256_shamir.gf_inv(a)) == 1
+
+    struct = b'{"encrypted_key": "...", "policy": "role:admin", "fernet_key": "..."}' * 3
+    shares = gf256_shamir.split(struct, 4, 7)
+    assert all(len(share) == len(struct) for share in shares)
+    for subset in itertools.combinations(range(1, 8), 4):
+        assert gf256_shamir.combine([shares[i - 1] for i in subset], subset) == struct
+
+    keys = [os.urandom(32), b"", os.urandom(100)]
+    for key, key_shares in zip(keys, gf256_shamir.split_batch(keys, 4, 7)):
+        assert gf256_shamir.combine(key_shares[3:], [4, 5, 6, 7]) == key
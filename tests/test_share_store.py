@@ -0,0 +1,140 @@
+import os
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.abe import share_store
+from backend.abe.share_metadata import ShareMetadataStore
+from backend.abe.abe_key_manager import ABEKeyManager
+from backend.abe.share_store import (
+    DatabaseShareStore,
+    DirectoryShareStore,
+    SQLiteShareStore,
+    migrate_directory_store,
+    migrate_legacy_shares,
+)
+
+AUTHORITIES = [f"0xauth{i}" for i in range(7)]
+
+
+def test_migrates_directory_layout_into_sqlite(tmp_path):
+    legacy = DirectoryShareStore(str(tmp_path / "shares"))
+    for file_id in ("1", "2", "3"):
+        legacy.put_many(file_id, {a: f"{file_id}-{a}".encode() for a in AUTHORITIES})
+
+    store = SQLiteShareStore(str(tmp_path / "shares.db"))
+    assert migrate_directory_store(legacy, store, batch_files=2) == 3
+    assert store.get_many("2", AUTHORITIES[:4]) == {a: f"2-{a}".encode() for a in AUTHORITIES[:4]}
+
+    store.delete_many(["1", "2"])
+    assert store.get_many("1", AUTHORITIES) == {}
+    assert len(store.get_many("3", AUTHORITIES)) == 7
+    store.close()
+
+
+def _metadata_sessions(path):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def test_key_manager_round_trip_through_share_store(monkeypatch, tmp_path):
+    sessions = _metadata_sessions(tmp_path / "meta.db")
+    monkeypatch.setattr(share_store, "_share_store", DatabaseShareStore(sessions))
+
+    for mode in ("prime", "gf256"):
+        # Uploading and reconstructing "workers" share only the database
+        uploader = ABEKeyManager(mode=mode, share_metadata=ShareMetadataStore(sessions))
+        abe = ABEKeyManager(share_metadata=ShareMetadataStore(sessions))
+        keys = {f"{mode}-{i}": os.urandom(32) for i in range(3)}
+        shares = uploader.split_keys_to_shares(keys, AUTHORITIES)
+        assert set(shares) == set(keys)
+
+        for file_id, key in keys.items():
+            assert abe.collect_shares(file_id, AUTHORITIES[3:]) == key
+        assert abe.collect_shares(f"{mode}-0", AUTHORITIES[:3]) is None
+
+
+def test_share_metadata_invalidates_across_processes(tmp_path):
+    sessions = _metadata_sessions(tmp_path / "meta.db")
+    writer = ShareMetadataStore(sessions, check_interval=0)
+    reader = ShareMetadataStore(sessions, check_interval=0)
+
+    writer.save_many(["1", "2"], AUTHORITIES, 4, 7, "prime")
+    assert reader.get("1")["authorities"] == AUTHORITIES
+    assert reader.get("1") is not None and reader.stats()["hits"] == 1
+
+    # Re-sharing after an authority rotation is seen by the other process
+    rotated = list(reversed(AUTHORITIES))
+    writer.save_many(["1"], rotated, 4, 7, "gf256")
+    assert reader.get("1")["authorities"] == rotated
+    assert reader.stats()["invalidations"] == 1
+    assert writer.stats()["invalidations"] == 0
+
+    writer.delete_many(["2"])
+    assert reader.get("2") is None
+
+
+def test_first_writes_of_two_processes_share_one_generation_row(tmp_path):
+    sessions = _metadata_sessions(tmp_path / "meta.db")
+    first = ShareMetadataStore(sessions, check_interval=0)
+
+    def stale_sessions():
+        # A worker that looked for the row before `first` created it
+        db = sessions()
+        db.get = lambda model, key: None
+        return db
+
+    second = ShareMetadataStore(stale_sessions, check_interval=0)
+    first.save_many(["1"], AUTHORITIES, 4, 7, "prime")
+    second.ensure_generation()  # loses the insert race without raising
+
+    second._session_factory = sessions
+    second.save_many(["2"], AUTHORITIES, 4, 7, "prime")
+    assert first.get("2") is not None
+    assert first.stats()["generation"] == 2
+
+
+def test_legacy_sqlite_shares_move_into_the_database(monkeypatch, tmp_path):
+    legacy_db = tmp_path / "shares.db"
+    legacy = SQLiteShareStore(str(legacy_db))
+    legacy.put_batch({f: {a: f"{f}-{a}".encode() for a in AUTHORITIES} for f in ("1", "2")})
+    legacy.close()
+    monkeypatch.setattr(share_store, "LEGACY_SHARES_DIR", str(tmp_path / "shares"))
+    monkeypatch.setattr(share_store, "LEGACY_SHARES_DB", str(legacy_db))
+
+    store = DatabaseShareStore(_metadata_sessions(tmp_path / "app.db"))
+    assert migrate_legacy_shares(store) == 2
+    assert sorted(store.file_ids()) == ["1", "2"]
+    assert store.get_many("2", AUTHORITIES[:4]) == {a: f"2-{a}".encode() for a in AUTHORITIES[:4]}
+    assert not legacy_db.exists() and (tmp_path / "shares.db.migrated").exists()
+    assert migrate_legacy_shares(store) == 0
+
+    # Re-sharing replaces existing rows in place
+    store.put_batch({"2": {AUTHORITIES[0]: b"new"}, "3": {AUTHORITIES[0]: b"three"}})
+    assert store.get_many("2", AUTHORITIES[:2]) == {AUTHORITIES[0]: b"new", AUTHORITIES[1]: f"2-{AUTHORITIES[1]}".encode()}
+    assert store.get_all("3") == {AUTHORITIES[0]: b"three"}
+
+    store.delete_many(["1"])
+    assert store.get_all("1") == {}
+
+
+def test_concurrent_writers_do_not_lose_generation_bumps(tmp_path):
+    sessions = _metadata_sessions(tmp_path / "meta.db")
+    workers = [ShareMetadataStore(sessions, check_interval=0) for _ in range(4)]
+
+    def upload(worker, n):
+        for i in range(10):
+            worker.save_many([f"{n}-{i}"], AUTHORITIES, 4, 7, "prime")
+
+    threads = [threading.Thread(target=upload, args=(w, n)) for n, w in enumerate(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    reader = ShareMetadataStore(sessions, check_interval=0)
+    assert reader.get("3-9") is not None
+    assert reader.stats()["generation"] == 40
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from backend.storage import storage_backend
+from backend.utils.blob_io import open_stored_blob, open_stored_blob_writer
+
+CHUNK = 64 * 1024
+
+
+@pytest.fixture
+def local_storage(tmp_path, monkeypatch):
+    monkeypatch.setenv("STORAGE_BACKEND", "local")
+    monkeypatch.setenv("LOCAL_STORAGE_DIR", str(tmp_path))
+
+    def no_whole_blobs(*args, **kwargs):
+        raise AssertionError("whole blob buffered in memory")
+
+    monkeypatch.setattr(storage_backend, "load_encrypted_blob", no_whole_blobs)
+    monkeypatch.setattr(storage_backend, "save_encrypted_blob", no_whole_blobs)
+    return tmp_path
+
+
+def test_local_blobs_stream_without_full_size_buffers(local_storage):
+    payload = os.urandom(CHUNK) * 16
+
+    writer = open_stored_blob_writer(filename="f.bin", metadata={"owner": "alice"})
+    for i in range(0, len(payload), CHUNK):
+        writer.write(payload[i:i + CHUNK])
+        # Chunks reach the disk as they are written (only the io buffer is held)
+        (part,) = local_storage.glob("*.part")
+        assert part.stat().st_size >= i + CHUNK - 8192
+    file_path = writer.close()
+    assert file_path.startswith("local:") and not list(local_storage.glob("*.part"))
+
+    blob = open_stored_blob(file_path)
+    try:
+        assert blob.read(CHUNK) == payload[:CHUNK]
+        assert blob.tell() == CHUNK
+        blob.seek(len(payload) - CHUNK)
+        assert blob.read() == payload[-CHUNK:]
+    finally:
+        blob.close()
+
+    storage_backend.delete_encrypted_blob(file_path)
+    assert not list(local_storage.iterdir())
+
+
+def test_aborted_upload_leaves_nothing_behind(local_storage):
+    writer = open_stored_blob_writer()
+    writer.write(b"x" * CHUNK)
+    writer.abort()
+    assert not list(local_storage.iterdir())
@@ -0,0 +1,168 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from backend.blockchain.rpc_batch import RpcBatcher
+from backend.blockchain.tx_scheduler import TxScheduler
+
+
+class FakeNode:
+    """JSON-RPC node with per-account nonces, a mempool and manual mining."""
+
+    def __init__(self, automine=True):
+        self.automine = automine
+        self.nonces = {}
+        self.mempool = {}  # (sender, nonce) -> tx
+        self.receipts = {}
+        self.receipt_posts = 0
+        self.lock = threading.Lock()
+        self._hashes = 0
+
+    def _mine(self, tx):
+        self.receipts[tx["hash"]] = {
+            "transactionHash": tx["hash"],
+            "from": tx["from"],
+            "status": "0x1",
+            "blockNumber": hex(len(self.receipts) + 1),
+            "gasUsed": "0x5208",
+            "gasPrice": tx["gasPrice"],
+            "nonce": tx["nonce"],
+            "logs": [],
+        }
+
+    def mine_all(self):
+        with self.lock:
+            for tx in self.mempool.values():
+                self._mine(tx)
+            self.mempool.clear()
+
+    def make_request(self, method, params):
+        with self.lock:
+            if method == "eth_getTransactionCount":
+                return {"result": hex(self.nonces.get(params[0], 0))}
+            if method == "eth_gasPrice":
+                return {"result": hex(100)}
+            if method == "eth_sendTransaction":
+                return self._send(dict(params[0]))
+            if method == "eth_getTransactionReceipt":
+                return {"result": self.receipts.get(params[0])}
+        return {"error": {"message": f"unsupported {method}"}}
+
+    def _send(self, tx):
+        sender, nonce = tx["from"], int(tx["nonce"], 16)
+        expected = self.nonces.get(sender, 0)
+        pending = self.mempool.get((sender, nonce))
+        if pending is not None:
+            if int(tx["gasPrice"], 16) <= int(pending["gasPrice"], 16):
+                return {"error": {"message": "replacement transaction underpriced"}}
+        elif nonce < expected:
+            return {"error": {"message": f"nonce too low: expected {expected}"}}
+        elif nonce > expected:
+            return {"error": {"message": "nonce too high"}}
+        else:
+            self.nonces[sender] = nonce + 1
+
+        self._hashes += 1
+        tx["hash"] = "0x%064x" % self._hashes
+        if self.automine:
+            self._mine(tx)
+        else:
+            self.mempool[(sender, nonce)] = tx
+        return {"result": tx["hash"]}
+
+    def post(self, url, json, timeout):
+        with self.lock:
+            self.receipt_posts += 1
+        body = [dict(self.make_request(item["method"], item["params"]), id=item["id"]) for item in json]
+        return SimpleNamespace(json=lambda: body)
+
+
+def _scheduler(node, **kwargs):
+    rpc = RpcBatcher(SimpleNamespace(provider=node), "http://node")
+    rpc._session = node
+    return TxScheduler(rpc, **kwargs)
+
+
+TX = {"to": "0xcontract", "data": "0x01", "gas": 200000}
+
+
+def test_pipelined_submissions_resolve_in_one_receipt_batch():
+    node = FakeNode(automine=False)
+    scheduler = _scheduler(node, poll_interval=0.02)
+
+    futures = []
+    lock = threading.Lock()
+
+    def submit_many(sender):
+        for _ in range(20):
+            future = scheduler.submit(sender, TX)
+            with lock:
+                futures.append(future)
+
+    threads = [threading.Thread(target=submit_many, args=(s,)) for s in ("0xa", "0xb")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    time.sleep(0.1)
+    posts_before = node.receipt_posts
+    node.mine_all()
+    receipts = [f.result(timeout=5) for f in futures]
+    time.sleep(0.1)
+
+    assert node.receipt_posts - posts_before <= 2  # 40 receipts, not 40 round trips
+    for sender in ("0xa", "0xb"):
+        nonces = sorted(int(r["nonce"], 16) for r in receipts if r["from"] == sender)
+        assert nonces == list(range(20))
+    assert all(r["status"] == 1 for r in receipts)
+    assert scheduler.stats()["pending"] == 0 and scheduler.stats()["mined"] == 40
+
+
+def test_resyncs_nonce_after_external_transaction():
+    node = FakeNode()
+    scheduler = _scheduler(node, poll_interval=0.01)
+    assert scheduler.submit("0xa", TX).result(timeout=5)["status"] == 1
+
+    node.nonces["0xa"] += 1  # same account used by another wallet
+    receipt = scheduler.submit("0xa", TX).result(timeout=5)
+    assert int(receipt["nonce"], 16) == 2
+    assert scheduler.retried == 1
+
+
+def test_replaces_stuck_transaction_with_higher_gas_price():
+    node = FakeNode(automine=False)
+    scheduler = _scheduler(node, poll_interval=0.01, replace_after=0.05, max_replacements=1)
+    future = scheduler.submit("0xa", TX)
+
+    deadline = time.monotonic() + 5
+    while scheduler.replaced == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    node.mine_all()
+
+    receipt = future.result(timeout=5)
+    assert scheduler.replaced == 1
+    assert int(receipt["nonce"], 16) == 0
+    assert int(receipt["gasPrice"], 16) > 100
+    assert scheduler.stats()["pending"] == 0
+
+
+def test_timed_out_transaction_is_cancelled_and_nonce_resynced():
+    node = FakeNode(automine=False)
+    scheduler = _scheduler(node, poll_interval=0.01, replace_after=60, timeout=0.05)
+    future = scheduler.submit("0xa", TX)
+
+    with pytest.raises(TimeoutError, match="cancelled"):
+        future.result(timeout=5)
+    assert "0xa" not in scheduler._nonces
+    cancel = node.mempool[("0xa", 0)]
+    assert cancel["to"] == "0xa" and cancel["value"] == "0x0"
+    assert int(cancel["gasPrice"], 16) > 100
+
+    node.automine = True
+    node.mine_all()
+    receipt = scheduler.submit("0xa", TX).result(timeout=5)
+    assert int(receipt["nonce"], 16) == 1
+    assert scheduler.stats()["cancelled"] == 1